@@ -1,10 +1,16 @@
 from django.db import models
 from ProfileDomain.models import ProfileDomain
 from ProfileItem.models import ProfileItem
-from profiles.models import Profile
+from profiles.models import Profile, ProgressRollup
+
+class ProfileCategoryQuerySet(models.QuerySet):
+    def with_counts(self):
+        """Annotate the domain count so listings do not run a COUNT per category."""
+        return self.annotate(num_domains=models.Count('domains'))
+
 
 # profile_data/models.py
-class ProfileCategory(models.Model):
+class ProfileCategory(ProgressRollup):
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='categories')
     name = models.CharField(max_length=100)
     name_ar = models.CharField(max_length=100, blank=True, null=True)
@@ -12,13 +18,19 @@ class ProfileCategory(models.Model):
     description_ar = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ProfileCategoryQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
     @property
     def domains_count(self):
+        if hasattr(self, 'num_domains'):
+            return self.num_domains
         return self.domains.count()
 
     @property
     def items_count(self):
-        return ProfileItem.objects.filter(profile_domain__in=self.domains.all()).count()
+        # Stored rollup counter: item deltas keep it current, and deleting a
+        # domain recounts it (see ProfileDomain.metrics.forget_deleted_domain)
+        return self.item_count
@@ -1,3 +1,40 @@
-from django.test import TestCase
+from ProfileCategory.models import ProfileCategory
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import ProfileItem
+from profiles.testing import ProvisionedProfileTestCase
 
-# Create your tests here.
+
+class CategoryCountTests(ProvisionedProfileTestCase):
+    def listed_counts(self):
+        response = self.client.get('/api/category/categories/', {'profile_id': self.profile.pk})
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: (row['domains_count'], row['items_count']) for row in response.data['data']}
+
+    def real_counts(self):
+        return {
+            category.pk: (
+                ProfileDomain.objects.filter(profile_category=category).count(),
+                ProfileItem.objects.filter(profile_domain__profile_category=category).count(),
+            )
+            for category in ProfileCategory.objects.filter(profile=self.profile)
+        }
+
+    def test_counts_match_the_items(self):
+        self.assertEqual(self.listed_counts(), self.real_counts())
+
+    def test_counts_after_deleting_a_domain(self):
+        domain = ProfileDomain.objects.filter(profile=self.profile).order_by('-item_count').first()
+        before = self.listed_counts()[domain.profile_category_id]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/domains/domains/{domain.pk}/')
+        self.assertEqual(response.status_code, 204)
+        counts = self.listed_counts()
+        self.assertEqual(counts, self.real_counts())
+        self.assertEqual(counts[domain.profile_category_id], (before[0] - 1, before[1] - domain.item_count))
+
+    def test_counts_after_deleting_an_item(self):
+        item = ProfileItem.objects.filter(profile=self.profile).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/items/items/{item.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.listed_counts(), self.real_counts())
@@ -2,18 +2,20 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
 from django.shortcuts import get_object_or_404
-from profiles.models import Profile, SharedProfilePermission
+from profiles.models import Profile
+from profiles.permissions import ProfilePermissionMixin
 from profiles.serializers import ProfileCategorySerializer
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from ProfileCategory.models import ProfileCategory
+from profiles.conditional import not_modified_response, profile_validators, with_validators
 from .translation_utils import translation_service
 
 
 
 
 
-class ProfileCategoryViewSet(viewsets.ViewSet):
+class ProfileCategoryViewSet(ProfilePermissionMixin, viewsets.ViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -40,27 +42,6 @@ class ProfileCategoryViewSet(viewsets.ViewSet):
             }
         })
 
-    def _check_view_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='view'
-        ).exists()
-
-    def _check_edit_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='edit'
-        ).exists()
-
-    def _check_delete_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='delete'
-        ).exists()
-
     def list(self, request):
         try:
             profile_id = request.query_params.get('profile_id')
@@ -73,12 +54,17 @@ class ProfileCategoryViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-            categories = ProfileCategory.objects.filter(profile=profile)
+            validators = profile_validators(profile)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
+            categories = ProfileCategory.objects.filter(profile=profile).with_counts()
             serializer = ProfileCategorySerializer(categories, many=True)
-            return Response(
+            return with_validators(Response(
                 {'message': 'Categories retrieved successfully', 'data': serializer.data},
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -87,8 +73,13 @@ class ProfileCategoryViewSet(viewsets.ViewSet):
             category = get_object_or_404(ProfileCategory, pk=pk)
             if not self._check_view_permission(category.profile, request.user):
                 return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+            validators = profile_validators(category.profile)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
             serializer = ProfileCategorySerializer(category)
-            return Response(serializer.data)
+            return with_validators(Response(serializer.data), validators)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from ProfileCategory.models import ProfileCategory
+from ProfileDomain.metrics import recount_rollups
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import ProfileItem
+from profiles.models import Profile
+
+ROLLUP_CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Fix drift in the incremental domain counters (item_count, acquis_count, acquis_percentage) "
+        "and, with --rollups, recount the category and profile rollups."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted domains without updating them.")
+        parser.add_argument('--rollups', action='store_true', help="Also recount category and profile rollups.")
+
+    def handle(self, *args, **options):
+        # One GROUP BY over profile_item gives the true counters for every domain
+        actual = {
+            row['profile_domain_id']: (row['total'], row['acquis'])
+            for row in ProfileItem.objects.order_by().values('profile_domain_id').annotate(
+                total=Count('id'),
+                acquis=Count('id', filter=Q(etat='ACQUIS')),
+            )
+        }
+
+        drifted = []
+        for domain in ProfileDomain.objects.only('id', 'item_count', 'acquis_count', 'acquis_percentage').iterator():
+            total, acquis = actual.get(domain.id, (0, 0))
+            percentage = (acquis / total * 100) if total > 0 else 0.0
+            if (domain.item_count, domain.acquis_count) != (total, acquis) or abs(domain.acquis_percentage - percentage) > 1e-6:
+                domain.item_count = total
+                domain.acquis_count = acquis
+                domain.acquis_percentage = percentage
+                drifted.append(domain)
+
+        if drifted and not options['dry_run']:
+            ProfileDomain.objects.bulk_update(drifted, ['item_count', 'acquis_count', 'acquis_percentage'], batch_size=500)
+
+        verb = "Found" if options['dry_run'] else "Reconciled"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(drifted)} drifted domain(s)."))
+
+        if options['rollups'] and not options['dry_run']:
+            category_ids = list(ProfileCategory.objects.values_list('id', flat=True))
+            for start in range(0, len(category_ids), ROLLUP_CHUNK_SIZE):
+                recount_rollups(category_ids=category_ids[start:start + ROLLUP_CHUNK_SIZE])
+            profile_ids = list(Profile.objects.values_list('id', flat=True))
+            for start in range(0, len(profile_ids), ROLLUP_CHUNK_SIZE):
+                recount_rollups(profile_ids=profile_ids[start:start + ROLLUP_CHUNK_SIZE])
+            self.stdout.write(self.style.SUCCESS(
+                f"Recounted rollups of {len(category_ids)} categorie(s) and {len(profile_ids)} profile(s)."
+            ))
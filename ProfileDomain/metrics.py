@@ -0,0 +1,342 @@
+from collections import Counter, defaultdict
+from datetime import date
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, Q, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from ProfileDomain.models import ProfileDomain
+
+# Counters stored on the domain itself; categories and profiles keep the full rollup
+DOMAIN_COUNT_FIELDS = ['item_count', 'acquis_count']
+
+
+def _rollup_models():
+    # Resolved lazily: ProfileCategory imports the item model, which imports this module
+    return apps.get_model('ProfileCategory', 'ProfileCategory'), apps.get_model('profiles', 'Profile')
+
+
+class _PendingMetrics:
+    """
+    Metric changes collected during the current transaction and applied once
+    at commit: counter deltas per domain, domains that need a full recount
+    (bulk writes that bypass the item signals), categories and profiles whose
+    rollups need a full recount (deleted domains and categories), evaluation
+    events, and the domains, categories and profiles whose content changed
+    (see touch()).
+
+    Deltas are applied before the recounts, which overwrite whatever the
+    deltas wrote to the same rows with exact counts.
+    """
+
+    def __init__(self):
+        self.deltas = defaultdict(Counter)
+        self.recount = set()
+        self.dirty_rollups = {'category': set(), 'profile': set()}
+        self.events = []
+        self.touched = {'domain': set(), 'category': set(), 'profile': set()}
+
+    def __call__(self):
+        if getattr(connection, '_pending_domain_metrics', None) is self:
+            del connection._pending_domain_metrics
+        apply_item_deltas({
+            domain_id: delta for domain_id, delta in self.deltas.items()
+            if domain_id not in self.recount
+        })
+        recompute_domain_metrics(self.recount)
+        recount_rollups(self.dirty_rollups['category'], self.dirty_rollups['profile'])
+        if self.events:
+            apps.get_model('ProfileItem', 'ItemEvaluation').objects.bulk_create(self.events)
+        bump_profile_versions(self.touched['domain'], self.touched['category'], self.touched['profile'])
+
+
+def _current_batch():
+    batch = getattr(connection, '_pending_domain_metrics', None)
+    # A rolled back transaction drops its on_commit callbacks, and with them the batch
+    if batch is not None and any(entry[1] is batch for entry in connection.run_on_commit):
+        return batch
+    batch = connection._pending_domain_metrics = _PendingMetrics()
+    transaction.on_commit(batch)
+    return batch
+
+
+def bump_profile_versions(domain_ids=(), category_ids=(), profile_ids=()):
+    """
+    Increment the version (and updated_at) of the profiles owning the given
+    domains, categories and profiles with a single UPDATE. Clients use the
+    version as an HTTP validator for everything under the profile.
+    """
+    if not (domain_ids or category_ids or profile_ids):
+        return
+    ProfileCategory, Profile = _rollup_models()
+    condition = Q(pk__in=list(profile_ids))
+    if category_ids:
+        condition |= Q(pk__in=ProfileCategory.objects.filter(pk__in=list(category_ids)).values('profile_id'))
+    if domain_ids:
+        condition |= Q(pk__in=ProfileDomain.objects.filter(pk__in=list(domain_ids)).values('profile_id'))
+    Profile.objects.filter(condition).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def touch(domain_id=None, category_id=None, profile_id=None):
+    """
+    Record that content under a domain, category or profile changed, so the
+    owning profile's version is bumped once per transaction (right away in
+    autocommit mode).
+    """
+    if not connection.in_atomic_block:
+        bump_profile_versions(
+            [domain_id] if domain_id else (),
+            [category_id] if category_id else (),
+            [profile_id] if profile_id else (),
+        )
+        return
+    touched = _current_batch().touched
+    for level, pk in [('domain', domain_id), ('category', category_id), ('profile', profile_id)]:
+        if pk is not None:
+            touched[level].add(pk)
+
+
+def _percentage(acquis, total, output_field=FloatField()):
+    return Coalesce(
+        ExpressionWrapper(acquis * Value(100.0) / NullIf(total, 0), output_field=FloatField()),
+        Value(0.0),
+        output_field=output_field,
+    )
+
+
+def apply_item_deltas(deltas):
+    """
+    Apply summed item counter deltas {domain_id: Counter} with one atomic
+    F-expression UPDATE per domain, category and profile.
+
+    Derived values (acquis_percentage, evaluation_score) are listed first in
+    each UPDATE so they are computed from the old counters plus the deltas on
+    every backend (MySQL evaluates SET clauses left to right with
+    already-updated values).
+    """
+    deltas = {domain_id: delta for domain_id, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return
+    ProfileCategory, Profile = _rollup_models()
+    category_deltas = defaultdict(Counter)
+    profile_deltas = defaultdict(Counter)
+    owners = ProfileDomain.objects.filter(pk__in=deltas.keys()).values_list(
+        'id', 'profile_category_id', 'profile_id'
+    )
+    today = date.today()
+    for domain_id, category_id, profile_id in owners:
+        delta = deltas[domain_id]
+        category_deltas[category_id].update(delta)
+        profile_deltas[profile_id].update(delta)
+        if any(delta[field] for field in DOMAIN_COUNT_FIELDS):
+            new_total = F('item_count') + delta['item_count']
+            new_acquis = F('acquis_count') + delta['acquis_count']
+            ProfileDomain.objects.filter(pk=domain_id).update(
+                acquis_percentage=_percentage(new_acquis, new_total),
+                item_count=new_total,
+                acquis_count=new_acquis,
+                last_evaluation_date=today,
+            )
+
+    for category_id, delta in category_deltas.items():
+        changes = {field: F(field) + value for field, value in delta.items() if value}
+        if changes:
+            ProfileCategory.objects.filter(pk=category_id).update(**changes)
+
+    for profile_id, delta in profile_deltas.items():
+        changes = {field: F(field) + value for field, value in delta.items() if value}
+        if changes:
+            Profile.objects.filter(pk=profile_id).update(
+                evaluation_score=Cast(
+                    _percentage(F('acquis_count') + delta['acquis_count'], F('item_count') + delta['item_count']),
+                    IntegerField(),
+                ),
+                **changes
+            )
+
+
+def _state_counters(state):
+    """Counters contributed by one item in state (etat, isPeu, done)."""
+    etat, is_peu, done = state
+    counters = Counter({'item_count': 1, 'peu_count': int(bool(is_peu)), 'done_count': int(bool(done))})
+    field = apps.get_model('profiles', 'Profile').ETAT_COUNT_FIELDS.get(etat)
+    if field:
+        counters[field] += 1
+    return counters
+
+
+def record_item_change(domain_id, old_state, new_state):
+    """
+    Turn one item transition into counter deltas for its domain, category
+    and profile. States are (etat, isPeu, done) tuples, None for an item
+    that did not exist before (created) or no longer exists (deleted).
+
+    Inside a transaction the deltas are summed per domain and applied once at
+    commit; in autocommit mode they are applied right away.
+    """
+    if domain_id is None:
+        return
+    touch(domain_id=domain_id)
+    delta = Counter()
+    if new_state is not None:
+        delta.update(_state_counters(new_state))
+    if old_state is not None:
+        delta.subtract(_state_counters(old_state))
+    if not any(delta.values()):
+        return
+    if not connection.in_atomic_block:
+        apply_item_deltas({domain_id: delta})
+        return
+    _current_batch().deltas[domain_id].update(delta)
+
+
+def mark_domain_dirty(domain_id):
+    """
+    Schedule a full recount for a domain whose items changed without going
+    through the item signals (bulk_create, bulk_update, queryset updates).
+    """
+    if domain_id is None:
+        return
+    touch(domain_id=domain_id)
+    if not connection.in_atomic_block:
+        recompute_domain_metrics([domain_id])
+        return
+    _current_batch().recount.add(domain_id)
+
+
+def mark_rollups_dirty(category_id=None, profile_id=None):
+    """
+    Schedule a full recount of a category and/or profile rollup, for changes
+    whose item deltas cannot be attributed anymore (deleted domains and
+    categories).
+    """
+    category_ids = [category_id] if category_id is not None else []
+    profile_ids = [profile_id] if profile_id is not None else []
+    if not connection.in_atomic_block:
+        recount_rollups(category_ids, profile_ids)
+        return
+    pending = _current_batch().dirty_rollups
+    pending['category'].update(category_ids)
+    pending['profile'].update(profile_ids)
+
+
+def record_evaluation(event):
+    """
+    Queue an unsaved ItemEvaluation. Inside a transaction the events are
+    written with one multi-row INSERT at commit, together with the counter
+    deltas; item saves and deletes always run in one (see ProfileItem.save).
+    Outside a transaction the event is saved right away.
+    """
+    if not connection.in_atomic_block:
+        event.save()
+        return
+    _current_batch().events.append(event)
+
+
+@receiver(post_delete, sender=ProfileDomain)
+def forget_deleted_domain(sender, instance, **kwargs):
+    """
+    Drop pending work for a domain removed in the same transaction, and
+    recount its category and profile: the item deltas of the cascade were
+    queued under the domain, which no longer leads to its owners.
+    """
+    batch = getattr(connection, '_pending_domain_metrics', None)
+    if batch is not None:
+        batch.deltas.pop(instance.pk, None)
+        batch.recount.discard(instance.pk)
+        batch.touched['domain'].discard(instance.pk)
+        batch.events = [event for event in batch.events if event.domain_id != instance.pk]
+    mark_rollups_dirty(category_id=instance.profile_category_id, profile_id=instance.profile_id)
+    touch(category_id=instance.profile_category_id)
+
+
+@receiver(post_delete, sender='ProfileCategory.ProfileCategory')
+def recount_deleted_category_profile(sender, instance, **kwargs):
+    mark_rollups_dirty(profile_id=instance.profile_id)
+
+
+@receiver(post_save, sender=ProfileDomain)
+def touch_saved_domain(sender, instance, **kwargs):
+    touch(category_id=instance.profile_category_id)
+
+
+@receiver(post_save, sender='ProfileCategory.ProfileCategory')
+@receiver(post_delete, sender='ProfileCategory.ProfileCategory')
+def touch_category_profile(sender, instance, **kwargs):
+    touch(profile_id=instance.profile_id)
+
+
+@receiver(post_save, sender='profiles.SharedProfilePermission')
+@receiver(post_delete, sender='profiles.SharedProfilePermission')
+def touch_shared_profile(sender, instance, **kwargs):
+    touch(profile_id=instance.profile_id)
+
+
+def _rollup_annotations(items_path):
+    """Count annotations computing a full rollup through the given relation path to items."""
+    Profile = apps.get_model('profiles', 'Profile')
+    annotations = {'rollup_item_count': Count(items_path)}
+    for etat, field in Profile.ETAT_COUNT_FIELDS.items():
+        annotations[f'rollup_{field}'] = Count(items_path, filter=Q(**{f'{items_path}__etat': etat}))
+    annotations['rollup_peu_count'] = Count(items_path, filter=Q(**{f'{items_path}__isPeu': True}))
+    annotations['rollup_done_count'] = Count(items_path, filter=Q(**{f'{items_path}__done': True}))
+    return annotations
+
+
+def recount_rollups(category_ids=(), profile_ids=()):
+    """Recount category and profile rollups with one aggregate query per level."""
+    ProfileCategory, Profile = _rollup_models()
+    for model, ids, items_path in [
+        (ProfileCategory, set(category_ids), 'domains__items'),
+        (Profile, set(profile_ids), 'categories__domains__items'),
+    ]:
+        if not ids:
+            continue
+        objs = []
+        for row in model.objects.filter(pk__in=ids).annotate(**_rollup_annotations(items_path)).values(
+            'id', *[f'rollup_{field}' for field in Profile.ROLLUP_FIELDS]
+        ):
+            obj = model(pk=row['id'], **{field: row[f'rollup_{field}'] for field in Profile.ROLLUP_FIELDS})
+            fields = list(Profile.ROLLUP_FIELDS)
+            if model is Profile:
+                obj.evaluation_score = int(obj.acquis_count * 100 / obj.item_count) if obj.item_count else 0
+                fields.append('evaluation_score')
+            objs.append(obj)
+        if objs:
+            model.objects.bulk_update(objs, fields)
+
+
+def recompute_domain_metrics(domain_ids):
+    """
+    Recount item_count, acquis_count and acquis_percentage for several
+    domains with one aggregate query, then recount the rollups of their
+    categories and profiles.
+    """
+    domain_ids = set(domain_ids)
+    if not domain_ids:
+        return
+    rows = ProfileDomain.objects.filter(pk__in=domain_ids).annotate(
+        total_items=Count('items'),
+        acquis_items=Count('items', filter=Q(items__etat='ACQUIS')),
+    ).values_list('id', 'profile_category_id', 'profile_id', 'total_items', 'acquis_items')
+    today = date.today()
+    domains = []
+    category_ids = set()
+    profile_ids = set()
+    for domain_id, category_id, profile_id, total_items, acquis_items in rows:
+        domains.append(ProfileDomain(
+            pk=domain_id,
+            item_count=total_items,
+            acquis_count=acquis_items,
+            acquis_percentage=(acquis_items / total_items * 100) if total_items > 0 else 0.0,
+            last_evaluation_date=today,
+        ))
+        category_ids.add(category_id)
+        profile_ids.add(profile_id)
+    if domains:
+        ProfileDomain.objects.bulk_update(
+            domains, ['item_count', 'acquis_count', 'acquis_percentage', 'last_evaluation_date']
+        )
+    recount_rollups(category_ids, profile_ids)
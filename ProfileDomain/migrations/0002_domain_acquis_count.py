@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 15:11
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_acquis_count(apps, schema_editor):
+    ProfileDomain = apps.get_model('ProfileDomain', 'ProfileDomain')
+    ProfileItem = apps.get_model('ProfileItem', 'ProfileItem')
+    rows = ProfileItem.objects.order_by().values('profile_domain_id').annotate(
+        acquis=Count('id', filter=Q(etat='ACQUIS'))
+    ).filter(acquis__gt=0)
+    domains = [ProfileDomain(pk=row['profile_domain_id'], acquis_count=row['acquis']) for row in rows]
+    ProfileDomain.objects.bulk_update(domains, ['acquis_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileDomain', '0001_initial'),
+        ('ProfileItem', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profiledomain',
+            name='acquis_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_acquis_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 15:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_profile(apps, schema_editor):
+    ProfileCategory = apps.get_model('ProfileCategory', 'ProfileCategory')
+    ProfileDomain = apps.get_model('ProfileDomain', 'ProfileDomain')
+    ProfileDomain.objects.update(profile_id=Subquery(
+        ProfileCategory.objects.filter(pk=OuterRef('profile_category_id')).values('profile_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileCategory', '0002_progress_rollups'),
+        ('ProfileDomain', '0002_domain_acquis_count'),
+        ('profiles', '0005_permission_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profiledomain',
+            name='profile',
+            field=models.ForeignKey(db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='profiles.profile'),
+        ),
+        migrations.RunPython(backfill_profile, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='profiledomain',
+            name='profile',
+            field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='profiles.profile'),
+        ),
+    ]
@@ -1,13 +1,25 @@
 from django.db import models
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 class ProfileDomain(models.Model):
     profile_category = models.ForeignKey('ProfileCategory.ProfileCategory', on_delete=models.CASCADE, related_name='domains')
+    # Owning profile, copied from the category so profile-scoped reads need no
+    # joins; rows are deleted through the category cascade
+    profile = models.ForeignKey(
+        'profiles.Profile',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        editable=False,
+    )
     name = models.CharField(max_length=100)
     name_ar = models.CharField(max_length=100, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     description_ar = models.TextField(blank=True, null=True)
     item_count = models.PositiveIntegerField(default=0, editable=False)
+    acquis_count = models.PositiveIntegerField(default=0, editable=False)
     acquis_percentage = models.FloatField(default=0.0, editable=False)
     start_date = models.DateField(default=timezone.now)
     last_evaluation_date = models.DateField(auto_now=True)
@@ -15,14 +27,11 @@ class ProfileDomain(models.Model):
     def __str__(self):
         return f"{self.name} (Category: {self.profile_category})"
 
-    def update_metrics(self):
-        """Update item_count, acquis_percentage, and last_evaluation_date."""
-        items = self.items.all()
-        total_items = items.count()
-        acquis_items = items.filter(etat='ACQUIS').count()
-        self.item_count = total_items
-        self.acquis_percentage = (acquis_items / total_items * 100) if total_items > 0 else 0.0
-        self.save()
-
     class Meta:
-        db_table = 'profile_domain'
\ No newline at end of file
+        db_table = 'profile_domain'
+
+
+@receiver(pre_save, sender=ProfileDomain)
+def fill_domain_profile(sender, instance, **kwargs):
+    if instance.profile_id is None:
+        instance.profile_id = instance.profile_category.profile_id
@@ -6,6 +6,11 @@ from ProfileItem.models import ProfileItem
 
 
 class ProfileItemSerializer(serializers.ModelSerializer):
+    # Template items keep their text on the shared catalog row
+    name = serializers.CharField(source='resolved_name', read_only=True)
+    name_ar = serializers.CharField(source='resolved_name_ar', read_only=True)
+    description = serializers.CharField(source='resolved_description', read_only=True)
+    description_ar = serializers.CharField(source='resolved_description_ar', read_only=True)
     class Meta:
         model = ProfileItem
         fields = ['id', 'name', 'name_ar', 'description', 'description_ar', 'etat', 'is_modified', 'modified_at', 'commentaire', 'commentaire_ar']
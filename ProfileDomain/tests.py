@@ -1,3 +1,131 @@
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ProfileCategory.models import ProfileCategory
+from ProfileDomain.metrics import _rollup_annotations, mark_domain_dirty
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import ProfileItem
+from profiles.models import Profile, ProgressRollup
+from profiles.provisioning import provision_profile
+from profiles.template_catalog import get_template
+from profiles.testing import ProvisionedProfileTestCase
 
-# Create your tests here.
+
+class RollupTestCase(ProvisionedProfileTestCase):
+    """A provisioned profile whose stored counters can be checked against real counts."""
+
+    def assertRollupsExact(self):
+        for model, items_path, queryset in [
+            (ProfileCategory, 'domains__items', ProfileCategory.objects.filter(profile=self.profile)),
+            (Profile, 'categories__domains__items', Profile.objects.filter(pk=self.profile.pk)),
+        ]:
+            for row in queryset.annotate(**_rollup_annotations(items_path)).values():
+                for field in ProgressRollup.ROLLUP_FIELDS:
+                    self.assertEqual(row[field], row[f'rollup_{field}'], f'{model.__name__} {row["id"]} {field}')
+        for domain in ProfileDomain.objects.filter(profile=self.profile):
+            self.assertEqual(domain.item_count, domain.items.count(), domain.name)
+
+    def largest_domain(self):
+        return max(ProfileDomain.objects.filter(profile=self.profile), key=lambda domain: domain.item_count)
+
+
+class RollupDeleteTests(RollupTestCase):
+    """Category and profile rollups stay exact when domains and categories are deleted."""
+
+    def test_provisioned_rollups_are_exact(self):
+        self.assertRollupsExact()
+
+    def test_delete_domain(self):
+        domain = self.largest_domain()
+        category = domain.profile_category
+        self.profile.refresh_from_db()
+        items_before = self.profile.item_count
+        with self.captureOnCommitCallbacks(execute=True):
+            domain.delete()
+        category.refresh_from_db()
+        self.profile.refresh_from_db()
+        self.assertEqual(category.item_count, ProfileItem.objects.filter(profile_domain__profile_category=category).count())
+        self.assertEqual(self.profile.item_count, items_before - domain.item_count)
+        self.assertRollupsExact()
+
+    def test_delete_category(self):
+        category = ProfileCategory.objects.filter(profile=self.profile).order_by('-item_count').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            category.delete()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.item_count, ProfileItem.objects.filter(profile=self.profile).count())
+        self.assertRollupsExact()
+
+    def test_deltas_and_recounts_in_one_transaction(self):
+        # A bulk write recounts one domain while a single save in the same
+        # category is applied as a delta; neither may be counted twice
+        first, second = ProfileDomain.objects.filter(profile=self.profile).order_by('profile_category_id', 'id')[:2]
+        self.assertEqual(first.profile_category_id, second.profile_category_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                ProfileItem.objects.filter(profile_domain=first).update(etat='ACQUIS')
+                mark_domain_dirty(first.pk)
+                item = ProfileItem.objects.filter(profile_domain=second).exclude(etat='ACQUIS').first()
+                item.etat = 'ACQUIS'
+                item.save()
+        self.assertRollupsExact()
+
+
+class OwningProfileTests(TestCase):
+    """Domains and items carry their profile_id however they are inserted."""
+
+    def test_single_saves_copy_the_parent_profile(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = Profile.objects.create(first_name='Owner', last_name='Test', birth_date='2015-01-01')
+            category = ProfileCategory.objects.create(profile=profile, name='Category')
+            domain = ProfileDomain.objects.create(profile_category=category, name='Domain')
+            item = ProfileItem.objects.create(profile_domain=domain, name='Item')
+        self.assertEqual(domain.profile_id, profile.pk)
+        self.assertEqual(item.profile_id, profile.pk)
+
+    def test_bulk_inserts_match_the_hierarchy(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = Profile.objects.create(first_name='Owner', last_name='Test', birth_date='2015-01-01')
+            provision_profile(profile, get_template('kids'))
+        domains = ProfileDomain.objects.filter(profile_category__profile=profile)
+        items = ProfileItem.objects.filter(profile_domain__profile_category__profile=profile)
+        self.assertTrue(items.exists())
+        self.assertFalse(domains.exclude(profile=profile).exists())
+        self.assertFalse(items.exclude(profile=profile).exists())
+
+
+class MetricsBatchTests(RollupTestCase):
+    """Item writes in one transaction update the stored metrics once, at commit."""
+
+    def setUp(self):
+        super().setUp()
+        self.domain = self.largest_domain()
+        self.items = list(ProfileItem.objects.filter(profile_domain=self.domain).exclude(etat='ACQUIS')[:3])
+
+    def test_many_saves_one_flush(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    for item in self.items:
+                        item.etat = 'ACQUIS'
+                        item.save()
+        self.assertEqual(len(callbacks), 1)
+        update = f'UPDATE {connection.ops.quote_name(ProfileDomain._meta.db_table)}'
+        domain_updates = [query for query in queries if query['sql'].startswith(update)]
+        self.assertEqual(len(domain_updates), 1)
+        self.assertRollupsExact()
+
+    def test_rolled_back_changes_are_not_applied(self):
+        self.domain.refresh_from_db()
+        acquis_before = self.domain.acquis_count
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.items[0].etat = 'ACQUIS'
+                    self.items[0].save()
+                    raise RuntimeError
+            item = self.items[1]
+            item.etat = 'ACQUIS'
+            item.save()
+        self.domain.refresh_from_db()
+        self.assertEqual(self.domain.acquis_count, acquis_before + 1)
@@ -2,17 +2,20 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
 from django.shortcuts import get_object_or_404
-from profiles.models import  SharedProfilePermission
+from profiles.permissions import ProfilePermissionMixin
 from ProfileCategory.models import ProfileCategory
 from ProfileDomain.models import  ProfileDomain
+from profiles.conditional import not_modified_response, profile_validators, with_validators
 from profiles.serializers import  ProfileDomainSerializer
 from rest_framework import status, viewsets
 from django.db.models import Q, Count, F
 from rest_framework.decorators import action
+from backend.pagination import KeysetPagination
+from rest_framework.exceptions import ValidationError
 from .translation_utils import translation_service
 
 
-class ProfileDomainViewSet(viewsets.ViewSet):
+class ProfileDomainViewSet(ProfilePermissionMixin, viewsets.ViewSet):
     def get_queryset(self):
         # Handle the nested case for categories/2/domains/
         if 'categories_id' in self.kwargs:
@@ -21,26 +24,6 @@ class ProfileDomainViewSet(viewsets.ViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
-    def _check_view_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='view'
-        ).exists()
-
-    def _check_edit_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='edit'
-        ).exists()
-
-    def _check_delete_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='delete'
-        ).exists()
     @action(detail=False, methods=['get'], url_path='specific-items')
     def list_domains_with_specific_items(self, request):
         try:
@@ -55,6 +38,11 @@ class ProfileDomainViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
+            validators = profile_validators(profile)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
             # Get domains with at least one item where etat != 'NON_COTE'
             # and not all items are 'ACQUIS'
             domains = ProfileDomain.objects.filter(
@@ -69,13 +57,13 @@ class ProfileDomainViewSet(viewsets.ViewSet):
             ).distinct()
 
             serializer = ProfileDomainSerializer(domains, many=True)
-            return Response(
+            return with_validators(Response(
                 {
                     'message': 'Domains with specific item states retrieved successfully',
                     'data': serializer.data
                 },
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     def list(self, request):
@@ -91,12 +79,26 @@ class ProfileDomainViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
+            validators = profile_validators(profile)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
             domains = ProfileDomain.objects.filter(profile_category=category)
+            paginator = KeysetPagination(ordering=('id',))
+            page = paginator.paginate_queryset(domains, request)
+            if page is not None:
+                serializer = ProfileDomainSerializer(page, many=True)
+                return with_validators(
+                    paginator.get_paginated_response(serializer.data, 'Domains retrieved successfully'), validators
+                )
             serializer = ProfileDomainSerializer(domains, many=True)
-            return Response(
+            return with_validators(Response(
                 {'message': 'Domains retrieved successfully', 'data': serializer.data},
                 status=status.HTTP_200_OK
-            )
+            ), validators)
+        except ValidationError as ve:
+            return Response({'error': ve.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -150,8 +152,8 @@ class ProfileDomainViewSet(viewsets.ViewSet):
         print(f"Request method: {request.method}")
         print(f"Request data: {request.data}")
         try:
-            domain = get_object_or_404(ProfileDomain, pk=pk)
-            profile = domain.profile_category.profile
+            domain = get_object_or_404(ProfileDomain.objects.select_related('profile'), pk=pk)
+            profile = domain.profile
             print(f"Found domain: {domain.id}, profile: {profile.id}")
             
             if not self._check_edit_permission(profile, request.user):
@@ -259,8 +261,8 @@ class ProfileDomainViewSet(viewsets.ViewSet):
 
     def destroy(self, request, pk=None):
         try:
-            domain = get_object_or_404(ProfileDomain, pk=pk)
-            profile = domain.profile_category.profile
+            domain = get_object_or_404(ProfileDomain.objects.select_related('profile'), pk=pk)
+            profile = domain.profile
 
             if not self._check_delete_permission(profile, request.user):
                 return Response(
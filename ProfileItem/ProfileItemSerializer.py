@@ -2,6 +2,11 @@ from rest_framework import serializers
 from ProfileItem.models import ProfileItem
 
 class ProfileItemSerializer(serializers.ModelSerializer):
+    # Template items keep their text on the shared catalog row
+    name = serializers.CharField(source='resolved_name', read_only=True)
+    name_ar = serializers.CharField(source='resolved_name_ar', read_only=True)
+    description = serializers.CharField(source='resolved_description', read_only=True)
+    description_ar = serializers.CharField(source='resolved_description_ar', read_only=True)
     profile_domain_name = serializers.CharField(source='profile_domain.name', read_only=True)
     profile_category_name = serializers.CharField(source='profile_domain.profile_category.name', read_only=True)
 
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.utils import timezone
+from ProfileDomain.metrics import record_evaluation, record_item_change
+from ProfileItem.models import ItemEvaluation, PendingTranslation, ProfileItem
+
+# Fields a batch evaluation may change, besides the comments
+EVALUATION_FIELDS = ['etat', 'isPeu', 'done']
+COMMENT_FIELDS = ['commentaire', 'commentaire_ar']
+
+
+def validate_evaluations(changes):
+    """
+    Check a list of {id, etat, isPeu, done, commentaire, commentaire_ar}
+    changes and return them keyed by item id. Raises ValueError on malformed
+    input.
+    """
+    if not isinstance(changes, list) or not changes:
+        raise ValueError('items must be a non-empty list')
+    etats = [choice[0] for choice in ProfileItem.ETAT_CHOICES]
+    by_id = {}
+    for change in changes:
+        if not isinstance(change, dict) or 'id' not in change:
+            raise ValueError('Each change must be an object with an id')
+        try:
+            item_id = int(change['id'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid item id: {change['id']}")
+        if 'etat' in change and change['etat'] not in etats:
+            raise ValueError(f"Invalid etat for item {item_id}. Must be one of: {', '.join(etats)}")
+        for field in COMMENT_FIELDS:
+            if change.get(field) is not None and not isinstance(change[field], str):
+                raise ValueError(f'{field} of item {item_id} must be a string')
+        if item_id in by_id:
+            raise ValueError(f'Item {item_id} appears more than once')
+        by_id[item_id] = change
+    return by_id
+
+
+def apply_evaluations(changes, user):
+    """
+    Apply validated changes {item_id: change} with a single bulk_update and
+    return the updated items.
+
+    The items are locked and read inside the transaction, so each counter
+    delta starts from the stored state and concurrent writes to the same
+    items wait for each other. Counter deltas and evaluation events go
+    through the pending metrics batch, so each affected domain, category and
+    profile is updated once and the events are written with one INSERT when
+    the transaction commits. A comment changed on one language side only
+    clears the other side, unless the change supplies it too, and is queued
+    for translation (PendingTranslation).
+    """
+    now = timezone.now()
+    fields = {'is_modified', 'modified_at'}
+    pending = []
+    with transaction.atomic():
+        item_ids = sorted(changes)
+        # Lock without joins: catalog rows are shared by every profile
+        list(ProfileItem.objects.select_for_update().filter(pk__in=item_ids).order_by('id').values_list('id', flat=True))
+        items = list(ProfileItem.objects.filter(pk__in=item_ids).order_by('id'))
+        for item in items:
+            change = changes[item.pk]
+            old_state = item._loaded_state
+            for field in EVALUATION_FIELDS:
+                if field in change:
+                    setattr(item, field, change[field] if field == 'etat' else bool(change[field]))
+                    fields.add(field)
+            comments = {
+                field: (change[field] or '').strip() for field in COMMENT_FIELDS
+                if field in change and (change[field] or '').strip() != (getattr(item, field) or '')
+            }
+            if comments:
+                for field in COMMENT_FIELDS:
+                    if field in comments:
+                        setattr(item, field, comments[field])
+                    elif field not in change:
+                        # The other language side no longer translates the new text
+                        setattr(item, field, '')
+                if _needs_translation(item):
+                    pending.append(PendingTranslation(item=item, field='commentaire'))
+                item.refresh_search_text()
+                fields.update(COMMENT_FIELDS + ['search_text'])
+            item.is_modified = True
+            item.modified_at = now
+
+            new_state = item.counter_state()
+            record_item_change(item.profile_domain_id, old_state, new_state)
+            if old_state[0] != new_state[0]:
+                record_evaluation(ItemEvaluation(
+                    item_id=item.pk,
+                    domain_id=item.profile_domain_id,
+                    old_etat=old_state[0],
+                    new_etat=item.etat,
+                    evaluated_by=user,
+                    created_at=now,
+                ))
+            item._loaded_state = new_state
+        ProfileItem.objects.bulk_update(items, sorted(fields))
+        PendingTranslation.objects.bulk_create(pending, ignore_conflicts=True)
+    return items
+
+
+def _needs_translation(item):
+    return bool(item.commentaire) != bool(item.commentaire_ar)
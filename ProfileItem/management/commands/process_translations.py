@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ProfileDomain.metrics import touch
+from ProfileItem.models import PendingTranslation, ProfileItem
+from ProfileItem.translation_utils import translation_service
+
+CHUNK_SIZE = 100
+
+
+def _get(item, name):
+    if name in ProfileItem.CATALOG_TEXT_FIELDS:
+        return item.get_text(name)
+    return getattr(item, name)
+
+
+def _set(item, name, value):
+    if name in ProfileItem.CATALOG_TEXT_FIELDS:
+        item.set_text(name, value)
+    else:
+        setattr(item, name, value)
+
+
+class Command(BaseCommand):
+    help = "Translate item text queued by bulk imports (PendingTranslation) and clear the queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Process at most this many queued entries.")
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        processed = 0
+        translated = 0
+        while limit is None or processed < limit:
+            size = CHUNK_SIZE if limit is None else min(CHUNK_SIZE, limit - processed)
+            pending = list(PendingTranslation.objects.select_related('item__catalog_item').order_by('id')[:size])
+            if not pending:
+                break
+
+            fields_by_item = {}
+            items = {}
+            for entry in pending:
+                items[entry.item_id] = entry.item
+                fields_by_item.setdefault(entry.item_id, []).append(entry.field)
+
+            changed_fields = set()
+            for item_id, fields in fields_by_item.items():
+                item = items[item_id]
+                data = {}
+                for field in fields:
+                    data[field] = _get(item, field)
+                    data[f'{field}_ar'] = _get(item, f'{field}_ar')
+                data = translation_service.auto_translate_fields(data, fields)
+                for field in fields:
+                    for name in (field, f'{field}_ar'):
+                        if data.get(name) != _get(item, name):
+                            _set(item, name, data[name])
+                            changed_fields.add(name)
+                            translated += 1
+
+            with transaction.atomic():
+                if changed_fields:
+                    for item in items.values():
+                        item.refresh_search_text()
+                    ProfileItem.objects.bulk_update(items.values(), sorted(changed_fields | {'search_text'}))
+                    for item in items.values():
+                        touch(domain_id=item.profile_domain_id)
+                PendingTranslation.objects.filter(pk__in=[entry.pk for entry in pending]).delete()
+            processed += len(pending)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} queued translation(s), {translated} field(s) translated."
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 15:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileItem', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('template', models.CharField(max_length=20)),
+                ('digest', models.CharField(max_length=40, unique=True)),
+                ('name', models.CharField(max_length=500)),
+                ('name_ar', models.CharField(blank=True, max_length=500, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('description_ar', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'item_catalog',
+            },
+        ),
+        migrations.AlterField(
+            model_name='profileitem',
+            name='name',
+            field=models.CharField(blank=True, max_length=500, null=True),
+        ),
+        migrations.AddField(
+            model_name='profileitem',
+            name='catalog_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='profile_items', to='ProfileItem.catalogitem'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 15:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileDomain', '0002_domain_acquis_count'),
+        ('ProfileItem', '0002_item_catalog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemEvaluation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_etat', models.CharField(blank=True, choices=[('ACQUIS', 'Acquis'), ('PARTIEL', 'Partiel'), ('NON_ACQUIS', 'Non Acquis'), ('NON_COTE', 'Non Coté')], max_length=10, null=True)),
+                ('new_etat', models.CharField(choices=[('ACQUIS', 'Acquis'), ('PARTIEL', 'Partiel'), ('NON_ACQUIS', 'Non Acquis'), ('NON_COTE', 'Non Coté')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('domain', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='evaluations', to='ProfileDomain.profiledomain')),
+                ('evaluated_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='item_evaluations', to=settings.AUTH_USER_MODEL)),
+                ('item', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='evaluations', to='ProfileItem.profileitem')),
+            ],
+            options={
+                'db_table': 'item_evaluation',
+                'indexes': [models.Index(fields=['domain', 'created_at'], name='item_eval_domain_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 15:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileItem', '0003_item_evaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingTranslation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('name', 'Name'), ('description', 'Description'), ('commentaire', 'Commentaire')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_translations', to='ProfileItem.profileitem')),
+            ],
+            options={
+                'db_table': 'item_pending_translation',
+                'unique_together': {('item', 'field')},
+            },
+        ),
+    ]
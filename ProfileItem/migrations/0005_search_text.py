@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 15:28
+
+from django.db import migrations, models
+from backend.search import create_fulltext_index, drop_fulltext_index, normalize_text
+
+
+def backfill_search_text(apps, schema_editor):
+    CatalogItem = apps.get_model('ProfileItem', 'CatalogItem')
+    ProfileItem = apps.get_model('ProfileItem', 'ProfileItem')
+    catalog_items = []
+    for catalog_item in CatalogItem.objects.iterator(chunk_size=2000):
+        catalog_item.search_text = normalize_text(
+            catalog_item.name, catalog_item.name_ar, catalog_item.description, catalog_item.description_ar
+        )
+        catalog_items.append(catalog_item)
+    CatalogItem.objects.bulk_update(catalog_items, ['search_text'], batch_size=500)
+
+    items = []
+    for item in ProfileItem.objects.exclude(
+        name__isnull=True, name_ar__isnull=True, description__isnull=True, description_ar__isnull=True,
+        commentaire__isnull=True, commentaire_ar__isnull=True,
+    ).iterator(chunk_size=2000):
+        item.search_text = normalize_text(
+            item.name, item.name_ar, item.description, item.description_ar, item.commentaire, item.commentaire_ar
+        )
+        if item.search_text:
+            items.append(item)
+    ProfileItem.objects.bulk_update(items, ['search_text'], batch_size=500)
+
+
+def create_indexes(apps, schema_editor):
+    create_fulltext_index(schema_editor, 'item_catalog')
+    create_fulltext_index(schema_editor, 'profile_item')
+
+
+def drop_indexes(apps, schema_editor):
+    drop_fulltext_index(schema_editor, 'item_catalog')
+    drop_fulltext_index(schema_editor, 'profile_item')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileItem', '0004_pending_translation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogitem',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='profileitem',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
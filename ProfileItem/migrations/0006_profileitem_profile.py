@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 15:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from backend.search import create_fulltext_index
+
+
+def backfill_profile(apps, schema_editor):
+    ProfileDomain = apps.get_model('ProfileDomain', 'ProfileDomain')
+    ProfileItem = apps.get_model('ProfileItem', 'ProfileItem')
+    ProfileItem.objects.update(profile_id=Subquery(
+        ProfileDomain.objects.filter(pk=OuterRef('profile_domain_id')).values('profile_id')[:1]
+    ))
+
+
+def restore_fulltext_index(apps, schema_editor):
+    # SQLite rebuilds profile_item for the AlterField, dropping the FTS triggers
+    create_fulltext_index(schema_editor, 'profile_item')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileDomain', '0003_profiledomain_profile'),
+        ('ProfileItem', '0005_search_text'),
+        ('profiles', '0005_permission_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profileitem',
+            name='profile',
+            field=models.ForeignKey(db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='profiles.profile'),
+        ),
+        migrations.RunPython(backfill_profile, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='profileitem',
+            name='profile',
+            field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='profiles.profile'),
+        ),
+        migrations.RunPython(restore_fulltext_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileDomain', '0003_profiledomain_profile'),
+        ('ProfileItem', '0006_profileitem_profile'),
+        ('profiles', '0006_permission_lookup_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profileitem',
+            index=models.Index(fields=['profile_domain', 'etat'], name='profile_item_domain_etat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profileitem',
+            index=models.Index(fields=['profile_domain', 'isPeu'], name='profile_item_domain_peu_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileItem', '0007_item_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='itemevaluation',
+            name='new_etat',
+            field=models.CharField(blank=True, choices=[('ACQUIS', 'Acquis'), ('PARTIEL', 'Partiel'), ('NON_ACQUIS', 'Non Acquis'), ('NON_COTE', 'Non Coté')], max_length=10, null=True),
+        ),
+    ]
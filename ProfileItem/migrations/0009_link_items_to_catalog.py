@@ -0,0 +1,128 @@
+# Generated by Django 5.2 on 2026-10-18 18:05
+
+from collections import Counter
+
+from django.db import migrations
+from backend.search import normalize_text
+from profiles.template_catalog import TEMPLATE_FILES, get_template
+
+CATALOG_TEXT_FIELDS = ['name', 'name_ar', 'description', 'description_ar']
+
+
+def _template_matches():
+    """
+    Map the text identity of every template item (category, domain and item
+    text) to the templates it appears in, as {template_key: TemplateItem}.
+    """
+    matches = {}
+    for key in TEMPLATE_FILES:
+        template = get_template(key)
+        for template_category in template.categories:
+            for template_domain in template_category.domains:
+                for template_item in template_domain.items:
+                    match_key = (
+                        template_category.name, template_domain.name, template_item.name,
+                        template_item.name_ar, template_item.description, template_item.description_ar,
+                    )
+                    matches.setdefault(match_key, {}).setdefault(key, template_item)
+    return matches
+
+
+def link_items_to_catalog(apps, schema_editor):
+    """
+    Move items provisioned before the item catalog onto catalog rows.
+
+    An item is linked when its category, domain and text still match a
+    template item exactly; its copied text is then dropped in favour of the
+    catalog row. Items edited since provisioning keep their own text. As the
+    templates share items, each profile is matched against the template most
+    of its items come from.
+    """
+    CatalogItem = apps.get_model('ProfileItem', 'CatalogItem')
+    ProfileItem = apps.get_model('ProfileItem', 'ProfileItem')
+    matches = _template_matches()
+
+    profile_ids = (
+        ProfileItem.objects.filter(catalog_item__isnull=True, name__isnull=False)
+        .order_by().values_list('profile_id', flat=True).distinct()
+    )
+    for profile_id in list(profile_ids):
+        items = {}
+        for item in ProfileItem.objects.filter(
+            profile_id=profile_id, catalog_item__isnull=True, name__isnull=False,
+        ).select_related('profile_domain__profile_category'):
+            match_key = (
+                item.profile_domain.profile_category.name, item.profile_domain.name, item.name,
+                item.name_ar or '', item.description or '', item.description_ar or '',
+            )
+            if match_key in matches:
+                items[item] = matches[match_key]
+        if not items:
+            continue
+
+        template_key = Counter(key for candidates in items.values() for key in candidates).most_common(1)[0][0]
+        template_items = {
+            item: candidates[template_key] for item, candidates in items.items() if template_key in candidates
+        }
+        catalog_ids = dict(
+            CatalogItem.objects.filter(
+                digest__in=[template_item.digest for template_item in template_items.values()]
+            ).values_list('digest', 'id')
+        )
+        missing = {}
+        for template_item in template_items.values():
+            if template_item.digest not in catalog_ids:
+                missing[template_item.digest] = CatalogItem(
+                    template=template_key,
+                    digest=template_item.digest,
+                    name=template_item.name,
+                    name_ar=template_item.name_ar,
+                    description=template_item.description,
+                    description_ar=template_item.description_ar,
+                    search_text=normalize_text(
+                        template_item.name, template_item.name_ar,
+                        template_item.description, template_item.description_ar,
+                    ),
+                )
+        if missing:
+            CatalogItem.objects.bulk_create(missing.values(), ignore_conflicts=True)
+            catalog_ids.update(
+                CatalogItem.objects.filter(digest__in=missing.keys()).values_list('digest', 'id')
+            )
+
+        for item, template_item in template_items.items():
+            item.catalog_item_id = catalog_ids[template_item.digest]
+            for field in CATALOG_TEXT_FIELDS:
+                setattr(item, field, None)
+            item.search_text = normalize_text(item.commentaire, item.commentaire_ar)
+        ProfileItem.objects.bulk_update(
+            template_items, ['catalog_item', *CATALOG_TEXT_FIELDS, 'search_text'], batch_size=500
+        )
+
+
+def copy_catalog_text_back(apps, schema_editor):
+    """Give linked items their own copy of the catalog text again."""
+    ProfileItem = apps.get_model('ProfileItem', 'ProfileItem')
+    items = []
+    for item in ProfileItem.objects.filter(catalog_item__isnull=False).select_related('catalog_item').iterator(
+        chunk_size=2000
+    ):
+        for field in CATALOG_TEXT_FIELDS:
+            if getattr(item, field) is None:
+                setattr(item, field, getattr(item.catalog_item, field))
+        item.search_text = normalize_text(
+            *(getattr(item, field) for field in CATALOG_TEXT_FIELDS), item.commentaire, item.commentaire_ar
+        )
+        items.append(item)
+    ProfileItem.objects.bulk_update(items, [*CATALOG_TEXT_FIELDS, 'search_text'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileItem', '0008_evaluation_new_etat_nullable'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_items_to_catalog, copy_catalog_text_back),
+    ]
@@ -1,10 +1,44 @@
 from django.db import models
 
 # Create your models here.
-from django.db import models
-from django.db.models.signals import post_save, post_delete
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+from backend.search import normalize_text
 from ProfileDomain.models import ProfileDomain
+from ProfileDomain.metrics import record_evaluation, record_item_change
+
+
+class CatalogItem(models.Model):
+    """
+    Template item text stored once and shared by every profile provisioned
+    from that template. `digest` identifies the template item content.
+    """
+    template = models.CharField(max_length=20)
+    digest = models.CharField(max_length=40, unique=True)
+    name = models.CharField(max_length=500)
+    name_ar = models.CharField(max_length=500, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    description_ar = models.TextField(blank=True, null=True)
+    # Normalized text of the fields above, full-text indexed
+    search_text = models.TextField(blank=True, default='', editable=False)
+
+    def __str__(self):
+        return f"{self.name} ({self.template})"
+
+    def refresh_search_text(self):
+        self.search_text = normalize_text(self.name, self.name_ar, self.description, self.description_ar)
+
+    class Meta:
+        db_table = 'item_catalog'
+
+
+class ProfileItemManager(models.Manager):
+    def get_queryset(self):
+        # Item text may live on the catalog row, so always fetch it alongside
+        return super().get_queryset().select_related('catalog_item')
 
 
 class ProfileItem(models.Model):
@@ -14,9 +48,27 @@ class ProfileItem(models.Model):
         ('NON_ACQUIS', 'Non Acquis'),
         ('NON_COTE', 'Non Coté'),
     ]
+    # Text fields that fall back to the catalog row when left NULL
+    CATALOG_TEXT_FIELDS = ['name', 'name_ar', 'description', 'description_ar']
 
     profile_domain = models.ForeignKey(ProfileDomain, on_delete=models.CASCADE, related_name='items')
-    name = models.CharField(max_length=500)
+    # Owning profile, copied from the domain so profile-scoped reads need no
+    # joins; rows are deleted through the domain cascade
+    profile = models.ForeignKey(
+        'profiles.Profile',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        editable=False,
+    )
+    catalog_item = models.ForeignKey(
+        CatalogItem,
+        on_delete=models.PROTECT,
+        related_name='profile_items',
+        null=True,
+        blank=True
+    )
+    name = models.CharField(max_length=500, blank=True, null=True)
     name_ar = models.CharField(max_length=500, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     description_ar = models.TextField(blank=True, null=True)
@@ -27,15 +79,215 @@ class ProfileItem(models.Model):
     etat = models.CharField(max_length=10, choices=ETAT_CHOICES, default='NON_COTE')
     isPeu = models.BooleanField(default=False)
     done = models.BooleanField(default=False)
+    # Normalized text of the item's own overrides and comments, full-text
+    # indexed; text inherited from the catalog is indexed on the catalog row
+    search_text = models.TextField(blank=True, default='', editable=False)
+
+    objects = ProfileItemManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so saves can be turned into counter deltas
+        instance._loaded_state = instance.counter_state()
+        instance._loaded_domain_id = instance.__dict__.get('profile_domain_id')
+        return instance
+
+    def counter_state(self):
+        """The (etat, isPeu, done) triple that domain, category and profile counters track."""
+        return (self.__dict__.get('etat'), self.__dict__.get('isPeu'), self.__dict__.get('done'))
+
+    def lock_counted_state(self):
+        """
+        Re-read the stored counter state under a row lock held until the
+        transaction ends. Returns False if the row no longer exists.
+        """
+        row = ProfileItem.objects.select_for_update().filter(pk=self.pk).values_list(
+            'etat', 'isPeu', 'done', 'profile_domain_id'
+        ).first()
+        if row is None:
+            return False
+        self._loaded_state = row[:3]
+        self._loaded_domain_id = row[3]
+        return True
+
+    def save(self, *args, **kwargs):
+        # The state loaded with the instance may be stale by now: take the one
+        # this save replaces under a lock, so two concurrent evaluations of
+        # the same item each apply their own transition to the counters
+        with transaction.atomic():
+            if not self._state.adding and self.pk is not None:
+                self.lock_counted_state()
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if not self.lock_counted_state():
+                # Already deleted by a concurrent request, counters included
+                return 0, {}
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.name} (Domain: {self.profile_domain})"
+        return f"{self.resolved_name} (Domain: {self.profile_domain})"
+
+    def get_text(self, field):
+        """Return the item's own text for `field`, or the catalog text if not overridden."""
+        value = getattr(self, field)
+        if value is None and self.catalog_item_id:
+            return getattr(self.catalog_item, field)
+        return value
+
+    def set_text(self, field, value):
+        """Store `value` as an override only when it differs from the catalog text."""
+        if self.catalog_item_id and value == (getattr(self.catalog_item, field) or ''):
+            value = None
+        setattr(self, field, value)
+
+    def refresh_search_text(self):
+        self.search_text = normalize_text(
+            *[getattr(self, field) for field in self.CATALOG_TEXT_FIELDS],
+            self.commentaire,
+            self.commentaire_ar,
+        )
+
+    @property
+    def resolved_name(self):
+        return self.get_text('name')
+
+    @property
+    def resolved_name_ar(self):
+        return self.get_text('name_ar')
+
+    @property
+    def resolved_description(self):
+        return self.get_text('description')
+
+    @property
+    def resolved_description_ar(self):
+        return self.get_text('description_ar')
 
     class Meta:
         db_table = 'profile_item'
+        indexes = [
+            models.Index(fields=['profile_domain', 'etat'], name='profile_item_domain_etat_idx'),
+            models.Index(fields=['profile_domain', 'isPeu'], name='profile_item_domain_peu_idx'),
+        ]
+
+
+class ItemEvaluation(models.Model):
+    """
+    Append-only log of item etat changes, one row per transition.
+
+    Rows are never updated. The item reference carries no database
+    constraint so the history outlives deleted items; an item created in or
+    moved into a domain is logged with old_etat NULL, and one deleted or
+    moved out with new_etat NULL, so summing the events of a domain always
+    matches its acquis_count. Curves are read per domain through the
+    (domain, created_at) index.
+    """
+    item = models.ForeignKey(
+        ProfileItem,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='evaluations'
+    )
+    domain = models.ForeignKey(ProfileDomain, on_delete=models.CASCADE, related_name='evaluations', db_index=False)
+    old_etat = models.CharField(max_length=10, choices=ProfileItem.ETAT_CHOICES, blank=True, null=True)
+    new_etat = models.CharField(max_length=10, choices=ProfileItem.ETAT_CHOICES, blank=True, null=True)
+    evaluated_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='item_evaluations',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Item {self.item_id}: {self.old_etat} -> {self.new_etat}"
+
+    class Meta:
+        db_table = 'item_evaluation'
+        indexes = [
+            models.Index(fields=['domain', 'created_at'], name='item_eval_domain_created_idx'),
+        ]
+
+class PendingTranslation(models.Model):
+    """
+    Item text waiting for its other-language counterpart. Bulk imports queue
+    rows here instead of calling the translator inline; the
+    process_translations command works through the queue.
+    """
+    FIELD_CHOICES = [
+        ('name', 'Name'),
+        ('description', 'Description'),
+        ('commentaire', 'Commentaire'),
+    ]
+
+    item = models.ForeignKey(ProfileItem, on_delete=models.CASCADE, related_name='pending_translations')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Item {self.item_id}: {self.field}"
+
+    class Meta:
+        db_table = 'item_pending_translation'
+        unique_together = ('item', 'field')
+
+
+@receiver(pre_save, sender=CatalogItem)
+@receiver(pre_save, sender=ProfileItem)
+def refresh_search_text(sender, instance, **kwargs):
+    instance.refresh_search_text()
+
+
+@receiver(pre_save, sender=ProfileItem)
+def fill_item_profile(sender, instance, **kwargs):
+    if instance.profile_id is None:
+        instance.profile_id = instance.profile_domain.profile_id
+
+
+# Signals to update ProfileDomain metrics and category/profile rollups
+@receiver(post_save, sender=ProfileItem)
+def update_domain_metrics_on_save(sender, instance, created, **kwargs):
+    """
+    Apply the item's state transition to its domain, category and profile
+    counters, and log etat changes. Views set `instance.evaluated_by` to
+    attribute the change to a user.
+    """
+    old_state = getattr(instance, '_loaded_state', None)
+    old_domain_id = getattr(instance, '_loaded_domain_id', None)
+    new_state = instance.counter_state()
+    if created or old_state is None:
+        _log_transition(instance, instance.profile_domain_id, None, instance.etat)
+        record_item_change(instance.profile_domain_id, None, new_state)
+    elif old_domain_id is not None and old_domain_id != instance.profile_domain_id:
+        _log_transition(instance, old_domain_id, old_state[0], None)
+        _log_transition(instance, instance.profile_domain_id, None, instance.etat)
+        record_item_change(old_domain_id, old_state, None)
+        record_item_change(instance.profile_domain_id, None, new_state)
+    else:
+        if old_state[0] != instance.etat:
+            _log_transition(instance, instance.profile_domain_id, old_state[0], instance.etat)
+        record_item_change(instance.profile_domain_id, old_state, new_state)
+    instance._loaded_state = new_state
+    instance._loaded_domain_id = instance.profile_domain_id
+
+
+@receiver(post_delete, sender=ProfileItem)
+def update_domain_metrics_on_delete(sender, instance, **kwargs):
+    """Remove the deleted item from its domain, category and profile counters, and log it."""
+    old_state = getattr(instance, '_loaded_state', None) or instance.counter_state()
+    _log_transition(instance, instance.profile_domain_id, old_state[0], None)
+    record_item_change(instance.profile_domain_id, old_state, None)
+
 
-# Signals to update ProfileDomain metrics
-@receiver([post_save, post_delete], sender=ProfileItem)
-def update_domain_metrics(sender, instance, **kwargs):
-    """Update item_count and acquis_percentage when a ProfileItem is saved or deleted."""
-    instance.profile_domain.update_metrics()
\ No newline at end of file
+def _log_transition(instance, domain_id, old_etat, new_etat):
+    record_evaluation(ItemEvaluation(
+        item_id=instance.pk,
+        domain_id=domain_id,
+        old_etat=old_etat,
+        new_etat=new_etat,
+        evaluated_by=getattr(instance, 'evaluated_by', None),
+    ))
@@ -0,0 +1,34 @@
+from backend.search import fulltext_search
+from ProfileItem.models import CatalogItem, ProfileItem
+
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+
+
+def _normalized(hits):
+    """Scale relevance scores to the best hit (1.0): raw scores of two indexes do not compare."""
+    scores = dict(hits)
+    best = max(scores.values(), default=0) or 1
+    return {row_id: score / best for row_id, score in scores.items()}
+
+
+def search_items(profile_id, query, limit=SEARCH_LIMIT):
+    """
+    Ids and relevance scores of a profile's items matching `query`, best first.
+
+    Template text lives on the shared catalog rows and is indexed once there;
+    the items' own overrides and comments are indexed on profile_item. Both
+    indexes are queried, the catalog one only over the rows this profile
+    uses, and an item's normalized scores are added up, so an item matching
+    through both its template text and its comments ranks first.
+    """
+    items = ProfileItem.objects.filter(profile_id=profile_id)
+    scores = _normalized(fulltext_search(items, query).values_list('id', 'search_score')[:limit])
+
+    catalog = CatalogItem.objects.filter(id__in=items.values('catalog_item_id'))
+    catalog_scores = _normalized(fulltext_search(catalog, query).values_list('id', 'search_score'))
+    if catalog_scores:
+        for item_id, catalog_item_id in items.filter(catalog_item_id__in=list(catalog_scores)).values_list('id', 'catalog_item_id'):
+            scores[item_id] = scores.get(item_id, 0) + catalog_scores[catalog_item_id]
+
+    return sorted(scores.items(), key=lambda hit: (-hit[1], hit[0]))[:limit]
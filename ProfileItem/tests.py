@@ -1,3 +1,372 @@
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from authentification.models import CustomUser
+from backend.testing import QueryPlanMixin
+from ProfileCategory.models import ProfileCategory
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import CatalogItem, ItemEvaluation, PendingTranslation, ProfileItem
+from ProfileItem.views import ITEM_LIST_FIELDS
+from profiles.models import Profile
+from profiles.permissions import PERMISSION_CACHE, grant_profile_permissions
+from profiles.progress import progress_curves
 
-# Create your tests here.
+
+class ItemTestCase(TestCase):
+    """One profile with one category holding two empty domains."""
+
+    def setUp(self):
+        caches[PERMISSION_CACHE].clear()
+        # Every write runs its commit callbacks, where pending counter deltas are applied
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile = Profile.objects.create(first_name='Counter', last_name='Test', birth_date='2015-01-01')
+            self.category = ProfileCategory.objects.create(profile=self.profile, name='Category')
+            self.domain = ProfileDomain.objects.create(profile_category=self.category, name='Domain')
+            self.other_domain = ProfileDomain.objects.create(profile_category=self.category, name='Other')
+
+    def write(self, operation, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            return operation(*args)
+
+    def create_item(self, domain=None, **fields):
+        item = ProfileItem(profile_domain=domain or self.domain, name='Item', **fields)
+        self.write(item.save)
+        return item
+
+    def counters(self, obj, *fields):
+        obj.refresh_from_db()
+        return tuple(getattr(obj, field) for field in fields)
+
+
+class ItemCounterTests(ItemTestCase):
+    """Item saves and deletes turned into domain, category and profile counter deltas."""
+
+    def test_create_counts_the_item(self):
+        self.create_item(etat='ACQUIS', isPeu=True)
+        self.create_item()
+        self.assertEqual(self.counters(self.domain, 'item_count', 'acquis_count', 'acquis_percentage'), (2, 1, 50.0))
+        self.assertEqual(
+            self.counters(self.category, 'item_count', 'acquis_count', 'non_cote_count', 'peu_count'),
+            (2, 1, 1, 1),
+        )
+        self.assertEqual(self.counters(self.profile, 'item_count', 'acquis_count', 'evaluation_score'), (2, 1, 50))
+
+    def test_etat_transitions_move_counts(self):
+        item = self.create_item()
+        for etat in ['PARTIEL', 'ACQUIS', 'NON_ACQUIS', 'ACQUIS']:
+            item.etat = etat
+            self.write(item.save)
+        item.done = True
+        self.write(item.save)
+        self.assertEqual(self.counters(self.domain, 'item_count', 'acquis_count'), (1, 1))
+        self.assertEqual(
+            self.counters(self.profile, 'item_count', 'acquis_count', 'partiel_count', 'non_acquis_count',
+                          'non_cote_count', 'done_count'),
+            (1, 1, 0, 0, 0, 1),
+        )
+
+    def test_stale_instances_apply_the_stored_transition(self):
+        # Two requests load the same NON_COTE item and both mark it ACQUIS
+        item = self.create_item()
+        first = ProfileItem.objects.get(pk=item.pk)
+        second = ProfileItem.objects.get(pk=item.pk)
+        first.etat = 'ACQUIS'
+        self.write(first.save)
+        second.etat = 'ACQUIS'
+        self.write(second.save)
+        self.assertEqual(self.counters(self.domain, 'acquis_count'), (1,))
+        self.assertEqual(self.counters(self.profile, 'acquis_count', 'non_cote_count'), (1, 0))
+
+    def test_stale_delete_is_counted_once(self):
+        item = self.create_item(etat='ACQUIS')
+        self.create_item()
+        first = ProfileItem.objects.get(pk=item.pk)
+        second = ProfileItem.objects.get(pk=item.pk)
+        self.write(first.delete)
+        self.assertEqual(self.write(second.delete), (0, {}))
+        self.assertEqual(self.counters(self.domain, 'item_count', 'acquis_count'), (1, 0))
+        self.assertEqual(self.counters(self.profile, 'item_count', 'acquis_count'), (1, 0))
+
+    def test_moving_an_item_between_domains(self):
+        item = self.create_item(etat='ACQUIS')
+        item.profile_domain = self.other_domain
+        self.write(item.save)
+        self.assertEqual(self.counters(self.domain, 'item_count', 'acquis_count'), (0, 0))
+        self.assertEqual(self.counters(self.other_domain, 'item_count', 'acquis_count'), (1, 1))
+        self.assertEqual(self.counters(self.category, 'item_count', 'acquis_count'), (1, 1))
+
+
+class EvaluationLogTests(ItemTestCase):
+    """Every change of an item's etat or domain is logged, so progress curves stay consistent."""
+
+    def events(self):
+        return list(ItemEvaluation.objects.order_by('id').values_list('domain_id', 'old_etat', 'new_etat'))
+
+    def test_lifecycle_is_logged(self):
+        item = self.create_item()
+        item.etat = 'ACQUIS'
+        self.write(item.save)
+        item.done = True
+        self.write(item.save)
+        item.profile_domain = self.other_domain
+        self.write(item.save)
+        self.write(item.delete)
+        self.assertEqual(self.events(), [
+            (self.domain.pk, None, 'NON_COTE'),
+            (self.domain.pk, 'NON_COTE', 'ACQUIS'),
+            (self.domain.pk, 'ACQUIS', None),
+            (self.other_domain.pk, None, 'ACQUIS'),
+            (self.other_domain.pk, 'ACQUIS', None),
+        ])
+
+    def test_events_are_written_with_the_counters(self):
+        item = self.create_item()
+        item.etat = 'ACQUIS'
+        with CaptureQueriesContext(connection) as queries:
+            self.write(item.save)
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('item_evaluation', inserts[0])
+
+    def test_curves_after_deleting_an_acquired_item(self):
+        kept = self.create_item(etat='ACQUIS')
+        deleted = self.create_item()
+        deleted.etat = 'ACQUIS'
+        self.write(deleted.save)
+        self.write(deleted.delete)
+        curve = next(domain for domain in progress_curves(self.profile)['domains'] if domain['id'] == self.domain.pk)
+        self.assertEqual(curve['start_acquis_count'], 0)
+        self.assertEqual(curve['points'][-1]['acquis_count'], 1)
+        self.assertEqual(curve['item_count'], 1)
+        self.assertTrue(ProfileItem.objects.filter(pk=kept.pk).exists())
+
+
+class BulkEvaluateTests(ItemTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user('bulk@example.com', 'bulk', 'pw', accepte_conditions=True)
+        self.write(grant_profile_permissions, self.profile.pk, self.user.pk, ['view', 'edit'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.items = [self.create_item(commentaire='ancien', commentaire_ar='قديم') for _ in range(3)]
+
+    def evaluate(self, changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/items/items/bulk-evaluate/', {'items': changes}, format='json')
+
+    def test_counters_and_events(self):
+        first, second, third = self.items
+        response = self.evaluate([
+            {'id': first.pk, 'etat': 'ACQUIS'},
+            {'id': second.pk, 'etat': 'PARTIEL', 'done': True},
+            {'id': third.pk, 'isPeu': True},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.counters(self.profile, 'item_count', 'acquis_count', 'partiel_count', 'non_cote_count',
+                          'peu_count', 'done_count'),
+            (3, 1, 1, 1, 1, 1),
+        )
+        self.assertEqual(self.counters(self.domain, 'acquis_count'), (1,))
+        self.assertEqual(ItemEvaluation.objects.filter(old_etat='NON_COTE').count(), 2)
+
+    def test_changes_start_from_the_stored_state(self):
+        # Another request marked the item ACQUIS after this one was validated
+        first = self.items[0]
+        concurrent = ProfileItem.objects.get(pk=first.pk)
+        concurrent.etat = 'ACQUIS'
+        self.write(concurrent.save)
+        self.evaluate([{'id': first.pk, 'etat': 'ACQUIS'}, {'id': self.items[1].pk, 'done': True}])
+        self.assertEqual(self.counters(self.profile, 'acquis_count', 'non_cote_count', 'done_count'), (1, 2, 1))
+
+    def test_changed_comment_is_queued_for_translation(self):
+        first, second, third = self.items
+        self.evaluate([
+            {'id': first.pk, 'commentaire': 'nouveau'},
+            {'id': second.pk, 'commentaire': 'nouveau', 'commentaire_ar': 'جديد'},
+            {'id': third.pk, 'commentaire': 'ancien', 'etat': 'ACQUIS'},
+        ])
+        comments = dict(
+            (pk, (commentaire, commentaire_ar)) for pk, commentaire, commentaire_ar in
+            ProfileItem.objects.values_list('id', 'commentaire', 'commentaire_ar')
+        )
+        self.assertEqual(comments[first.pk], ('nouveau', ''))
+        self.assertEqual(comments[second.pk], ('nouveau', 'جديد'))
+        self.assertEqual(comments[third.pk], ('ancien', 'قديم'))
+        self.assertEqual(
+            list(PendingTranslation.objects.values_list('item_id', 'field')),
+            [(first.pk, 'commentaire')],
+        )
+        self.assertEqual(ProfileItem.objects.get(pk=first.pk).search_text, 'item nouveau')
+
+    def test_supplied_unchanged_comment_is_kept(self):
+        # Clients send both sides even when only one was edited
+        first = self.items[0]
+        self.evaluate([{'id': first.pk, 'commentaire': 'ancien', 'commentaire_ar': 'جديد'}])
+        self.assertEqual(
+            ProfileItem.objects.values_list('commentaire', 'commentaire_ar').get(pk=first.pk),
+            ('ancien', 'جديد'),
+        )
+        self.assertFalse(PendingTranslation.objects.exists())
+
+    def test_invalid_batches(self):
+        self.assertEqual(self.evaluate([{'id': self.items[0].pk, 'commentaire': 3}]).status_code, 400)
+        self.assertEqual(self.evaluate([{'id': 0, 'etat': 'ACQUIS'}]).status_code, 404)
+        other = CustomUser.objects.create_user('other@example.com', 'other', 'pw', accepte_conditions=True)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.evaluate([{'id': self.items[0].pk, 'etat': 'ACQUIS'}]).status_code, 403)
+
+
+class ItemSearchTests(ItemTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user('search@example.com', 'search', 'pw', accepte_conditions=True)
+        self.write(grant_profile_permissions, self.profile.pk, self.user.pk, ['view'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.motor = self.create_item(commentaire='Motricité fine à travailler')
+        self.arabic = self.create_item(commentaire_ar='مهارات الكتابة')
+        self.create_item(commentaire='Langage')
+
+    def search(self, q, **params):
+        return self.client.get('/api/items/items/search/', {'profile_id': self.profile.pk, 'q': q, **params})
+
+    def hits(self, q):
+        response = self.search(q)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['data']]
+
+    def test_accents_and_arabic_are_folded(self):
+        self.assertEqual(self.hits('motricite'), [self.motor.pk])
+        self.assertEqual(self.hits('MOTRIC'), [self.motor.pk])
+        self.assertEqual(self.hits('الكتابه'), [self.arabic.pk])
+        self.assertEqual(self.hits('absent'), [])
+
+    def test_edited_comment_is_reindexed(self):
+        self.motor.commentaire = 'Équilibre'
+        self.write(self.motor.save)
+        self.assertEqual(self.hits('motricite'), [])
+        self.assertEqual(self.hits('equilibre'), [self.motor.pk])
+
+    def catalog_item(self, digest, name, profile_domain=None):
+        catalog_item = CatalogItem(template='kids', digest=digest, name=name)
+        catalog_item.refresh_search_text()
+        catalog_item.save()
+        if profile_domain is not None:
+            item = ProfileItem(profile_domain=profile_domain, catalog_item=catalog_item)
+            self.write(item.save)
+            return item
+        return catalog_item
+
+    def test_template_text_is_searched_in_the_profile_catalog_rows(self):
+        # Catalog rows of other templates are never considered
+        for n in range(3):
+            self.catalog_item(f'{n}' * 40, 'Motricité globale')
+        template_item = self.catalog_item('a' * 40, 'Motricité globale', self.domain)
+        both = self.catalog_item('b' * 40, 'Motricité globale', self.domain)
+        both.commentaire = 'Motricité à revoir'
+        self.write(both.save)
+        # Matching in both indexes ranks first, scores are scaled to the best hit
+        hits = self.hits('motricite')
+        self.assertEqual((hits[0], set(hits)), (both.pk, {both.pk, template_item.pk, self.motor.pk}))
+        scores = [row['score'] for row in self.search('motricite').data['data']]
+        self.assertEqual(scores[0], 2)
+        self.assertTrue(all(score <= 1 for score in scores[1:]))
+
+    def test_other_profiles_are_not_searched(self):
+        other = Profile.objects.create(first_name='Other', last_name='Test', birth_date='2015-01-01')
+        self.write(grant_profile_permissions, other.pk, self.user.pk, ['view'])
+        self.assertEqual(
+            self.client.get('/api/items/items/search/', {'profile_id': other.pk, 'q': 'motricite'}).data['data'],
+            [],
+        )
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.search('').status_code, 400)
+        self.assertEqual(self.search('motricite', limit='x').status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.search('motricite').status_code, 401)
+
+
+class CatalogTextTests(ItemTestCase):
+    """Template items read their text from the shared catalog row unless overridden."""
+
+    def setUp(self):
+        super().setUp()
+        self.catalog_item = CatalogItem.objects.create(
+            template='kids', digest='0' * 40, name='Marche', name_ar='المشي', description='Marche seul',
+        )
+        item = ProfileItem(profile_domain=self.domain, catalog_item=self.catalog_item)
+        self.write(item.save)
+        self.item = ProfileItem.objects.get(pk=item.pk)
+
+    def test_catalog_text_is_the_fallback(self):
+        self.assertEqual((self.item.resolved_name, self.item.resolved_name_ar), ('Marche', 'المشي'))
+        self.assertEqual(self.item.resolved_description, 'Marche seul')
+
+    def test_overrides_are_stored_only_when_different(self):
+        self.item.set_text('name', 'Marche')
+        self.assertIsNone(self.item.name)
+        self.item.set_text('name', 'Court')
+        self.write(self.item.save)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.name, self.item.resolved_name), ('Court', 'Court'))
+        self.assertEqual(CatalogItem.objects.get(pk=self.catalog_item.pk).name, 'Marche')
+
+
+class ItemListTests(ItemTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user('list@example.com', 'list', 'pw', accepte_conditions=True)
+        self.write(grant_profile_permissions, self.profile.pk, self.user.pk, ['view'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        catalog_item = CatalogItem.objects.create(template='kids', digest='1' * 40, name='Catalogue', name_ar='فهرس')
+        self.catalog_backed = ProfileItem(profile_domain=self.domain, catalog_item=catalog_item, isPeu=True)
+        self.write(self.catalog_backed.save)
+        self.own = self.create_item(etat='ACQUIS', commentaire='Note')
+
+    def list_items(self, url='/api/items/items/'):
+        response = self.client.get(url, {'domain_id': self.domain.pk})
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: row for row in response.data['data']}
+
+    def test_rows_resolve_catalog_text_and_parents(self):
+        rows = self.list_items()
+        self.assertEqual(set(rows[self.catalog_backed.pk]), set(ITEM_LIST_FIELDS))
+        self.assertEqual((rows[self.catalog_backed.pk]['name'], rows[self.catalog_backed.pk]['name_ar']), ('Catalogue', 'فهرس'))
+        self.assertEqual(
+            {field: rows[self.own.pk][field] for field in ['name', 'etat', 'commentaire', 'profile_domain_name', 'profile_category_name']},
+            {'name': 'Item', 'etat': 'ACQUIS', 'commentaire': 'Note', 'profile_domain_name': 'Domain', 'profile_category_name': 'Category'},
+        )
+
+    def test_query_count_does_not_grow_with_the_items(self):
+        self.list_items()
+        with CaptureQueriesContext(connection) as queries:
+            self.list_items()
+        for _ in range(5):
+            self.create_item()
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(self.list_items()), 7)
+
+    def test_peu_items(self):
+        self.assertEqual(list(self.list_items('/api/items/items/items-peu/')), [self.catalog_backed.pk])
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """Indexes behind the item filters."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = Profile.objects.create(first_name='Plan', last_name='Test', birth_date='2015-01-01')
+
+    def test_items_by_domain_and_etat(self):
+        self.assertIndexed(ProfileItem.objects.filter(profile_domain_id=1, etat='ACQUIS'))
+
+    def test_items_by_domain_and_peu(self):
+        self.assertIndexed(ProfileItem.objects.filter(profile_domain_id=1, isPeu=True))
+
+    def test_items_by_profile(self):
+        self.assertIndexed(ProfileItem.objects.filter(profile_id=self.profile.pk, etat='ACQUIS'))
@@ -3,43 +3,67 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
 from django.shortcuts import get_object_or_404
-from profiles.models import  SharedProfilePermission
+from profiles.models import  Profile
+from profiles.permissions import ProfilePermissionMixin, accessible_profile_ids, has_profile_permission
+from profiles.conditional import not_modified_response, profile_validators, with_validators
 from ProfileItem.models import ProfileItem
+from ProfileItem.evaluations import apply_evaluations, validate_evaluations
+from ProfileItem.search import MAX_SEARCH_LIMIT, SEARCH_LIMIT, search_items
 from ProfileDomain.models import ProfileDomain
 from profiles.serializers import  ProfileItemSerializer
 from rest_framework import status, viewsets
+from backend.pagination import KeysetPagination
+from rest_framework.exceptions import ValidationError
+from django.db.models.functions import Coalesce
 from .translation_utils import translation_service
 
-class ProfileItemViewSet(viewsets.ViewSet):
+# Keys of the item list endpoints, in response order
+ITEM_LIST_FIELDS = [
+    'id', 'name', 'name_ar', 'description', 'description_ar', 'etat',
+    'profile_domain_name', 'profile_domain_name_ar', 'profile_category_name', 'profile_category_name_ar',
+    'commentaire', 'commentaire_ar', 'isPeu', 'done',
+]
+
+
+def item_list_rows(items):
+    """
+    Build item list rows straight from one values_list() query joined to the
+    catalog, domain and category, without model instances or serializers.
+    Overridden text wins over the catalog text, as in ProfileItem.get_text().
+    """
+    rows = items.values_list(
+        'id',
+        *[Coalesce(field, f'catalog_item__{field}') for field in ProfileItem.CATALOG_TEXT_FIELDS],
+        'etat',
+        'profile_domain__name',
+        'profile_domain__name_ar',
+        'profile_domain__profile_category__name',
+        'profile_domain__profile_category__name_ar',
+        'commentaire',
+        'commentaire_ar',
+        'isPeu',
+        'done',
+    )
+    return [dict(zip(ITEM_LIST_FIELDS, row)) for row in rows]
+
+
+def item_list_payload(items, request, message):
+    """Response payload of the item list endpoints, keyset-paginated on id when the client asks for pages."""
+    paginator = KeysetPagination(ordering=('id',))
+    page = paginator.page_queryset(items, request)
+    if page is None:
+        return {'message': message, 'data': item_list_rows(items)}
+    return paginator.get_paginated_payload(paginator.finish_page(item_list_rows(page)), message)
+
+class ProfileItemViewSet(ProfilePermissionMixin, viewsets.ViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
-    def _check_view_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='view'
-        ).exists()
-
-    def _check_edit_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='edit'
-        ).exists()
-
-    def _check_delete_permission(self, profile, user):
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='delete'
-        ).exists()
-
     def list(self, request):
         try:
             domain_id = request.query_params.get('domain_id')
-            domain = get_object_or_404(ProfileDomain, pk=domain_id)
-            profile = domain.profile_category.profile
+            domain = get_object_or_404(ProfileDomain.objects.select_related('profile'), pk=domain_id)
+            profile = domain.profile
 
             if not self._check_view_permission(profile, request.user):
                 return Response(
@@ -47,34 +71,20 @@ class ProfileItemViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
+            validators = profile_validators(profile)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
             items = ProfileItem.objects.filter(profile_domain=domain)
-            serializer = ProfileItemSerializer(items, many=True)
-        
-            # Customize response to include domain and category names with all _ar fields
-            response_data = [
-                {
-                    'id': item['id'],
-                    'name': item['name'],
-                    'name_ar': item['name_ar'],
-                    'description': item['description'],
-                    'description_ar': item['description_ar'],
-                    'etat': item['etat'],
-                    'profile_domain_name': domain.name,
-                    'profile_domain_name_ar': domain.name_ar,
-                    'profile_category_name': domain.profile_category.name,
-                    'profile_category_name_ar': domain.profile_category.name_ar,
-                    'commentaire': item['commentaire'],
-                    'commentaire_ar': item['commentaire_ar'],
-                    'isPeu': item.get('isPeu', False),
-                    'done': item.get('done', False),
-                }
-                for item in serializer.data
-            ]
+            response_data = item_list_payload(items, request, 'Items retrieved successfully')
             
-            return Response(
-                {'message': 'Items retrieved successfully', 'data': response_data},
+            return with_validators(Response(
+                response_data,
                 status=status.HTTP_200_OK
-            )
+            ), validators)
+        except ValidationError as ve:
+            return Response({'error': ve.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -92,8 +102,8 @@ class ProfileItemViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            domain = get_object_or_404(ProfileDomain, pk=domain_id)
-            profile = domain.profile_category.profile
+            domain = get_object_or_404(ProfileDomain.objects.select_related('profile'), pk=domain_id)
+            profile = domain.profile
 
             if not self._check_view_permission(profile, request.user):
                 return Response(
@@ -101,34 +111,20 @@ class ProfileItemViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
+            validators = profile_validators(profile)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
             items = ProfileItem.objects.filter(profile_domain=domain, isPeu=True)
-            serializer = ProfileItemSerializer(items, many=True)
-        
-            # Customize response to include domain and category names with all _ar fields
-            response_data = [
-                {
-                    'id': item['id'],
-                    'name': item['name'],
-                    'name_ar': item['name_ar'],
-                    'description': item['description'],
-                    'description_ar': item['description_ar'],
-                    'etat': item['etat'],
-                    'profile_domain_name': domain.name,
-                    'profile_domain_name_ar': domain.name_ar,
-                    'profile_category_name': domain.profile_category.name,
-                    'profile_category_name_ar': domain.profile_category.name_ar,
-                    'commentaire': item['commentaire'],
-                    'commentaire_ar': item['commentaire_ar'],
-                    'isPeu': item.get('isPeu', False),
-                    'done': item.get('done', False),
-                }
-                for item in serializer.data
-            ]
+            response_data = item_list_payload(items, request, 'Items with isPeu=true retrieved successfully')
             
-            return Response(
-                {'message': 'Items with isPeu=true retrieved successfully', 'data': response_data},
+            return with_validators(Response(
+                response_data,
                 status=status.HTTP_200_OK
-            )
+            ), validators)
+        except ValidationError as ve:
+            return Response({'error': ve.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -136,8 +132,8 @@ class ProfileItemViewSet(viewsets.ViewSet):
         try:
             domain_id = request.query_params.get('domain_id')
             print(f"Profile ID this is where to look: {domain_id}")
-            domain = get_object_or_404(ProfileDomain, pk=domain_id)
-            profile = domain.profile_category.profile
+            domain = get_object_or_404(ProfileDomain.objects.select_related('profile'), pk=domain_id)
+            profile = domain.profile
 
             if not self._check_edit_permission(profile, request.user):
                 return Response(
@@ -171,8 +167,9 @@ class ProfileItemViewSet(viewsets.ViewSet):
             fields_to_translate = ['name', 'description', 'commentaire']
             item_data = translation_service.auto_translate_fields(item_data, fields_to_translate)
 
-            item = ProfileItem.objects.create(**item_data)
-            item.profile_domain.update_metrics()
+            item = ProfileItem(**item_data)
+            item.evaluated_by = request.user
+            item.save()
             serializer = ProfileItemSerializer(item)
             return Response(
                 {'message': 'Item created successfully', 'data': serializer.data},
@@ -186,8 +183,8 @@ class ProfileItemViewSet(viewsets.ViewSet):
         print(f"Request method: {request.method}")
         print(f"Request data: {request.data}")
         try:
-            item = get_object_or_404(ProfileItem, pk=pk)
-            profile = item.profile_domain.profile_category.profile
+            item = get_object_or_404(ProfileItem.objects.select_related('profile'), pk=pk)
+            profile = item.profile
             print(f"Found item: {item.id}, profile: {profile.id}")
             
             if not self._check_edit_permission(profile, request.user):
@@ -205,62 +202,62 @@ class ProfileItemViewSet(viewsets.ViewSet):
                 new_name = request.data['name']
                 if new_name is not None:
                     new_name = new_name.strip()
-                    if new_name != item.name:
+                    if new_name != item.resolved_name:
                         update_data['name'] = new_name
                         changed_fields.append('name')
                     else:
-                        update_data['name'] = item.name
+                        update_data['name'] = item.resolved_name
                 else:
                     # If None is sent, keep the existing value
-                    update_data['name'] = item.name
+                    update_data['name'] = item.resolved_name
             else:
-                update_data['name'] = item.name
+                update_data['name'] = item.resolved_name
                 
             if 'name_ar' in request.data:
                 new_name_ar = request.data['name_ar']
                 if new_name_ar is not None:
                     new_name_ar = new_name_ar.strip()
-                    if new_name_ar != (item.name_ar or ''):
+                    if new_name_ar != (item.resolved_name_ar or ''):
                         update_data['name_ar'] = new_name_ar
                         changed_fields.append('name_ar')
                     else:
-                        update_data['name_ar'] = item.name_ar or ''
+                        update_data['name_ar'] = item.resolved_name_ar or ''
                 else:
                     # If None is sent, keep the existing value
-                    update_data['name_ar'] = item.name_ar or ''
+                    update_data['name_ar'] = item.resolved_name_ar or ''
             else:
-                update_data['name_ar'] = item.name_ar or ''
+                update_data['name_ar'] = item.resolved_name_ar or ''
             
             # Check for changes in description fields
             if 'description' in request.data:
                 new_description = request.data['description']
                 if new_description is not None:
                     new_description = new_description.strip()
-                    if new_description != (item.description or ''):
+                    if new_description != (item.resolved_description or ''):
                         update_data['description'] = new_description
                         changed_fields.append('description')
                     else:
-                        update_data['description'] = item.description or ''
+                        update_data['description'] = item.resolved_description or ''
                 else:
                     # If None is sent, keep the existing value
-                    update_data['description'] = item.description or ''
+                    update_data['description'] = item.resolved_description or ''
             else:
-                update_data['description'] = item.description or ''
+                update_data['description'] = item.resolved_description or ''
                 
             if 'description_ar' in request.data:
                 new_description_ar = request.data['description_ar']
                 if new_description_ar is not None:
                     new_description_ar = new_description_ar.strip()
-                    if new_description_ar != (item.description_ar or ''):
+                    if new_description_ar != (item.resolved_description_ar or ''):
                         update_data['description_ar'] = new_description_ar
                         changed_fields.append('description_ar')
                     else:
-                        update_data['description_ar'] = item.description_ar or ''
+                        update_data['description_ar'] = item.resolved_description_ar or ''
                 else:
                     # If None is sent, keep the existing value
-                    update_data['description_ar'] = item.description_ar or ''
+                    update_data['description_ar'] = item.resolved_description_ar or ''
             else:
-                update_data['description_ar'] = item.description_ar or ''
+                update_data['description_ar'] = item.resolved_description_ar or ''
             
             # Check for changes in commentaire fields
             if 'commentaire' in request.data:
@@ -302,10 +299,8 @@ class ProfileItemViewSet(viewsets.ViewSet):
             print(f"After translation: {translated_data}")
 
             # Update the item object with translated data
-            item.name = translated_data['name']
-            item.name_ar = translated_data['name_ar']
-            item.description = translated_data['description']
-            item.description_ar = translated_data['description_ar']
+            for field in ProfileItem.CATALOG_TEXT_FIELDS:
+                item.set_text(field, translated_data[field])
             item.commentaire = translated_data['commentaire']
             item.commentaire_ar = translated_data['commentaire_ar']
 
@@ -327,6 +322,7 @@ class ProfileItemViewSet(viewsets.ViewSet):
                 item.done = bool(request.data['done'])
             
             item.is_modified = True
+            item.evaluated_by = request.user
             item.save()
             print(f"Item saved with ID: {item.id}")
 
@@ -346,8 +342,8 @@ class ProfileItemViewSet(viewsets.ViewSet):
 
     def destroy(self, request, pk=None):
         try:
-            item = get_object_or_404(ProfileItem, pk=pk)
-            profile = item.profile_domain.profile_category.profile
+            item = get_object_or_404(ProfileItem.objects.select_related('profile'), pk=pk)
+            profile = item.profile
 
             if not self._check_delete_permission(profile, request.user):
                 return Response(
@@ -355,6 +351,7 @@ class ProfileItemViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
+            item.evaluated_by = request.user
             item.delete()
             return Response(
                 {'message': 'Item deleted successfully'},
@@ -363,6 +360,80 @@ class ProfileItemViewSet(viewsets.ViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Full-text search over the names, descriptions and comments of a
+        profile's items (French and Arabic), best matches first.
+        """
+        try:
+            profile = get_object_or_404(Profile, pk=request.query_params.get('profile_id'))
+
+            if not self._check_view_permission(profile, request.user):
+                return Response(
+                    {'error': 'You are not authorized to view items for this profile'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            query = request.query_params.get('q', '').strip()
+            if not query:
+                return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                limit = min(int(request.query_params.get('limit', SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+            except ValueError:
+                return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+            hits = search_items(profile.pk, query, limit)
+            rows = {row['id']: row for row in item_list_rows(ProfileItem.objects.filter(pk__in=[item_id for item_id, _ in hits]))}
+            data = [dict(rows[item_id], score=round(score, 4)) for item_id, score in hits if item_id in rows]
+            return Response(
+                {'message': 'Items retrieved successfully', 'data': data},
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk-evaluate')
+    def bulk_evaluate(self, request):
+        """
+        Apply a batch of {id, etat, isPeu, done, commentaire, commentaire_ar} changes.
+        Permissions are checked once per profile and the items are written
+        with a single bulk_update.
+        """
+        try:
+            changes = request.data.get('items') if isinstance(request.data, dict) else request.data
+            try:
+                changes = validate_evaluations(changes)
+            except ValueError as ve:
+                return Response({'error': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+
+            owners = dict(ProfileItem.objects.filter(pk__in=changes.keys()).values_list('id', 'profile_id'))
+            missing = sorted(set(changes) - set(owners))
+            if missing:
+                return Response(
+                    {'error': f'Items not found: {missing}'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            profile_ids = set(owners.values())
+            if not request.user.is_superuser:
+                allowed = set(accessible_profile_ids(request.user, 'edit').filter(profile_id__in=profile_ids))
+                if allowed != profile_ids:
+                    return Response(
+                        {'error': 'You are not authorized to update these items'},
+                        status=status.HTTP_403_FORBIDDEN
+                    )
+
+            items = apply_evaluations(changes, request.user)
+
+            serializer = ProfileItemSerializer(items, many=True)
+            return Response(
+                {'message': f'{len(items)} items updated successfully', 'data': serializer.data},
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=True, methods=['patch', 'put'], url_path='toggle-ispeu')
     def toggle_ispeu(self, request, pk=None):
         """
@@ -370,8 +441,8 @@ class ProfileItemViewSet(viewsets.ViewSet):
         Accepts a boolean value in the request body or toggles the current value.
         """
         try:
-            item = get_object_or_404(ProfileItem, pk=pk)
-            profile = item.profile_domain.profile_category.profile
+            item = get_object_or_404(ProfileItem.objects.select_related('profile'), pk=pk)
+            profile = item.profile
             
             if not self._check_edit_permission(profile, request.user):
                 return Response(
@@ -410,8 +481,8 @@ class ProfileItemViewSet(viewsets.ViewSet):
         Accepts isPeu and/or done boolean values in the request body.
         """
         try:
-            item = get_object_or_404(ProfileItem, pk=pk)
-            profile = item.profile_domain.profile_category.profile
+            item = get_object_or_404(ProfileItem.objects.select_related('profile'), pk=pk)
+            profile = item.profile
             
             if not self._check_edit_permission(profile, request.user):
                 return Response(
@@ -469,46 +540,29 @@ def list_peu_items_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        domain = get_object_or_404(ProfileDomain, pk=domain_id)
-        profile = domain.profile_category.profile
+        domain = get_object_or_404(ProfileDomain.objects.select_related('profile'), pk=domain_id)
+        profile = domain.profile
 
         # Check view permission
-        if not request.user.is_superuser:
-            if not SharedProfilePermission.objects.filter(
-                profile=profile, shared_with=request.user, permissions='view'
-            ).exists():
-                return Response(
-                    {'error': 'You are not authorized to view items for this domain'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        if not has_profile_permission(request.user, profile, 'view', request):
+            return Response(
+                {'error': 'You are not authorized to view items for this domain'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        validators = profile_validators(profile)
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
 
         items = ProfileItem.objects.filter(profile_domain=domain, isPeu=True)
-        serializer = ProfileItemSerializer(items, many=True)
-    
-        # Customize response to include domain and category names with all _ar fields
-        response_data = [
-            {
-                'id': item['id'],
-                'name': item['name'],
-                'name_ar': item['name_ar'],
-                'description': item['description'],
-                'description_ar': item['description_ar'],
-                'etat': item['etat'],
-                'profile_domain_name': domain.name,
-                'profile_domain_name_ar': domain.name_ar,
-                'profile_category_name': domain.profile_category.name,
-                'profile_category_name_ar': domain.profile_category.name_ar,
-                'commentaire': item['commentaire'],
-                'commentaire_ar': item['commentaire_ar'],
-                'isPeu': item.get('isPeu', False),
-                'done': item.get('done', False),
-            }
-            for item in serializer.data
-        ]
+        response_data = item_list_payload(items, request, 'Items with isPeu=true retrieved successfully')
         
-        return Response(
-            {'message': 'Items with isPeu=true retrieved successfully', 'data': response_data},
+        return with_validators(Response(
+            response_data,
             status=status.HTTP_200_OK
-        )
+        ), validators)
+    except ValidationError as ve:
+        return Response({'error': ve.detail}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -10,9 +10,9 @@ class EmailOrUsernameModelBackend(ModelBackend):
         try:
             # Check if input is email
             if '@' in username:
-                user = UserModel.objects.get(email__iexact=username)
+                user = UserModel.objects.filter_iexact('email', username).get()
             else:
-                user = UserModel.objects.get(username__iexact=username)
+                user = UserModel.objects.filter_iexact('username', username).get()
             
             if user.check_password(password):
                 return user
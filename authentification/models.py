@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
@@ -34,6 +36,10 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, username, password, **extra_fields)
 
+    def filter_iexact(self, field, value):
+        """Case-insensitive match on email or username, served by the LOWER() indexes."""
+        return self.alias(**{f'{field}_lower': Lower(field)}).filter(**{f'{field}_lower': Lower(Value(value))})
+
 
 def validate_username(value):
     """Validate that username contains only alphanumeric characters or spaces."""
@@ -117,6 +123,10 @@ class CustomUser(AbstractUser):
         verbose_name = _('user')
         verbose_name_plural = _('users')
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(Lower('email'), name='auth_user_email_lower_idx'),
+            models.Index(Lower('username'), name='auth_user_username_lower_idx'),
+        ]
 
     def is_parent(self):
         return self.user_type == self.PARENT
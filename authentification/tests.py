@@ -1,3 +1,13 @@
 from django.test import TestCase
+from backend.testing import QueryPlanMixin
+from authentification.models import CustomUser
 
-# Create your tests here.
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """Case-insensitive user lookups use the functional indexes."""
+
+    def test_user_by_email(self):
+        self.assertIndexed(CustomUser.objects.filter_iexact('email', 'Plan@Example.com').order_by())
+
+    def test_user_by_username(self):
+        self.assertIndexed(CustomUser.objects.filter_iexact('username', 'PLAN').order_by())
@@ -3,6 +3,7 @@ from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .serializers import UserSerializer
+from backend.pagination import KeysetPagination
 from rest_framework.authtoken.models import Token
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
@@ -32,6 +33,8 @@ class UserListCreateView(generics.ListCreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]  # Seulement pour les admins
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_joined', '-id')
 
     def perform_create(self, serializer):
         if not self.request.user.is_staff:
@@ -121,6 +124,8 @@ class LogoutView(APIView):
 class UserListView(generics.ListAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_joined', '-id')
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
 
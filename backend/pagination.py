@@ -0,0 +1,140 @@
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination.
+
+    Requests without `cursor` or `page_size` get the unpaginated response, so
+    existing clients are unaffected. Pages are read with a WHERE on the
+    ordering key of the last row instead of an OFFSET, and the ordering
+    always ends with the primary key so it is stable.
+
+    Works as a DRF pagination_class (a view may set `keyset_ordering`), and
+    from plain ViewSet actions:
+
+        paginator = KeysetPagination(ordering=('id',))
+        page = paginator.paginate_queryset(queryset, request)
+        if page is not None:
+            return paginator.get_paginated_response(serialize(page), 'Things retrieved successfully')
+
+    Every page has the same envelope: {"message": ..., "data": [...], "next": url or null}.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 500
+    message = 'Results retrieved successfully'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.request = None
+        self.next_cursor = None
+        self.page_size_value = self.page_size
+
+    def _fields(self):
+        return [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if not value:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Must be a positive integer'})
+        if size < 1:
+            raise ValidationError({self.page_size_query_param: 'Must be a positive integer'})
+        return min(size, self.max_page_size)
+
+    def encode_cursor(self, values):
+        payload = json.dumps(values, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor, model):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            fields = self._fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [self._to_python(model, name, value) for (name, _), value in zip(fields, values)]
+        except Exception:
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+
+    def _to_python(self, model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # An annotation, e.g. a search relevance score
+            return value
+        return field.to_python(value)
+
+    def _after(self, values):
+        """Filter selecting the rows that come after `values` in the ordering."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def page_queryset(self, queryset, request):
+        """
+        Return the (lazy) queryset of the requested page plus one look-ahead
+        row, or None when pagination was not requested. Pass the evaluated
+        rows (instances or dicts) to finish_page().
+        """
+        if not self.is_requested(request):
+            return None
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor, queryset.model)))
+        return queryset.order_by(*self.ordering)[:self.page_size_value + 1]
+
+    def finish_page(self, rows):
+        """Drop the look-ahead row and remember the cursor of the next page."""
+        rows = list(rows)
+        self.next_cursor = None
+        if len(rows) > self.page_size_value:
+            rows = rows[:self.page_size_value]
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor([
+                last[name] if isinstance(last, dict) else getattr(last, name)
+                for name, _ in self._fields()
+            ])
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if getattr(view, 'keyset_ordering', None):
+            self.ordering = tuple(view.keyset_ordering)
+        page = self.page_queryset(queryset, request)
+        if page is None:
+            return None
+        return self.finish_page(page)
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_payload(self, data, message=None):
+        return {'message': message or self.message, 'data': data, 'next': self.get_next_link()}
+
+    def get_paginated_response(self, data, message=None):
+        return Response(self.get_paginated_payload(data, message))
@@ -0,0 +1,115 @@
+import re
+import unicodedata
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+# Arabic letters folded to a single form before indexing and searching
+ARABIC_FOLDING = str.maketrans({
+    'ى': 'ي',  # alef maksura -> ya
+    'ة': 'ه',  # ta marbuta -> ha
+    'ـ': None,  # tatweel
+})
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_text(*values):
+    """
+    Search form of one or more texts: lowercase, without diacritics (French
+    accents, Arabic harakat), with hamza-carrying alef/waw/ya and alef
+    maksura / ta marbuta folded to their base letters.
+
+    NFKD splits accented and hamza forms into a base letter plus combining
+    marks, which are then dropped.
+    """
+    text = ' '.join(value for value in values if value)
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(TOKEN_RE.findall(text.translate(ARABIC_FOLDING)))
+
+
+def search_tokens(query):
+    return normalize_text(query).split()
+
+
+def _mysql_query(tokens):
+    # Boolean mode: every token required (when long enough to be indexed), prefix matching
+    return ' '.join(f'+{token}*' if len(token) >= 3 else f'{token}*' for token in tokens)
+
+
+def _sqlite_query(tokens):
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def fulltext_search(queryset, query, column='search_text'):
+    """
+    Restrict `queryset` to rows whose full-text indexed `column` matches
+    `query`, annotated with a relevance `search_score` and ordered by it.
+
+    Uses the FULLTEXT index on MySQL and the FTS5 table on SQLite (see
+    create_fulltext_index); other backends fall back to LIKE on the
+    normalized column.
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    vendor = connections[queryset.db].vendor
+    if vendor == 'mysql':
+        match = _mysql_query(tokens)
+        score = RawSQL(f'MATCH(`{table}`.`{column}`) AGAINST (%s IN BOOLEAN MODE)', [match])
+        return queryset.annotate(search_score=score).filter(search_score__gt=0).order_by('-search_score', 'id')
+    if vendor == 'sqlite':
+        fts = f'{table}_fts'
+        match = _sqlite_query(tokens)
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s', [match])
+        ).annotate(
+            search_score=RawSQL(
+                f'(SELECT -bm25("{fts}") FROM "{fts}" WHERE "{fts}" MATCH %s AND "{fts}".rowid = "{table}"."id")',
+                [match],
+            )
+        ).order_by('-search_score', 'id')
+    for token in tokens:
+        queryset = queryset.filter(**{f'{column}__contains': token})
+    return queryset.annotate(search_score=RawSQL('1.0', [])).order_by('id')
+
+
+def create_fulltext_index(schema_editor, table, column='search_text'):
+    """
+    Full-text index on `table`.`column`: FULLTEXT on MySQL, a trigger-synced
+    FTS5 table on SQLite. Idempotent, so migrations that rebuild the table
+    on SQLite (which drops the triggers) can simply call it again.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        with schema_editor.connection.cursor() as cursor:
+            if f'{table}_{column}_ft' in schema_editor.connection.introspection.get_constraints(cursor, table):
+                return
+        schema_editor.execute(f'CREATE FULLTEXT INDEX `{table}_{column}_ft` ON `{table}` (`{column}`)')
+    elif vendor == 'sqlite':
+        fts = f'{table}_fts'
+        statements = [
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5("{column}", content="{table}", content_rowid="id")',
+            f'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"(rowid, "{column}") VALUES (new."id", new."{column}"); END',
+            f'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"("{fts}", rowid, "{column}") VALUES (\'delete\', old."id", old."{column}"); END',
+            f'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"("{fts}", rowid, "{column}") VALUES (\'delete\', old."id", old."{column}"); '
+            f'INSERT INTO "{fts}"(rowid, "{column}") VALUES (new."id", new."{column}"); END',
+            f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')',
+        ]
+        for statement in statements:
+            schema_editor.execute(statement)
+
+
+def drop_fulltext_index(schema_editor, table, column='search_text'):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'DROP INDEX `{table}_{column}_ft` ON `{table}`')
+    elif vendor == 'sqlite':
+        fts = f'{table}_fts'
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{suffix}"')
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{fts}"')
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 import pymysql
 
 # Configure PyMySQL to work with Django
@@ -172,6 +173,42 @@ DATABASES = {
 #         f"Invalid DB_ENGINE: {DB_ENGINE}. Must be 'mysql' or 'postgresql'. "
 #         "SQLite is not supported. Please set DB_ENGINE in your .env file."
 #     )
+# Caches
+# Profile permissions are cached per (user, profile) in the 'permissions'
+# cache. It is local to each process by default, so a revocation reaches the
+# other workers only when their entry expires (PERMISSION_CACHE_TTL, 30s);
+# point PERMISSION_CACHE_URL at Redis to share it between workers.
+# Live provisioning progress goes to the 'provisioning' cache, which every
+# worker must see: a file cache shared by the processes of one host by
+# default; point PROVISIONING_CACHE_URL at Redis when workers span hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'permissions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'profile-permissions',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    'provisioning': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('PROVISIONING_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'backpsyced-provisioning')),
+    },
+}
+if os.getenv('PERMISSION_CACHE_URL'):
+    CACHES['permissions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('PERMISSION_CACHE_URL'),
+        'KEY_PREFIX': 'profile-permissions',
+    }
+PERMISSION_CACHE_TTL = int(os.getenv('PERMISSION_CACHE_TTL', '300' if os.getenv('PERMISSION_CACHE_URL') else '30'))
+if os.getenv('PROVISIONING_CACHE_URL'):
+    CACHES['provisioning'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('PROVISIONING_CACHE_URL'),
+        'KEY_PREFIX': 'profile-provisioning',
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
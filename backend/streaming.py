@@ -0,0 +1,82 @@
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+# Same output as DRF's JSONRenderer: compact separators, unescaped unicode
+_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+CHUNK_SIZE = 500
+BUFFER_SIZE = 64 * 1024
+
+
+def buffered(pieces, size=BUFFER_SIZE):
+    """Join small string pieces into chunks of about `size` bytes."""
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_json_array(objects, serialize):
+    """Encode `serialize(obj)` for each object as one JSON array, piece by piece."""
+    yield '['
+    for index, obj in enumerate(objects):
+        # Separator and element in one piece: a failure never leaves a dangling comma
+        encoded = _encoder.encode(serialize(obj))
+        yield ',' + encoded if index else encoded
+    yield ']'
+
+
+def iter_queryset(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Iterate a queryset in primary key order, one query per chunk of
+    `chunk_size` rows picked with pk > last pk (keyset), so memory stays
+    bounded by the chunk. queryset.iterator() is no help here: the MySQL
+    driver buffers the whole result set client side. Prefetches run per chunk.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+def streaming_json_response(objects, serialize, envelope=None, key='data', status=200):
+    """
+    Stream a JSON array of serialized objects without building it in memory.
+
+    With `envelope` (a dict of other top-level keys), the array is written
+    under `key`, e.g. {"message": "...", "data": [...]}, matching what the
+    non-streaming views return.
+
+    The status line is sent before the rows are read, so a failure while
+    streaming cannot become a 500 anymore. With an envelope the array is
+    closed and an "error" key added; a bare array is left unterminated and
+    the exception re-raised so the server aborts the response. Either way
+    the client cannot mistake a partial list for a complete one.
+    """
+    def pieces():
+        if envelope is not None:
+            head = _encoder.encode(envelope)
+            yield head[:-1] + (',' if len(head) > 2 else '') + _encoder.encode(key) + ':'
+        try:
+            yield from iter_json_array(objects, serialize)
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            if envelope is None:
+                raise
+            yield '],' + _encoder.encode('error') + ':' + _encoder.encode(str(e))
+        if envelope is not None:
+            yield '}'
+
+    return StreamingHttpResponse(buffered(pieces()), status=status, content_type='application/json')
@@ -0,0 +1,59 @@
+import json
+import re
+from django.db import connection
+
+
+def _mysql_tables(node):
+    """Every table access of a MySQL JSON plan."""
+    if isinstance(node, dict):
+        if 'table_name' in node:
+            yield node
+        for value in node.values():
+            yield from _mysql_tables(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _mysql_tables(value)
+
+
+def _mysql_sorts(node):
+    if isinstance(node, dict):
+        if node.get('using_filesort'):
+            yield node
+        for value in node.values():
+            yield from _mysql_sorts(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _mysql_sorts(value)
+
+
+class QueryPlanMixin:
+    """
+    EXPLAIN a hot queryset and fail when it falls back to a full table scan,
+    or sorts rows that an index should already return in order.
+    """
+
+    def assertIndexed(self, queryset, ordered=False):
+        table = queryset.model._meta.db_table
+        vendor = connection.vendor
+        if vendor == 'sqlite':
+            plan = queryset.explain()
+            self.assertIsNone(
+                re.search(rf'\bSCAN "?{re.escape(table)}"?(?!_)(?! VIRTUAL TABLE)', plan),
+                f'Full scan of {table}:\n{plan}\n{queryset.query}',
+            )
+            if ordered:
+                self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, f'Sort of {table}:\n{plan}')
+        elif vendor == 'mysql':
+            plan = json.loads(queryset.explain(format='json'))
+            for access in _mysql_tables(plan):
+                if access['table_name'] == table:
+                    # Tiny test tables may be read whole even with an index; a
+                    # regression is a scan with no usable index at all
+                    self.assertFalse(
+                        access.get('access_type') == 'ALL' and not access.get('possible_keys'),
+                        f'Full scan of {table}:\n{json.dumps(plan, indent=2)}',
+                    )
+            if ordered:
+                self.assertFalse(list(_mysql_sorts(plan)), f'Sort of {table}:\n{json.dumps(plan, indent=2)}')
+        else:
+            self.skipTest(f'No plan checks for {vendor}')
@@ -0,0 +1,102 @@
+import json
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from authentification.models import CustomUser
+from backend.streaming import iter_queryset, streaming_json_response
+from notes.models import Note
+from profiles.models import Profile
+from profiles.permissions import PERMISSION_CACHE, grant_profile_permissions
+
+
+class KeysetPaginationTests(TestCase):
+    """Every paginated list answers {message, data, next} and its cursors walk each row once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('pages@example.com', 'pages', 'pw', accepte_conditions=True)
+        cls.admin = CustomUser.objects.create_superuser('admin@example.com', 'admin', 'pw', accepte_conditions=True)
+        cls.profiles = [
+            Profile.objects.create(first_name=f'Page{index}', last_name='Test', birth_date='2015-01-01')
+            for index in range(5)
+        ]
+        for profile in cls.profiles:
+            grant_profile_permissions(profile.pk, cls.user.pk, ['view', 'edit'])
+        cls.notes = [
+            Note.objects.create(profile=cls.profiles[0], author=cls.user, content=f'Note {index}')
+            for index in range(5)
+        ]
+
+    def setUp(self):
+        caches[PERMISSION_CACHE].clear()
+
+    def walk(self, user, url, page_size=2):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url, {'page_size': page_size})
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(set(response.data), {'message', 'data', 'next'})
+            pages.append([row['id'] for row in response.data['data']])
+            if response.data['next'] is None:
+                return pages
+            response = client.get(response.data['next'])
+
+    def test_profiles_by_user(self):
+        pages = self.walk(self.user, f'/api/profiles/user/{self.user.pk}/')
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sorted(sum(pages, [])), sorted(profile.pk for profile in self.profiles))
+
+    def test_list_all(self):
+        pages = self.walk(self.admin, '/api/profiles/list-all/', page_size=3)
+        self.assertEqual(sorted(sum(pages, [])), sorted(profile.pk for profile in self.profiles))
+
+    def test_notes(self):
+        pages = self.walk(self.user, '/api/notes/', page_size=2)
+        # Newest first, ties broken by id
+        self.assertEqual(sum(pages, []), [note.pk for note in reversed(self.notes)])
+
+    def test_unpaginated_and_invalid_requests(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(f'/api/profiles/user/{self.user.pk}/')
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 5)
+        self.assertEqual(client.get(f'/api/profiles/user/{self.user.pk}/', {'cursor': 'junk'}).status_code, 400)
+        self.assertEqual(client.get(f'/api/profiles/user/{self.user.pk}/', {'page_size': '0'}).status_code, 400)
+
+
+class StreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profiles = [
+            Profile.objects.create(first_name=f'Stream{index}', last_name='Test', birth_date='2015-01-01')
+            for index in range(5)
+        ]
+
+    def test_iter_queryset_reads_keyset_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            profiles = list(iter_queryset(Profile.objects.order_by('-first_name'), chunk_size=2))
+        self.assertEqual([profile.pk for profile in profiles], sorted(profile.pk for profile in self.profiles))
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(all('LIMIT 2' in query['sql'] for query in queries))
+
+    def failing_serializer(self, profile):
+        if profile.pk == self.profiles[2].pk:
+            raise ValueError('broken row')
+        return {'id': profile.pk}
+
+    def test_failure_mid_stream_is_reported_in_the_envelope(self):
+        response = streaming_json_response(
+            iter_queryset(Profile.objects.all()), self.failing_serializer, envelope={'message': 'ok'},
+        )
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['data'], [{'id': profile.pk} for profile in self.profiles[:2]])
+        self.assertEqual(body['error'], 'broken row')
+
+    def test_failure_mid_stream_aborts_a_bare_array(self):
+        response = streaming_json_response(iter_queryset(Profile.objects.all()), self.failing_serializer)
+        with self.assertRaises(ValueError):
+            b''.join(response.streaming_content)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProfileDomain', '0003_profiledomain_profile'),
+        ('goals', '0001_initial'),
+        ('profiles', '0006_permission_lookup_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['profile', 'created_at'], name='goal_profile_created_idx'),
+        ),
+    ]
@@ -34,6 +34,9 @@ class Goal(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['profile', 'created_at'], name='goal_profile_created_idx'),
+        ]
 
 class SubObjective(models.Model):
     goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='sub_objectives')
@@ -0,0 +1,8 @@
+from django.test import TestCase
+from backend.testing import QueryPlanMixin
+from goals.models import Goal
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    def test_goals_by_profile(self):
+        self.assertIndexed(Goal.objects.filter(profile_id=1).order_by('-created_at'), ordered=True)
@@ -1,18 +1,22 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
+from backend.pagination import KeysetPagination
 from .models import Goal, SubObjective
 from .serializers import GoalSerializer, SubObjectiveSerializer
-from profiles.models import Profile, SharedProfilePermission
+from profiles.models import Profile
+from profiles.permissions import accessible_profile_ids, has_any_profile_permission, has_profile_permission
+from profiles.serializers import profile_serializer_prefetches
 from rest_framework import serializers
 from .translation_utils import translation_service
 
 class GoalViewSet(viewsets.ModelViewSet):
     serializer_class = GoalSerializer
+    pagination_class = KeysetPagination
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Goal.objects.all().prefetch_related('sub_objectives', 'profile')
+        queryset = Goal.objects.all().prefetch_related('sub_objectives', 'profile', *profile_serializer_prefetches('profile__'))
 
         if user.is_superuser:
             return queryset
@@ -25,23 +29,14 @@ class GoalViewSet(viewsets.ModelViewSet):
             except ValueError:
                 return Goal.objects.none()
             
-            has_permission = SharedProfilePermission.objects.filter(
-                profile__id=requested_profile_id,
-                shared_with=user,
-                permissions__in=['view', 'edit', 'share', 'delete']
-            ).exists()
+            has_permission = has_any_profile_permission(user, requested_profile_id, self.request)
 
             if has_permission:
                 queryset = queryset.filter(profile__id=requested_profile_id)
             else:
                 return Goal.objects.none() 
         else:
-            accessible_profile_ids = SharedProfilePermission.objects.filter(
-                shared_with=user, 
-                permissions__in=['view', 'edit', 'share', 'delete']
-            ).values_list('profile__id', flat=True)
-            
-            queryset = queryset.filter(profile__id__in=accessible_profile_ids)
+            queryset = queryset.filter(profile__id__in=accessible_profile_ids(user))
             
         return queryset.distinct()
 
@@ -56,11 +51,7 @@ class GoalViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError({"profile_id": "Profile not found."})
 
         if not self.request.user.is_superuser:
-            has_edit_permission = SharedProfilePermission.objects.filter(
-                profile=profile,
-                shared_with=self.request.user,
-                permissions='edit'
-            ).exists()
+            has_edit_permission = has_profile_permission(self.request.user, profile, 'edit', self.request)
             if not has_edit_permission:
                 raise permissions.PermissionDenied("You do not have permission to add goals to this profile.")
 
@@ -91,11 +82,7 @@ class GoalViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         instance = self.get_object()
         if not self.request.user.is_superuser:
-            has_edit_permission = SharedProfilePermission.objects.filter(
-                profile=instance.profile,
-                shared_with=self.request.user,
-                permissions='edit'
-            ).exists()
+            has_edit_permission = has_profile_permission(self.request.user, instance.profile_id, 'edit', self.request)
             if not has_edit_permission:
                 raise permissions.PermissionDenied("You do not have permission to edit goals for this profile.")
         
@@ -142,11 +129,7 @@ class GoalViewSet(viewsets.ModelViewSet):
 
     def perform_destroy(self, instance):
         if not self.request.user.is_superuser:
-            has_delete_permission = SharedProfilePermission.objects.filter(
-                profile=instance.profile,
-                shared_with=self.request.user,
-                permissions='delete'
-            ).exists()
+            has_delete_permission = has_profile_permission(self.request.user, instance.profile_id, 'delete', self.request)
             if not has_delete_permission:
                 raise permissions.PermissionDenied("You do not have permission to delete goals for this profile.")
         instance.delete()
\ No newline at end of file
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 15:30
+
+from django.db import migrations, models
+from backend.search import create_fulltext_index, drop_fulltext_index, normalize_text
+
+
+def backfill_search_text(apps, schema_editor):
+    Note = apps.get_model('notes', 'Note')
+    notes = []
+    for note in Note.objects.only('id', 'content', 'content_ar').iterator(chunk_size=2000):
+        note.search_text = normalize_text(note.content, note.content_ar)
+        notes.append(note)
+        if len(notes) >= 2000:
+            Note.objects.bulk_update(notes, ['search_text'], batch_size=500)
+            notes = []
+    Note.objects.bulk_update(notes, ['search_text'], batch_size=500)
+
+
+def create_index(apps, schema_editor):
+    create_fulltext_index(schema_editor, 'notes_note')
+
+
+def drop_index(apps, schema_editor):
+    drop_fulltext_index(schema_editor, 'notes_note')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
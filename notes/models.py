@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from backend.search import normalize_text
 from profiles.models import Profile
 
 class Note(models.Model):
@@ -40,11 +43,28 @@ class Note(models.Model):
         auto_now=True,
         verbose_name="Last Updated At"
     )
+    # Normalized content and content_ar, full-text indexed
+    search_text = models.TextField(
+        blank=True,
+        default='',
+        editable=False
+    )
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['profile', 'created_at'], name='note_profile_created_idx'),
+        ]
         verbose_name = "Note"
         verbose_name_plural = "Notes"
 
     def __str__(self):
-        return f"Note by {self.author.username} for {self.profile.first_name} {self.profile.last_name}: {self.content[:30]}..."
\ No newline at end of file
+        return f"Note by {self.author.username} for {self.profile.first_name} {self.profile.last_name}: {self.content[:30]}..."
+
+    def refresh_search_text(self):
+        self.search_text = normalize_text(self.content, self.content_ar)
+
+
+@receiver(pre_save, sender=Note)
+def refresh_search_text(sender, instance, **kwargs):
+    instance.refresh_search_text()
@@ -0,0 +1,55 @@
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework.test import APIClient
+from authentification.models import CustomUser
+from backend.testing import QueryPlanMixin
+from notes.models import Note
+from profiles.models import Profile
+from profiles.permissions import PERMISSION_CACHE, grant_profile_permissions
+
+
+class NoteSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('notes@example.com', 'notes', 'pw', accepte_conditions=True)
+        cls.profile = Profile.objects.create(first_name='Notes', last_name='Test', birth_date='2015-01-01')
+        cls.hidden = Profile.objects.create(first_name='Hidden', last_name='Test', birth_date='2015-01-01')
+        grant_profile_permissions(cls.profile.pk, cls.user.pk, ['view', 'edit'])
+        cls.french = Note.objects.create(profile=cls.profile, author=cls.user, content='Progrès en lecture à l’école')
+        cls.arabic = Note.objects.create(profile=cls.profile, author=cls.user, content='', content_ar='تحسن في القراءة')
+        Note.objects.create(profile=cls.profile, author=cls.user, content='Sommeil agité')
+        cls.hidden_note = Note.objects.create(profile=cls.hidden, author=cls.user, content='Lecture ailleurs')
+
+    def setUp(self):
+        caches[PERMISSION_CACHE].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query):
+        response = self.client.get('/api/notes/', {'search': query, 'profile_id': self.profile.pk})
+        self.assertEqual(response.status_code, 200)
+        return [note['id'] for note in response.data]
+
+    def test_matches_are_folded(self):
+        self.assertEqual(self.search('LECTURE'), [self.french.pk])
+        self.assertEqual(self.search('progres ecole'), [self.french.pk])
+        self.assertEqual(self.search('القراءه'), [self.arabic.pk])
+        self.assertEqual(self.search('absent'), [])
+
+    def test_edited_note_is_reindexed(self):
+        self.french.content = 'Progrès en calcul'
+        self.french.save()
+        self.assertEqual(self.search('lecture'), [])
+        self.assertEqual(self.search('calcul'), [self.french.pk])
+
+    def test_superuser_search_is_paged_by_relevance(self):
+        admin = CustomUser.objects.create_superuser('admin@example.com', 'admin', 'pw', accepte_conditions=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/notes/', {'search': 'lecture', 'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({note['id'] for note in response.data['data']}, {self.french.pk, self.hidden_note.pk})
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    def test_notes_by_profile(self):
+        self.assertIndexed(Note.objects.filter(profile_id=1).order_by('-created_at'), ordered=True)
@@ -1,10 +1,15 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
+from backend.pagination import KeysetPagination
+from backend.search import fulltext_search, search_tokens
 from .models import Note
 from .serializers import NoteSerializer
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 import datetime
-from profiles.models import Profile, SharedProfilePermission
+from profiles.models import Profile
+from profiles.permissions import accessible_profile_ids, has_any_profile_permission, has_profile_permission
+from profiles.serializers import profile_serializer_prefetches
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .translation_utils import translation_service
@@ -28,14 +33,7 @@ class IsProfilePermitted(permissions.BasePermission):
             except Profile.DoesNotExist:
                 raise permissions.PermissionDenied({"detail": "Profile not found."})
 
-            if request.user.is_superuser:
-                return True
-            
-            return SharedProfilePermission.objects.filter(
-                profile=profile,
-                shared_with=request.user,
-                permissions='edit'
-            ).exists()
+            return has_profile_permission(request.user, profile, 'edit', request)
         
         return request.user and request.user.is_authenticated
 
@@ -47,62 +45,58 @@ class IsProfilePermitted(permissions.BasePermission):
             return False
 
         if request.method in permissions.SAFE_METHODS:
-            return SharedProfilePermission.objects.filter(
-                profile=obj.profile,
-                shared_with=request.user,
-                permissions__in=['view', 'edit', 'share', 'delete']
-            ).exists()
+            return has_any_profile_permission(request.user, obj.profile_id, request)
         else:
             required_permission_for_action = 'edit'
             if request.method == 'DELETE':
                 required_permission_for_action = 'delete'
             
-            return SharedProfilePermission.objects.filter(
-                profile=obj.profile,
-                shared_with=request.user,
-                permissions=required_permission_for_action
-            ).exists()
+            return has_profile_permission(request.user, obj.profile_id, required_permission_for_action, request)
 
 class NoteViewSet(viewsets.ModelViewSet):
     serializer_class = NoteSerializer
+    pagination_class = KeysetPagination
     permission_classes = [permissions.IsAuthenticated, IsProfilePermitted]
 
+    def _search_query(self):
+        search_query = self.request.query_params.get('search', None)
+        if search_query is not None and search_tokens(search_query):
+            return search_query
+        return None
+
+    @property
+    def keyset_ordering(self):
+        # Search results are paged by relevance
+        if self._search_query() is not None:
+            return ('-search_score', '-id')
+        return KeysetPagination.ordering
+
     def get_queryset(self):
         user = self.request.user
-        queryset = Note.objects.all().prefetch_related('profile', 'author')
+        queryset = Note.objects.all().prefetch_related('profile', 'author', *profile_serializer_prefetches('profile__'))
 
-        if user.is_superuser:
-            return queryset
+        # Superusers see every note, the search and filters below still apply
+        if not user.is_superuser:
+            profile_id_param = self.request.query_params.get('profile_id')
 
-        profile_id_param = self.request.query_params.get('profile_id')
+            if profile_id_param:
+                try:
+                    requested_profile_id = int(profile_id_param)
+                except ValueError:
+                    return Note.objects.none()
 
-        if profile_id_param:
-            try:
-                requested_profile_id = int(profile_id_param)
-            except ValueError:
-                return Note.objects.none()
+                has_permission = has_any_profile_permission(user, requested_profile_id, self.request)
 
-            has_permission = SharedProfilePermission.objects.filter(
-                profile__id=requested_profile_id,
-                shared_with=user,
-                permissions__in=['view', 'edit', 'share', 'delete']
-            ).exists()
-
-            if has_permission:
-                queryset = queryset.filter(profile__id=requested_profile_id)
+                if has_permission:
+                    queryset = queryset.filter(profile__id=requested_profile_id)
+                else:
+                    return Note.objects.none()
             else:
-                return Note.objects.none()
-        else:
-            accessible_profile_ids = SharedProfilePermission.objects.filter(
-                shared_with=user,
-                permissions__in=['view', 'edit', 'share', 'delete']
-            ).values_list('profile__id', flat=True)
-            
-            queryset = queryset.filter(profile__id__in=accessible_profile_ids)
+                queryset = queryset.filter(profile__id__in=accessible_profile_ids(user))
 
-        search_query = self.request.query_params.get('search', None)
+        search_query = self._search_query()
         if search_query is not None:
-            queryset = queryset.filter(content__icontains=search_query)
+            queryset = fulltext_search(queryset, search_query)
 
         important_filter = self.request.query_params.get('important', None)
         if important_filter is not None:
@@ -116,26 +110,28 @@ class NoteViewSet(viewsets.ModelViewSet):
 
         if start_date_str:
             try:
-                start_date = datetime.datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__gte=start_date)
+                start_date = datetime.datetime.strptime(start_date_str, '%Y-%m-%d')
+                queryset = queryset.filter(created_at__gte=timezone.make_aware(start_date))
             except ValueError:
                 pass
 
         if end_date_str:
             try:
-                end_date = datetime.datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__lte=end_date)
+                end_date = datetime.datetime.strptime(end_date_str, '%Y-%m-%d')
+                queryset = queryset.filter(created_at__lt=timezone.make_aware(end_date + datetime.timedelta(days=1)))
             except ValueError:
                 pass
         
         author_username = self.request.query_params.get('author_username', None)
         if author_username:
             try:
-                author_user = User.objects.get(username__iexact=author_username)
+                author_user = User.objects.filter_iexact('username', author_username).get()
                 queryset = queryset.filter(author=author_user)
             except User.DoesNotExist:
                 queryset = queryset.none()
 
+        if search_query is not None:
+            return queryset.order_by('-search_score', '-id').distinct()
         return queryset.order_by('-created_at').distinct()
 
     def perform_create(self, serializer):
@@ -149,11 +145,7 @@ class NoteViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError({"profile_id": "Profile not found."})
 
         if not self.request.user.is_superuser:
-            has_edit_permission = SharedProfilePermission.objects.filter(
-                profile=profile,
-                shared_with=self.request.user,
-                permissions='edit'
-            ).exists()
+            has_edit_permission = has_profile_permission(self.request.user, profile, 'edit', self.request)
             if not has_edit_permission:
                 raise permissions.PermissionDenied("You do not have permission to add notes to this profile.")
 
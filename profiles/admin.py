@@ -34,6 +34,10 @@ class ProfileAdmin(admin.ModelAdmin):
 
 @admin.register(SharedProfilePermission)
 class SharedProfilePermissionAdmin(admin.ModelAdmin):
-    list_display = ['profile', 'shared_with', 'permissions']
-    list_filter = ['permissions']
-    search_fields = ['profile__first_name', 'profile__last_name', 'shared_with__username']
\ No newline at end of file
+    list_display = ['profile', 'shared_with', 'get_permission_names']
+    search_fields = ['profile__first_name', 'profile__last_name', 'shared_with__username']
+
+    def get_permission_names(self, obj):
+        return ", ".join(obj.permission_names) or "-"
+
+    get_permission_names.short_description = "Permissions"
@@ -0,0 +1,100 @@
+from collections import Counter
+from itertools import compress
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import ProfileItem
+
+ETATS = [choice[0] for choice in ProfileItem.ETAT_CHOICES]
+WEAKEST_DOMAINS = 5
+MAX_WEAKEST_DOMAINS = 50
+
+
+def _load_columns(profile):
+    """Item state of a whole profile as parallel columns, read with one query."""
+    rows = ProfileItem.objects.filter(profile=profile).order_by().values_list(
+        'profile_domain_id',
+        'profile_domain__profile_category_id',
+        'etat',
+        'isPeu',
+        'done',
+    )
+    columns = list(zip(*rows))
+    return columns if columns else [(), (), (), (), ()]
+
+
+def _profile_domains(profile):
+    return ProfileDomain.objects.filter(profile=profile).order_by('profile_category_id', 'id').values(
+        'id', 'name', 'name_ar', 'profile_category_id', 'profile_category__name', 'profile_category__name_ar',
+    )
+
+
+def _group_stats(keys, etats, peus, dones):
+    """Per-key item count, etat distribution and isPeu/done counts, computed column-wise."""
+    totals = Counter(keys)
+    etat_counts = Counter(zip(keys, etats))
+    peu_counts = Counter(compress(keys, peus))
+    done_counts = Counter(compress(keys, dones))
+    return {
+        key: _summary(total, {etat: etat_counts[(key, etat)] for etat in ETATS}, peu_counts[key], done_counts[key])
+        for key, total in totals.items()
+    }
+
+
+def _summary(total, distribution, peu, done):
+    return {
+        'item_count': total,
+        'etat_distribution': distribution,
+        'acquis_ratio': distribution['ACQUIS'] / total if total else 0.0,
+        'peu_ratio': peu / total if total else 0.0,
+        'done_ratio': done / total if total else 0.0,
+    }
+
+
+def profile_analytics(profile, weakest=WEAKEST_DOMAINS):
+    """
+    Etat distribution and isPeu/done ratios for a profile, per domain, per
+    category and overall, plus the `weakest` domains by acquis ratio.
+
+    Items are loaded once as columns; names come from one extra query over
+    the (few) domains of the profile.
+    """
+    domain_ids, category_ids, etats, peus, dones = _load_columns(profile)
+    domain_stats = _group_stats(domain_ids, etats, peus, dones)
+    category_stats = _group_stats(category_ids, etats, peus, dones)
+    etat_counts = Counter(etats)
+    overall = _summary(
+        len(etats),
+        {etat: etat_counts[etat] for etat in ETATS},
+        sum(peus),
+        sum(dones),
+    )
+
+    domains = []
+    categories = {}
+    for domain in _profile_domains(profile):
+        stats = domain_stats.get(domain['id'])
+        if stats is None:
+            continue
+        domains.append({
+            'id': domain['id'],
+            'name': domain['name'],
+            'name_ar': domain['name_ar'],
+            'category_id': domain['profile_category_id'],
+            **stats
+        })
+        categories.setdefault(domain['profile_category_id'], {
+            'id': domain['profile_category_id'],
+            'name': domain['profile_category__name'],
+            'name_ar': domain['profile_category__name_ar'],
+            **category_stats[domain['profile_category_id']]
+        })
+
+    weakest_domains = sorted(domains, key=lambda domain: (domain['acquis_ratio'], domain['id']))[:weakest]
+    return {
+        **overall,
+        'domains': domains,
+        'categories': list(categories.values()),
+        'weakest_domains': [
+            {'id': domain['id'], 'name': domain['name'], 'name_ar': domain['name_ar'], 'acquis_ratio': domain['acquis_ratio']}
+            for domain in weakest_domains
+        ],
+    }
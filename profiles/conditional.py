@@ -0,0 +1,28 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def profile_validators(profile):
+    """
+    HTTP validators (ETag, Last-Modified timestamp) for anything read from a
+    profile's hierarchy. They come from the profile row the views already
+    load for the permission check, so computing them costs no query.
+    """
+    updated_at = profile.updated_at.timestamp()
+    etag = quote_etag(f'{profile.pk}-{profile.version}-{int(updated_at * 1000000)}')
+    return etag, int(updated_at)
+
+
+def not_modified_response(request, validators):
+    """A 304 response when the request's If-None-Match / If-Modified-Since still match, else None."""
+    etag, last_modified = validators
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def with_validators(response, validators):
+    """Attach the validators so clients can revalidate instead of downloading again."""
+    etag, last_modified = validators
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
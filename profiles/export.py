@@ -0,0 +1,105 @@
+import csv
+import tempfile
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, StreamingHttpResponse
+from backend.streaming import buffered, iter_queryset
+from ProfileItem.models import ProfileItem
+from .models import Profile
+
+EXPORT_TYPES = ['csv', 'xlsx']
+
+EXPORT_HEADERS = [
+    'profile_id', 'first_name', 'last_name',
+    'category', 'category_ar', 'domain', 'domain_ar',
+    'item', 'item_ar', 'etat', 'isPeu', 'done', 'commentaire', 'commentaire_ar',
+]
+
+
+class XlsxUnavailable(Exception):
+    pass
+
+
+def evaluation_rows(profile_ids):
+    """
+    Evaluation grid rows of the given profiles (a list or a subquery of ids).
+
+    Profiles are read in keyset chunks (iter_queryset) and each grid with one
+    query through the category/domain/item joins, so memory stays bounded by
+    one profile's grid: the MySQL driver buffers a whole result set client
+    side, even through queryset.iterator().
+    """
+    profiles = Profile.objects.filter(pk__in=profile_ids).only('id', 'first_name', 'last_name')
+    for profile in iter_queryset(profiles):
+        grid = ProfileItem.objects.filter(
+            profile_id=profile.pk
+        ).order_by(
+            'profile_domain__profile_category_id', 'profile_domain_id', 'id'
+        ).values_list(
+            'profile_domain__profile_category__name',
+            'profile_domain__profile_category__name_ar',
+            'profile_domain__name',
+            'profile_domain__name_ar',
+            Coalesce('name', 'catalog_item__name'),
+            Coalesce('name_ar', 'catalog_item__name_ar'),
+            'etat',
+            'isPeu',
+            'done',
+            'commentaire',
+            'commentaire_ar',
+        )
+        for row in grid:
+            yield (profile.pk, profile.first_name, profile.last_name, *row)
+
+
+class _Echo:
+    """File-like object whose write() hands back the line for streaming."""
+    def write(self, value):
+        return value
+
+
+def csv_response(rows, filename):
+    """Stream rows as UTF-8 CSV (with a BOM so spreadsheet apps pick up Arabic text)."""
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield '\ufeff'
+        yield writer.writerow(EXPORT_HEADERS)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(buffered(lines()), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(rows, filename):
+    """
+    Write rows to an XLSX file in xlsxwriter's constant-memory mode (one row
+    in memory at a time) and stream the finished file from disk.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise XlsxUnavailable('XLSX export requires the xlsxwriter package')
+
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'in_memory': False})
+    worksheet = workbook.add_worksheet('Evaluation')
+    bold = workbook.add_format({'bold': True})
+    worksheet.write_row(0, 0, EXPORT_HEADERS, bold)
+    for row_number, row in enumerate(rows, start=1):
+        worksheet.write_row(row_number, 0, row)
+    workbook.close()
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{filename}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def export_response(profile_ids, export_type, filename):
+    if export_type == 'xlsx':
+        return xlsx_response(evaluation_rows(profile_ids), filename)
+    return csv_response(evaluation_rows(profile_ids), filename)
@@ -0,0 +1,256 @@
+import csv
+import io
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from ProfileDomain.metrics import mark_domain_dirty, record_evaluation
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import ItemEvaluation, PendingTranslation, ProfileItem
+from .models import Profile
+from .provisioning import bulk_create_with_ids
+
+IMPORT_CHUNK_SIZE = 500
+TRUE_VALUES = ['true', '1', 'yes', 'oui', 'x']
+FALSE_VALUES = ['false', '0', 'no', 'non', '']
+# Text fields whose missing other-language side is queued for translation
+TRANSLATED_FIELDS = ['name', 'description', 'commentaire']
+
+
+class ImportRowError(Exception):
+    pass
+
+
+def _key(value):
+    return (value or '').strip().casefold()
+
+
+def _bool(row, column):
+    value = row.get(column)
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ImportRowError(f"Invalid {column} value: {row[column]}")
+
+
+class _ProfileIndex:
+    """Lookups over the domains and items of one profile, loaded with two queries."""
+
+    def __init__(self, profile):
+        self.domains = {}
+        self.domains_by_name = defaultdict(set)
+        for domain_id, name, name_ar, category, category_ar in ProfileDomain.objects.filter(
+            profile=profile
+        ).values_list('id', 'name', 'name_ar', 'profile_category__name', 'profile_category__name_ar'):
+            self.domains[domain_id] = name
+            for domain_name in (name, name_ar):
+                if domain_name:
+                    self.domains_by_name[('', _key(domain_name))].add(domain_id)
+                    for category_name in (category, category_ar):
+                        if category_name:
+                            self.domains_by_name[(_key(category_name), _key(domain_name))].add(domain_id)
+
+        self.items = {}
+        self.items_by_digest = {}
+        self.items_by_name = defaultdict(set)
+        for item_id, domain_id, digest, name, name_ar in ProfileItem.objects.filter(
+            profile=profile
+        ).values_list(
+            'id', 'profile_domain_id', 'catalog_item__digest',
+            Coalesce('name', 'catalog_item__name'), Coalesce('name_ar', 'catalog_item__name_ar'),
+        ):
+            self.items[item_id] = domain_id
+            if digest:
+                self.items_by_digest[digest] = item_id
+            for item_name in (name, name_ar):
+                if item_name:
+                    self.items_by_name[(domain_id, _key(item_name))].add(item_id)
+
+    def domain_for(self, row):
+        domain_id = (row.get('domain_id') or '').strip()
+        if domain_id:
+            if not domain_id.isdigit() or int(domain_id) not in self.domains:
+                raise ImportRowError(f"Domain {domain_id} does not belong to this profile")
+            return int(domain_id)
+        category = _key(row.get('category') or row.get('category_ar'))
+        for column in ('domain', 'domain_ar'):
+            if _key(row.get(column)):
+                matches = self.domains_by_name.get((category, _key(row[column])), set())
+                if len(matches) > 1:
+                    raise ImportRowError(f"Domain '{row[column]}' is ambiguous, add the category or domain_id")
+                if matches:
+                    return next(iter(matches))
+        raise ImportRowError("Domain not found")
+
+    def item_for(self, row, domain_id):
+        """Match by item id, then template identity (catalog digest), then name within the domain."""
+        item_id = (row.get('item_id') or '').strip()
+        if item_id:
+            if not item_id.isdigit() or int(item_id) not in self.items:
+                raise ImportRowError(f"Item {item_id} does not belong to this profile")
+            return int(item_id)
+        digest = (row.get('digest') or '').strip()
+        if digest:
+            if digest not in self.items_by_digest:
+                raise ImportRowError(f"No item of this profile comes from template item {digest}")
+            return self.items_by_digest[digest]
+        for column in ('item', 'item_ar'):
+            if _key(row.get(column)):
+                matches = self.items_by_name.get((domain_id, _key(row[column])), set())
+                if len(matches) > 1:
+                    raise ImportRowError(f"Item '{row[column]}' is ambiguous, use item_id")
+                if matches:
+                    return next(iter(matches))
+        return None
+
+
+def _parse_row(row):
+    """Validated field changes of one CSV row."""
+    changes = {}
+    etat = (row.get('etat') or '').strip().upper()
+    if etat:
+        if etat not in [choice[0] for choice in ProfileItem.ETAT_CHOICES]:
+            raise ImportRowError(f"Invalid etat: {row['etat']}")
+        changes['etat'] = etat
+    for column in ('isPeu', 'done'):
+        value = _bool(row, column)
+        if value is not None:
+            changes[column] = value
+    for column in ('commentaire', 'commentaire_ar'):
+        if row.get(column) is not None and row[column].strip():
+            changes[column] = row[column].strip()
+    return changes
+
+
+def _missing_translations(values):
+    """Fields with text on exactly one language side."""
+    return [
+        field for field in TRANSLATED_FIELDS
+        if bool((values.get(field) or '').strip()) != bool((values.get(f'{field}_ar') or '').strip())
+    ]
+
+
+def import_evaluations(profile, file, user=None, dry_run=False):
+    """
+    Import evaluations and custom items of a profile from a CSV file.
+
+    Rows are validated in one streaming pass against an in-memory index of
+    the profile. Valid rows are then applied with chunked bulk_update /
+    bulk_create, the updated items locked and re-read first. Missing translations are queued (PendingTranslation), and
+    the metrics of every touched domain are recounted once at commit.
+    Invalid rows are reported and skipped.
+    """
+    index = _ProfileIndex(profile)
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    errors = []
+    updates = {}
+    creates = []
+    for row_number, row in enumerate(reader, start=2):
+        try:
+            changes = _parse_row(row)
+            domain_id = index.domain_for(row)
+            item_id = index.item_for(row, domain_id)
+            if item_id is None:
+                name = (row.get('item') or '').strip()
+                name_ar = (row.get('item_ar') or '').strip()
+                if not name and not name_ar:
+                    raise ImportRowError("Item not found and no item name to create it")
+                creates.append((domain_id, name, name_ar, changes))
+                continue
+            if item_id in updates:
+                raise ImportRowError(f"Item {item_id} already changed on row {updates[item_id][0]}")
+            if changes:
+                updates[item_id] = (row_number, changes)
+        except ImportRowError as e:
+            errors.append({'row': row_number, 'error': str(e)})
+
+    result = {'updated': len(updates), 'created': len(creates), 'translations_queued': 0, 'errors': errors}
+    if dry_run or not (updates or creates):
+        return result
+
+    now = timezone.now()
+    pending = []
+    with transaction.atomic():
+        # Serializes imports into the same profile, see the id read-back below
+        list(Profile.objects.select_for_update().filter(pk=profile.pk).values_list('id', flat=True))
+        item_ids = sorted(updates)
+        for start in range(0, len(item_ids), IMPORT_CHUNK_SIZE):
+            chunk = item_ids[start:start + IMPORT_CHUNK_SIZE]
+            # Lock without joins: catalog rows are shared by every profile
+            list(ProfileItem.objects.select_for_update().filter(pk__in=chunk).order_by('id').values_list('id', flat=True))
+            items = list(ProfileItem.objects.filter(pk__in=chunk, profile=profile).order_by('id'))
+            fields = {'is_modified', 'modified_at'}
+            for item in items:
+                changes = updates[item.pk][1]
+                # Read under the lock: the evaluation starts from the stored etat
+                old_etat = item.etat
+                for field, value in changes.items():
+                    setattr(item, field, value)
+                fields.update(changes)
+                item.is_modified = True
+                item.modified_at = now
+                if item.etat != old_etat:
+                    record_evaluation(ItemEvaluation(
+                        item_id=item.pk,
+                        domain_id=item.profile_domain_id,
+                        old_etat=old_etat,
+                        new_etat=item.etat,
+                        evaluated_by=user,
+                        created_at=now,
+                    ))
+                if 'commentaire' in changes or 'commentaire_ar' in changes:
+                    item.refresh_search_text()
+                    fields.add('search_text')
+                    pending.extend(
+                        PendingTranslation(item=item, field=field)
+                        for field in _missing_translations({'commentaire': item.commentaire, 'commentaire_ar': item.commentaire_ar})
+                    )
+                mark_domain_dirty(item.profile_domain_id)
+            ProfileItem.objects.bulk_update(items, sorted(fields))
+
+        if creates:
+            # The profile lock keeps other imports out; the new rows are the
+            # profile's items past its current last one
+            last_id = ProfileItem.objects.filter(profile=profile).aggregate(last_id=Max('id'))['last_id'] or 0
+            new_items = [
+                ProfileItem(
+                    profile_domain_id=domain_id,
+                    profile=profile,
+                    name=name,
+                    name_ar=name_ar,
+                    is_modified=True,
+                    **changes
+                )
+                for domain_id, name, name_ar, changes in creates
+            ]
+            for item in new_items:
+                item.refresh_search_text()
+            created = bulk_create_with_ids(
+                ProfileItem, new_items, batch_size=IMPORT_CHUNK_SIZE,
+                profile=profile, id__gt=last_id, profile_domain_id__in={item.profile_domain_id for item in new_items},
+            )
+            for item in created:
+                mark_domain_dirty(item.profile_domain_id)
+                record_evaluation(ItemEvaluation(
+                    item_id=item.pk,
+                    domain_id=item.profile_domain_id,
+                    new_etat=item.etat,
+                    evaluated_by=user,
+                    created_at=now,
+                ))
+                pending.extend(
+                    PendingTranslation(item=item, field=field)
+                    for field in _missing_translations({
+                        'name': item.name, 'name_ar': item.name_ar,
+                        'commentaire': item.commentaire, 'commentaire_ar': item.commentaire_ar,
+                    })
+                )
+
+        PendingTranslation.objects.bulk_create(pending, batch_size=IMPORT_CHUNK_SIZE, ignore_conflicts=True)
+    result['translations_queued'] = len(pending)
+    return result
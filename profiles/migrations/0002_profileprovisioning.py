@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 15:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileProvisioning',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('template', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('categories_total', models.PositiveIntegerField(default=0)),
+                ('domains_total', models.PositiveIntegerField(default=0)),
+                ('items_total', models.PositiveIntegerField(default=0)),
+                ('categories_done', models.PositiveIntegerField(default=0)),
+                ('domains_done', models.PositiveIntegerField(default=0)),
+                ('items_done', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='provisioning', to='profiles.profile')),
+            ],
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2 on 2026-10-18 15:13
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_rollups(apps, schema_editor):
+    Model = apps.get_model('profiles', 'Profile')
+    items_path = 'categories__domains__items'
+    etat_fields = {
+        'ACQUIS': 'acquis_count',
+        'PARTIEL': 'partiel_count',
+        'NON_ACQUIS': 'non_acquis_count',
+        'NON_COTE': 'non_cote_count',
+    }
+    annotations = {'rollup_item_count': Count(items_path)}
+    for etat, field in etat_fields.items():
+        annotations[f'rollup_{field}'] = Count(items_path, filter=Q(**{f'{items_path}__etat': etat}))
+    annotations['rollup_peu_count'] = Count(items_path, filter=Q(**{f'{items_path}__isPeu': True}))
+    annotations['rollup_done_count'] = Count(items_path, filter=Q(**{f'{items_path}__done': True}))
+    fields = ['item_count', *etat_fields.values(), 'peu_count', 'done_count']
+    objs = []
+    for row in Model.objects.annotate(**annotations).values('id', *annotations):
+        obj = Model(pk=row['id'], **{field: row[f'rollup_{field}'] for field in fields})
+        obj.evaluation_score = int(obj.acquis_count * 100 / obj.item_count) if obj.item_count else 0
+        objs.append(obj)
+    Model.objects.bulk_update(objs, fields + ['evaluation_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_profileprovisioning'),
+        ('ProfileCategory', '0001_initial'),
+        ('ProfileItem', '0002_item_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='acquis_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='done_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='non_acquis_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='non_cote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='partiel_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='peu_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
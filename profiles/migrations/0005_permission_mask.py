@@ -0,0 +1,80 @@
+# Generated by Django 5.2 on 2026-10-18 15:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+PERMISSION_BITS = {'view': 1, 'edit': 2, 'share': 4, 'delete': 8}
+
+
+def merge_permission_rows(apps, schema_editor):
+    """Fold the one-row-per-right rows of each (profile, user) into its first row."""
+    SharedProfilePermission = apps.get_model('profiles', 'SharedProfilePermission')
+    kept = {}
+    duplicates = []
+    for row in SharedProfilePermission.objects.order_by('id').iterator(chunk_size=2000):
+        key = (row.profile_id, row.shared_with_id)
+        if key in kept:
+            duplicates.append(row.pk)
+        else:
+            kept[key] = row
+            row.mask = 0
+        kept[key].mask |= PERMISSION_BITS.get(row.permissions, 0)
+    SharedProfilePermission.objects.bulk_update(kept.values(), ['mask'], batch_size=500)
+    for start in range(0, len(duplicates), 500):
+        SharedProfilePermission.objects.filter(pk__in=duplicates[start:start + 500]).delete()
+
+
+def split_permission_rows(apps, schema_editor):
+    SharedProfilePermission = apps.get_model('profiles', 'SharedProfilePermission')
+    rows = []
+    for row in SharedProfilePermission.objects.order_by('id').iterator(chunk_size=2000):
+        names = [name for name, bit in PERMISSION_BITS.items() if row.mask & bit]
+        if not names:
+            continue
+        row.permissions = names[0]
+        row.save(update_fields=['permissions'])
+        rows.extend(
+            SharedProfilePermission(profile_id=row.profile_id, shared_with_id=row.shared_with_id, permissions=name, mask=0)
+            for name in names[1:]
+        )
+    SharedProfilePermission.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_profile_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sharedprofilepermission',
+            name='mask',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Bitmask: view=1, edit=2, share=4, delete=8'),
+        ),
+        migrations.RunPython(merge_permission_rows, split_permission_rows),
+        migrations.AlterUniqueTogether(
+            name='sharedprofilepermission',
+            unique_together={('profile', 'shared_with')},
+        ),
+        # A default lets the migration be reversed (the column is re-added before the rows are split)
+        migrations.AlterField(
+            model_name='sharedprofilepermission',
+            name='permissions',
+            field=models.CharField(choices=[('view', 'View'), ('edit', 'Edit'), ('share', 'Share'), ('delete', 'Delete')], default='view', max_length=10),
+        ),
+        migrations.RemoveField(
+            model_name='sharedprofilepermission',
+            name='permissions',
+        ),
+        migrations.RenameField(
+            model_name='sharedprofilepermission',
+            old_name='mask',
+            new_name='permissions',
+        ),
+        migrations.AddIndex(
+            model_name='sharedprofilepermission',
+            index=models.Index(fields=['shared_with', 'permissions'], name='shared_perm_user_mask_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 15:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_permission_mask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='sharedprofilepermission',
+            name='shared_perm_user_mask_idx',
+        ),
+        migrations.AddIndex(
+            model_name='sharedprofilepermission',
+            index=models.Index(fields=['shared_with', 'profile', 'permissions'], name='shared_perm_user_profile_idx'),
+        ),
+    ]
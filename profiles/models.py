@@ -6,7 +6,32 @@ GENDER_CHOICES = [
         ('M', 'Male'),
         ('F', 'Female'),
     ]
-class Profile(models.Model):
+class ProgressRollup(models.Model):
+    """Item counters kept current incrementally for a category or a whole profile."""
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    acquis_count = models.PositiveIntegerField(default=0, editable=False)
+    partiel_count = models.PositiveIntegerField(default=0, editable=False)
+    non_acquis_count = models.PositiveIntegerField(default=0, editable=False)
+    non_cote_count = models.PositiveIntegerField(default=0, editable=False)
+    peu_count = models.PositiveIntegerField(default=0, editable=False)
+    done_count = models.PositiveIntegerField(default=0, editable=False)
+
+    ROLLUP_FIELDS = [
+        'item_count', 'acquis_count', 'partiel_count', 'non_acquis_count',
+        'non_cote_count', 'peu_count', 'done_count',
+    ]
+    ETAT_COUNT_FIELDS = {
+        'ACQUIS': 'acquis_count',
+        'PARTIEL': 'partiel_count',
+        'NON_ACQUIS': 'non_acquis_count',
+        'NON_COTE': 'non_cote_count',
+    }
+
+    class Meta:
+        abstract = True
+
+
+class Profile(ProgressRollup):
     category = models.CharField(max_length=50, blank=True, null=True)  # Store as string
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
@@ -20,6 +45,9 @@ class Profile(models.Model):
     image_url = models.URLField(max_length=500, blank=True, null=True)
     image = models.ImageField(upload_to='profile_images/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped whenever anything under the profile changes; HTTP validator for its hierarchy
+    version = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     bio = models.BinaryField(blank=True, null=True)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, blank=True, null=True)
@@ -41,19 +69,83 @@ class Profile(models.Model):
             self.image.delete(save=False)
         super().delete(*args, **kwargs)
 
+class SharedProfilePermissionQuerySet(models.QuerySet):
+    def with_permission(self, name):
+        """
+        Rows granting `name`. The bit test is written as an IN over every
+        mask holding that bit, so it stays an indexed predicate.
+        """
+        return self.filter(permissions__in=SharedProfilePermission.masks_with(name))
+
+
 class SharedProfilePermission(models.Model):
+    """The rights of one user on one profile, stored as a bitmask."""
     PERMISSION_CHOICES = [
         ('view', 'View'),
         ('edit', 'Edit'),
         ('share', 'Share'),
         ('delete', 'Delete'),
     ]
+    PERMISSION_BITS = {'view': 1, 'edit': 2, 'share': 4, 'delete': 8}
+    ALL_PERMISSIONS_MASK = 15
 
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='shared_with')
     shared_with = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='shared_profiles')
-    permissions = models.CharField(max_length=10, choices=PERMISSION_CHOICES)
+    permissions = models.PositiveSmallIntegerField(default=0, help_text='Bitmask: view=1, edit=2, share=4, delete=8')
+
+    objects = SharedProfilePermissionQuerySet.as_manager()
 
     class Meta:
-        unique_together = ('profile', 'shared_with', 'permissions')  
+        unique_together = ('profile', 'shared_with')
+        indexes = [
+            models.Index(fields=['shared_with', 'profile', 'permissions'], name='shared_perm_user_profile_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.shared_with.username} has {', '.join(self.permission_names) or 'no'} permission on {self.profile}"
+
+    @classmethod
+    def mask(cls, names):
+        mask = 0
+        for name in names:
+            mask |= cls.PERMISSION_BITS[name]
+        return mask
+
+    @classmethod
+    def names(cls, mask):
+        return [name for name, bit in cls.PERMISSION_BITS.items() if mask & bit]
+
+    @classmethod
+    def masks_with(cls, name):
+        bit = cls.PERMISSION_BITS[name]
+        return [mask for mask in range(1, cls.ALL_PERMISSIONS_MASK + 1) if mask & bit]
+
+    @property
+    def permission_names(self):
+        return self.names(self.permissions)
+
+
+class ProfileProvisioning(models.Model):
+    """Tracks the background materialization of a profile's template hierarchy."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='provisioning')
+    template = models.CharField(max_length=20)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    categories_total = models.PositiveIntegerField(default=0)
+    domains_total = models.PositiveIntegerField(default=0)
+    items_total = models.PositiveIntegerField(default=0)
+    categories_done = models.PositiveIntegerField(default=0)
+    domains_done = models.PositiveIntegerField(default=0)
+    items_done = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
-        return f"{self.shared_with.username} has {self.permissions} permission on {self.profile}"
+        return f"Provisioning of {self.profile} ({self.status})"
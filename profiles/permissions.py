@@ -0,0 +1,171 @@
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from ProfileDomain.metrics import touch
+from .models import Profile, SharedProfilePermission
+
+ALL_PERMISSIONS = frozenset(choice[0] for choice in SharedProfilePermission.PERMISSION_CHOICES)
+
+PERMISSION_CACHE = 'permissions'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[PERMISSION_CACHE]
+
+
+def _cache_key(user_id, profile_id):
+    return f'profile-perms:{user_id}:{profile_id}'
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def permission_cache_stats():
+    """Hit and miss counters of the permission cache in this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+    return stats
+
+
+def reset_permission_cache_stats():
+    with _stats_lock:
+        _stats['hits'] = 0
+        _stats['misses'] = 0
+
+
+def invalidate_profile_permissions(profile_id, user_ids):
+    """
+    Drop the cached permissions of these users on a profile, now and again
+    when the surrounding transaction commits, so a concurrent request cannot
+    re-cache the rights as they were before the commit.
+    """
+    keys = [_cache_key(user_id, profile_id) for user_id in user_ids]
+    _cache().delete_many(keys)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def get_profile_permissions(user, profile, request=None):
+    """
+    Permissions `user` holds on `profile` (an instance or an id), as a
+    frozenset of 'view', 'edit', 'share' and 'delete'. Superusers hold all.
+
+    Every right is fetched with one query and, unless there is none, kept in
+    the permission cache for PERMISSION_CACHE_TTL seconds; writes to
+    SharedProfilePermission and profile deletions invalidate the entry. When `request` is given the
+    result is also memoized on it, so later checks in the same request are
+    free.
+    """
+    if user.is_superuser:
+        return ALL_PERMISSIONS
+    key = (user.pk, getattr(profile, 'pk', profile))
+    memo = getattr(request, '_profile_permissions', None) if request is not None else None
+    if memo is not None and key in memo:
+        return memo[key]
+
+    cache_key = _cache_key(*key)
+    permissions = _cache().get(cache_key)
+    if permissions is not None:
+        _count('hits')
+    else:
+        _count('misses')
+        mask = SharedProfilePermission.objects.filter(
+            profile_id=key[1], shared_with_id=user.pk
+        ).values_list('permissions', flat=True).first()
+        permissions = frozenset(SharedProfilePermission.names(mask or 0))
+        # A per-process cache misses invalidations made by other workers: a
+        # cached empty set would deny a freshly shared profile until it expires
+        if permissions:
+            _cache().set(cache_key, permissions, settings.PERMISSION_CACHE_TTL)
+
+    if request is not None:
+        if memo is None:
+            memo = request._profile_permissions = {}
+        memo[key] = permissions
+    return permissions
+
+
+def has_profile_permission(user, profile, permission, request=None):
+    return permission in get_profile_permissions(user, profile, request)
+
+
+def has_any_profile_permission(user, profile, request=None):
+    return bool(get_profile_permissions(user, profile, request))
+
+
+def accessible_profile_ids(user, permission=None):
+    """Ids of the profiles shared with `user` (with `permission`, if given), usable as a subquery."""
+    rows = SharedProfilePermission.objects.filter(shared_with_id=user.pk)
+    if permission is not None:
+        rows = rows.with_permission(permission)
+    else:
+        rows = rows.filter(permissions__gt=0)
+    return rows.values_list('profile_id', flat=True)
+
+
+def grant_profile_permissions(profile_id, user_id, names):
+    """
+    Add rights of a user on a profile with a single upsert: the row is
+    inserted, or its mask OR-ed with the new bits when it already exists.
+    """
+    mask = SharedProfilePermission.mask(names)
+    meta = SharedProfilePermission._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    profile_column, user_column, mask_column = [
+        quote(meta.get_field(name).column) for name in ('profile', 'shared_with', 'permissions')
+    ]
+    sql = f'INSERT INTO {table} ({profile_column}, {user_column}, {mask_column}) VALUES (%s, %s, %s) '
+    if connection.vendor == 'mysql':
+        sql += f'ON DUPLICATE KEY UPDATE {mask_column} = {mask_column} | VALUES({mask_column})'
+    else:
+        sql += (
+            f'ON CONFLICT ({profile_column}, {user_column}) '
+            f'DO UPDATE SET {mask_column} = {table}.{mask_column} | excluded.{mask_column}'
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [profile_id, user_id, mask])
+
+    # Raw SQL sends no post_save: invalidate and bump the profile version here
+    invalidate_profile_permissions(profile_id, [user_id])
+    touch(profile_id=profile_id)
+
+
+class ProfilePermissionMixin:
+    """Permission helpers for the profile-scoped viewsets, resolved once per request and profile."""
+
+    def _check_permission(self, profile, user, permission):
+        return has_profile_permission(user, profile, permission, getattr(self, 'request', None))
+
+    def _check_view_permission(self, profile, user):
+        return self._check_permission(profile, user, 'view')
+
+    def _check_edit_permission(self, profile, user):
+        return self._check_permission(profile, user, 'edit')
+
+    def _check_delete_permission(self, profile, user):
+        return self._check_permission(profile, user, 'delete')
+
+
+@receiver(post_save, sender=SharedProfilePermission)
+@receiver(post_delete, sender=SharedProfilePermission)
+def forget_changed_permission(sender, instance, **kwargs):
+    invalidate_profile_permissions(instance.profile_id, [instance.shared_with_id])
+
+
+@receiver(pre_delete, sender=Profile)
+def forget_deleted_profile(sender, instance, **kwargs):
+    invalidate_profile_permissions(
+        instance.pk,
+        SharedProfilePermission.objects.filter(profile_id=instance.pk).values_list('shared_with_id', flat=True),
+    )
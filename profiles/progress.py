@@ -0,0 +1,83 @@
+from collections import Counter, defaultdict
+from django.utils import timezone
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import ItemEvaluation
+
+
+def _acquis_delta(old_etat, new_etat):
+    return int(new_etat == 'ACQUIS') - int(old_etat == 'ACQUIS')
+
+
+def _curve(start, item_count, daily):
+    """Daily points (end-of-day acquis count and percentage) starting from `start` acquired items."""
+    points = []
+    acquis = start
+    for day in sorted(daily):
+        acquis += daily[day]
+        points.append({
+            'date': day,
+            'acquis_count': acquis,
+            'acquis_percentage': (acquis / item_count * 100) if item_count > 0 else 0.0,
+        })
+    return points
+
+
+def progress_curves(profile, since=None):
+    """
+    Per-domain and per-category acquisition curves of a profile.
+
+    The stored domain counters give the end of each curve. The evaluation
+    events since `since` (all of them if None) are read in one query, as
+    range scans of the (domain, created_at) index, and walked to rebuild
+    the daily acquis counts. Percentages use the current item counts.
+    """
+    domains = list(
+        ProfileDomain.objects.filter(profile=profile).order_by('profile_category_id', 'id').values(
+            'id', 'name', 'name_ar', 'item_count', 'acquis_count',
+            'profile_category_id', 'profile_category__name', 'profile_category__name_ar',
+        )
+    )
+    events = ItemEvaluation.objects.filter(domain_id__in=[domain['id'] for domain in domains])
+    if since is not None:
+        events = events.filter(created_at__gte=since)
+
+    daily = defaultdict(Counter)
+    for domain_id, old_etat, new_etat, created_at in events.order_by('created_at').values_list(
+        'domain_id', 'old_etat', 'new_etat', 'created_at'
+    ):
+        daily[domain_id][timezone.localtime(created_at).date()] += _acquis_delta(old_etat, new_etat)
+
+    domain_curves = []
+    categories = {}
+    for domain in domains:
+        domain_daily = daily.get(domain['id'], Counter())
+        start = domain['acquis_count'] - sum(domain_daily.values())
+        domain_curves.append({
+            'id': domain['id'],
+            'name': domain['name'],
+            'name_ar': domain['name_ar'],
+            'category_id': domain['profile_category_id'],
+            'item_count': domain['item_count'],
+            'start_acquis_count': start,
+            'points': _curve(start, domain['item_count'], domain_daily),
+        })
+
+        category = categories.setdefault(domain['profile_category_id'], {
+            'id': domain['profile_category_id'],
+            'name': domain['profile_category__name'],
+            'name_ar': domain['profile_category__name_ar'],
+            'item_count': 0,
+            'start_acquis_count': 0,
+            'daily': Counter(),
+        })
+        category['item_count'] += domain['item_count']
+        category['start_acquis_count'] += start
+        category['daily'].update(domain_daily)
+
+    category_curves = []
+    for category in categories.values():
+        category_daily = category.pop('daily')
+        category['points'] = _curve(category['start_acquis_count'], category['item_count'], category_daily)
+        category_curves.append(category)
+
+    return {'since': since, 'domains': domain_curves, 'categories': category_curves}
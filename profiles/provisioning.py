@@ -0,0 +1,274 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from profiles.models import Profile, ProfileProvisioning, ProgressRollup
+from profiles.permissions import grant_profile_permissions
+from profiles.template_catalog import get_template
+from ProfileCategory.models import ProfileCategory
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import CatalogItem, ProfileItem
+
+OWNER_PERMISSIONS = ['view', 'edit', 'share', 'delete']
+
+# Local worker pool for background provisioning, no external broker needed
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PROFILE_PROVISIONING_WORKERS', 2),
+    thread_name_prefix='profile-provisioning',
+)
+# Live progress of running provisionings. Rows written inside the provisioning
+# transaction are invisible to other connections until commit, so progress is
+# published to the 'provisioning' cache, which every worker process reads.
+PROGRESS_CACHE = 'provisioning'
+# Seconds without progress after which a pending or running job is reported
+# as failed. Jobs live in an in-process pool, so a restart drops them; the live
+# progress entry is refreshed on every step and expires after this long.
+PROGRESS_TTL = getattr(settings, 'PROFILE_PROVISIONING_STALE_AFTER', 900)
+
+
+def _progress_key(provisioning_id):
+    return f'profile-provisioning:{provisioning_id}'
+
+
+def bulk_create_with_ids(model, objs, batch_size=None, **scope):
+    """
+    bulk_create() that always hands back objects with primary keys.
+
+    MySQL cannot return ids from a multi-row INSERT, so the freshly inserted
+    rows are read back (one query) in insertion order, which is safe as long
+    as the scope only contains rows created by the caller.
+    """
+    created = model.objects.bulk_create(objs, batch_size=batch_size)
+    if created and created[0].pk is None:
+        ids = list(model.objects.filter(**scope).order_by('id').values_list('id', flat=True))
+        if len(ids) != len(created):
+            raise Exception(f"Expected {len(created)} new {model.__name__} rows, found {len(ids)}")
+        for obj, pk in zip(created, ids):
+            obj.pk = pk
+    return created
+
+
+def _catalog_item_ids(template):
+    """
+    Map each template item digest to its item catalog row, inserting the
+    rows that are missing (first use of a template or of a new revision).
+    """
+    catalog_ids = dict(
+        CatalogItem.objects.filter(template=template.key).values_list('digest', 'id')
+    )
+    missing = {}
+    for template_category in template.categories:
+        for template_domain in template_category.domains:
+            for template_item in template_domain.items:
+                if template_item.digest not in catalog_ids:
+                    catalog_item = CatalogItem(
+                        template=template.key,
+                        digest=template_item.digest,
+                        name=template_item.name,
+                        name_ar=template_item.name_ar,
+                        description=template_item.description,
+                        description_ar=template_item.description_ar,
+                    )
+                    catalog_item.refresh_search_text()
+                    missing[template_item.digest] = catalog_item
+    if missing:
+        CatalogItem.objects.bulk_create(missing.values(), ignore_conflicts=True)
+        catalog_ids.update(
+            CatalogItem.objects.filter(digest__in=missing.keys()).values_list('digest', 'id')
+        )
+    return catalog_ids
+
+
+def _template_rollup(template_domains):
+    """Rollup counters (see ProgressRollup) of freshly provisioned template items."""
+    rollup = dict.fromkeys(ProgressRollup.ROLLUP_FIELDS, 0)
+    for template_domain in template_domains:
+        for template_item in template_domain.items:
+            rollup['item_count'] += 1
+            rollup[ProgressRollup.ETAT_COUNT_FIELDS[template_item.etat]] += 1
+    return rollup
+
+
+def grant_owner_permissions(profile, owner):
+    """Give the profile creator every permission (one permission row)."""
+    grant_profile_permissions(profile.pk, owner.pk, OWNER_PERMISSIONS)
+
+
+def provision_profile(profile, template, owner=None, progress=None):
+    """
+    Materialize a compiled template (categories -> domains -> items) for a profile.
+
+    Everything runs in one transaction with one multi-row INSERT per level,
+    so the number of queries does not grow with the size of the template.
+    Domain metrics and category/profile rollups come straight from the
+    template, and bulk inserts do not fire the per-item post_save signal. Items only reference the shared
+    catalog text instead of copying it.
+
+    `progress`, if given, is called as progress(level, count) after each
+    level ('categories', 'domains', 'items') has been inserted.
+    """
+    with transaction.atomic():
+        catalog_ids = _catalog_item_ids(template)
+
+        if owner is not None:
+            grant_owner_permissions(profile, owner)
+
+        categories = bulk_create_with_ids(ProfileCategory, [
+            ProfileCategory(
+                profile=profile,
+                name=template_category.name,
+                name_ar=template_category.name_ar,
+                description=template_category.description,
+                description_ar=template_category.description_ar,
+                **_template_rollup(template_category.domains)
+            )
+            for template_category in template.categories
+        ], profile=profile)
+        if progress:
+            progress('categories', len(categories))
+
+        domains = []
+        for category, template_category in zip(categories, template.categories):
+            for template_domain in template_category.domains:
+                total_items = len(template_domain.items)
+                domains.append(ProfileDomain(
+                    profile_category=category,
+                    profile=profile,
+                    name=template_domain.name,
+                    name_ar=template_domain.name_ar,
+                    description=template_domain.description,
+                    description_ar=template_domain.description_ar,
+                    item_count=total_items,
+                    acquis_count=template_domain.acquis_count,
+                    acquis_percentage=(template_domain.acquis_count / total_items * 100) if total_items > 0 else 0.0,
+                ))
+        domains = bulk_create_with_ids(ProfileDomain, domains, profile=profile)
+        if progress:
+            progress('domains', len(domains))
+
+        template_domains = [
+            template_domain
+            for template_category in template.categories
+            for template_domain in template_category.domains
+        ]
+        items = ProfileItem.objects.bulk_create([
+            ProfileItem(
+                profile_domain=domain,
+                profile=profile,
+                catalog_item_id=catalog_ids[template_item.digest],
+                etat=template_item.etat,
+            )
+            for domain, template_domain in zip(domains, template_domains)
+            for template_item in template_domain.items
+        ])
+
+        profile_rollup = _template_rollup(template_domains)
+        Profile.objects.filter(pk=profile.pk).update(
+            evaluation_score=int(profile_rollup['acquis_count'] * 100 / profile_rollup['item_count']) if profile_rollup['item_count'] else 0,
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+            **profile_rollup
+        )
+        if progress:
+            progress('items', len(items))
+
+    return profile
+
+
+def start_provisioning(profile, template):
+    """
+    Record a pending provisioning run and hand it to the local worker pool
+    once the surrounding transaction commits. Returns the tracking row.
+    """
+    provisioning = ProfileProvisioning.objects.create(
+        profile=profile,
+        template=template.key,
+        categories_total=len(template.categories),
+        domains_total=template.domain_count,
+        items_total=template.item_count,
+    )
+    transaction.on_commit(lambda: _executor.submit(_run_provisioning, provisioning.pk))
+    return provisioning
+
+
+def _run_provisioning(provisioning_id):
+    """Worker entry point: fill the template hierarchy, or roll it back and record the failure."""
+    close_old_connections()
+    try:
+        provisioning = ProfileProvisioning.objects.select_related('profile').get(pk=provisioning_id)
+        ProfileProvisioning.objects.filter(pk=provisioning_id).update(status='running', updated_at=timezone.now())
+        live = {}
+        caches[PROGRESS_CACHE].set(_progress_key(provisioning_id), live, PROGRESS_TTL)
+
+        def progress(level, count):
+            live[f'{level}_done'] = count
+            caches[PROGRESS_CACHE].set(_progress_key(provisioning_id), live, PROGRESS_TTL)
+
+        try:
+            provision_profile(provisioning.profile, get_template(provisioning.template), progress=progress)
+        except Exception as e:
+            print(f"Error provisioning profile {provisioning.profile_id}: {e}")
+            ProfileProvisioning.objects.filter(pk=provisioning_id).update(
+                status='failed',
+                categories_done=0,
+                domains_done=0,
+                items_done=0,
+                error=str(e),
+            )
+        else:
+            ProfileProvisioning.objects.filter(pk=provisioning_id).update(
+                status='done',
+                categories_done=provisioning.categories_total,
+                domains_done=provisioning.domains_total,
+                items_done=provisioning.items_total,
+            )
+    finally:
+        caches[PROGRESS_CACHE].delete(_progress_key(provisioning_id))
+        connection.close()
+
+
+def _fail_stale(provisioning):
+    """
+    Mark a job that has stopped progressing (its worker process exited or
+    restarted) as failed, so clients stop polling it.
+    """
+    error = 'Provisioning stopped making progress'
+    stale = ProfileProvisioning.objects.filter(
+        pk=provisioning.pk,
+        status__in=['pending', 'running'],
+        updated_at__lt=timezone.now() - timedelta(seconds=PROGRESS_TTL),
+    ).update(status='failed', error=error, updated_at=timezone.now())
+    if stale:
+        provisioning.status = 'failed'
+        provisioning.error = error
+    return bool(stale)
+
+
+def provisioning_status(provisioning):
+    """
+    Serialize a provisioning row, overlaying the live progress of a running
+    job and failing a job that has made no progress for PROGRESS_TTL seconds.
+    """
+    data = {
+        'status': provisioning.status,
+        'template': provisioning.template,
+        'categories_done': provisioning.categories_done,
+        'categories_total': provisioning.categories_total,
+        'domains_done': provisioning.domains_done,
+        'domains_total': provisioning.domains_total,
+        'items_done': provisioning.items_done,
+        'items_total': provisioning.items_total,
+        'error': provisioning.error,
+    }
+    if provisioning.status in ('pending', 'running'):
+        live = caches[PROGRESS_CACHE].get(_progress_key(provisioning.pk))
+        if live is not None:
+            data['status'] = 'running'
+            data.update(live)
+        elif _fail_stale(provisioning):
+            data['status'] = 'failed'
+            data['error'] = provisioning.error
+    return data
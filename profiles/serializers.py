@@ -1,12 +1,18 @@
 # profiles/serializers.py
+from django.db.models import Prefetch
 from rest_framework import serializers
-from profiles.models import Profile
+from profiles.models import Profile, SharedProfilePermission
 from ProfileCategory.models import ProfileCategory
 from ProfileDomain.models import ProfileDomain
 from ProfileItem.models import ProfileItem
 
 
 class ProfileItemSerializer(serializers.ModelSerializer):
+    # Template items keep their text on the shared catalog row
+    name = serializers.CharField(source='resolved_name', read_only=True)
+    name_ar = serializers.CharField(source='resolved_name_ar', read_only=True)
+    description = serializers.CharField(source='resolved_description', read_only=True)
+    description_ar = serializers.CharField(source='resolved_description_ar', read_only=True)
     class Meta:
         model = ProfileItem
         fields = ['id', 'name', 'name_ar', 'description', 'description_ar', 'etat', 'is_modified', 'modified_at', 'commentaire', 'commentaire_ar', 'isPeu', 'done']
@@ -35,8 +41,10 @@ class ProfileCategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProfileCategory
-        fields = ['id', 'name', 'name_ar', 'description', 'description_ar', 'domains_count','created_at', 'items_count']
-        read_only_fields = ['id', 'domains_count', 'items_count']
+        fields = ['id', 'name', 'name_ar', 'description', 'description_ar', 'domains_count','created_at', 'items_count',
+                  'item_count', 'acquis_count', 'partiel_count', 'non_acquis_count', 'non_cote_count', 'peu_count', 'done_count']
+        read_only_fields = ['id', 'domains_count', 'items_count',
+                            'item_count', 'acquis_count', 'partiel_count', 'non_acquis_count', 'non_cote_count', 'peu_count', 'done_count']
 
 class ProfileSerializer(serializers.ModelSerializer):
     categories = ProfileCategorySerializer(many=True, read_only=True)
@@ -47,4 +55,49 @@ class ProfileSerializer(serializers.ModelSerializer):
         fields = '__all__'  # Ensure 'image' is included
 
     def get_associated_users(self, obj):
-        return [user.username for user in obj.associated_users]
\ No newline at end of file
+        if 'shared_with' in getattr(obj, '_prefetched_objects_cache', {}):
+            users = {permission.shared_with_id: permission.shared_with for permission in obj.shared_with.all()}
+            return [user.username for user in sorted(users.values(), key=lambda user: user.date_joined, reverse=True)]
+        return [user.username for user in obj.associated_users]
+
+
+class ProfileTreeCategorySerializer(ProfileCategorySerializer):
+    domains = ProfileDomainSerializer(many=True, read_only=True)
+
+    class Meta(ProfileCategorySerializer.Meta):
+        fields = ProfileCategorySerializer.Meta.fields + ['domains']
+
+
+class ProfileTreeSerializer(serializers.ModelSerializer):
+    categories = ProfileTreeCategorySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Profile
+        fields = ['id', 'first_name', 'last_name', 'evaluation_score', 'version', *Profile.ROLLUP_FIELDS, 'categories']
+        read_only_fields = fields
+
+
+def profile_tree_prefetches(items=None):
+    """
+    Prefetch lookups for ProfileTreeSerializer: one query per level.
+    `items` optionally narrows the items queryset (filters).
+    """
+    if items is None:
+        items = ProfileItem.objects.all()
+    return [
+        Prefetch('categories', queryset=ProfileCategory.objects.with_counts().order_by('id')),
+        Prefetch('categories__domains', queryset=ProfileDomain.objects.order_by('id')),
+        Prefetch('categories__domains__items', queryset=items.order_by('id')),
+    ]
+
+
+def profile_serializer_prefetches(prefix=''):
+    """
+    Prefetch lookups covering everything ProfileSerializer reads, so that
+    serializing any number of profiles costs a fixed number of queries.
+    `prefix` reaches the profile through a relation (e.g. 'profile__').
+    """
+    return [
+        Prefetch(f'{prefix}categories', queryset=ProfileCategory.objects.with_counts().order_by('id')),
+        Prefetch(f'{prefix}shared_with', queryset=SharedProfilePermission.objects.select_related('shared_with')),
+    ]
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+TEMPLATE_FILES = {
+    'kids': 'template_kids_data.json',
+    'jeunes': 'template_jeunes_data.json',
+    'adulte': 'template_adulte_data.json',
+}
+
+# Immutable, compact records ready to feed bulk inserts
+Template = namedtuple('Template', ['key', 'categories', 'domain_count', 'item_count'])
+TemplateCategory = namedtuple('TemplateCategory', ['name', 'name_ar', 'description', 'description_ar', 'domains'])
+TemplateDomain = namedtuple('TemplateDomain', ['name', 'name_ar', 'description', 'description_ar', 'items', 'acquis_count'])
+TemplateItem = namedtuple('TemplateItem', ['digest', 'name', 'name_ar', 'description', 'description_ar', 'etat'])
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def template_key_for_age(age):
+    """Return the template key matching an age band."""
+    if age <= 5:
+        return 'kids'
+    elif age <= 18:
+        return 'jeunes'
+    return 'adulte'
+
+
+def _item_digest(key, category_name, domain_name, item_data):
+    """Stable identity of a template item, used to share its text through the item catalog."""
+    parts = [
+        key,
+        category_name,
+        domain_name,
+        item_data["name"],
+        item_data.get("name_ar", ""),
+        item_data.get("description", ""),
+        item_data.get("description_ar", ""),
+    ]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _compile(key, raw_data):
+    """Turn parsed JSON into nested tuples of template records."""
+    categories = []
+    domain_count = 0
+    item_count = 0
+    for category_data in raw_data:
+        domains = []
+        for domain_data in category_data["domains"]:
+            items = tuple(
+                TemplateItem(
+                    _item_digest(key, category_data["category_name"], domain_data["name"], item_data),
+                    item_data["name"],
+                    item_data.get("name_ar", ""),
+                    item_data.get("description", ""),
+                    item_data.get("description_ar", ""),
+                    item_data.get("etat", "NON_COTE"),
+                )
+                for item_data in domain_data["items"]
+            )
+            domains.append(TemplateDomain(
+                domain_data["name"],
+                domain_data.get("name_ar", ""),
+                domain_data.get("description", ""),
+                domain_data.get("description_ar", ""),
+                items,
+                sum(1 for item in items if item.etat == 'ACQUIS'),
+            ))
+            item_count += len(items)
+        domain_count += len(domains)
+        categories.append(TemplateCategory(
+            category_data["category_name"],
+            category_data.get("category_name_ar", ""),
+            category_data.get("category_description", ""),
+            category_data.get("category_description_ar", ""),
+            tuple(domains),
+        ))
+    return Template(key, tuple(categories), domain_count, item_count)
+
+
+def get_template(key):
+    """
+    Return the compiled template for a key.
+
+    Each file is parsed once per process and reparsed only when its mtime
+    changes.
+    """
+    path = os.path.join(TEMPLATES_DIR, TEMPLATE_FILES[key])
+    mtime = os.stat(path).st_mtime
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as file:
+            template = _compile(key, json.load(file))
+        _cache[key] = (mtime, template)
+        return template
+
+
+def template_for_age(age):
+    """Return the compiled template for an age in years."""
+    return get_template(template_key_for_age(age))
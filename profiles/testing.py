@@ -0,0 +1,32 @@
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework.test import APIClient
+from authentification.models import CustomUser
+from profiles.models import Profile
+from profiles.permissions import PERMISSION_CACHE
+from profiles.provisioning import provision_profile
+from profiles.template_catalog import get_template
+
+
+class ProvisionedProfileTestCase(TestCase):
+    """
+    A user owning one profile provisioned from the kids template, and an API
+    client authenticated as that user.
+
+    Writes run their commit callbacks, so no metrics batch is left pending
+    for the tests; subclasses adding data in setUpTestData should do the
+    same. The permission cache is cleared before each test, as SQLite reuses
+    the ids of rolled back rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('owner@example.com', 'owner', 'pw', accepte_conditions=True)
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.profile = Profile.objects.create(first_name='Owned', last_name='Test', birth_date='2015-01-01')
+            provision_profile(cls.profile, get_template('kids'), owner=cls.user)
+
+    def setUp(self):
+        caches[PERMISSION_CACHE].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
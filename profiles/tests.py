@@ -1,3 +1,558 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from authentification.models import CustomUser
+from backend.testing import QueryPlanMixin
+from ProfileCategory.models import ProfileCategory
+from ProfileDomain.models import ProfileDomain
+from ProfileItem.models import ItemEvaluation, PendingTranslation, ProfileItem
+from .models import Profile, ProfileProvisioning, SharedProfilePermission
+from .permissions import (
+    ALL_PERMISSIONS, PERMISSION_CACHE, accessible_profile_ids, get_profile_permissions, grant_profile_permissions,
+    has_any_profile_permission, has_profile_permission, permission_cache_stats, reset_permission_cache_stats,
+)
+from .analytics import MAX_WEAKEST_DOMAINS
+from .export import EXPORT_HEADERS
+from .importer import IMPORT_CHUNK_SIZE
+from .provisioning import (
+    PROGRESS_CACHE, PROGRESS_TTL, _progress_key, _run_provisioning, provision_profile, provisioning_status,
+)
+from .template_catalog import TEMPLATE_FILES, TEMPLATES_DIR, get_template, template_for_age
+from .testing import ProvisionedProfileTestCase
 
-# Create your tests here.
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """Indexes behind the permission checks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('plan@example.com', 'plan', 'pw', accepte_conditions=True)
+        cls.profile = Profile.objects.create(first_name='Plan', last_name='Test', birth_date='2015-01-01')
+
+    def test_permission_check(self):
+        self.assertIndexed(SharedProfilePermission.objects.filter(
+            profile_id=self.profile.pk, shared_with_id=self.user.pk
+        ).values_list('permissions', flat=True))
+
+    def test_profiles_with_permission(self):
+        self.assertIndexed(accessible_profile_ids(self.user, 'edit'))
+
+
+class ProvisioningProgressTests(TransactionTestCase):
+    def setUp(self):
+        self.profile = Profile.objects.create(first_name='Prov', last_name='Test', birth_date='2015-01-01')
+        self.provisioning = ProfileProvisioning.objects.create(
+            profile=self.profile, template='kids', categories_total=3, domains_total=9, items_total=90,
+        )
+
+    def test_progress_is_published_to_the_shared_cache(self):
+        seen = []
+
+        def provision(profile, template, progress=None):
+            progress('categories', 3)
+            progress('domains', 9)
+            # What a status request served by any worker reads mid-run
+            seen.append(provisioning_status(ProfileProvisioning.objects.get(pk=self.provisioning.pk)))
+            seen.append(caches[PROGRESS_CACHE].get(_progress_key(self.provisioning.pk)))
+
+        with mock.patch('profiles.provisioning.provision_profile', provision):
+            _run_provisioning(self.provisioning.pk)
+
+        status, live = seen
+        self.assertEqual(status['status'], 'running')
+        self.assertEqual((status['categories_done'], status['domains_done'], status['items_done']), (3, 9, 0))
+        self.assertEqual(live, {'categories_done': 3, 'domains_done': 9})
+
+        self.provisioning.refresh_from_db()
+        self.assertEqual(self.provisioning.status, 'done')
+        self.assertIsNone(caches[PROGRESS_CACHE].get(_progress_key(self.provisioning.pk)))
+        self.assertEqual(provisioning_status(self.provisioning)['items_done'], 90)
+
+    def test_failed_run_reports_the_error(self):
+        def provision(profile, template, progress=None):
+            progress('categories', 3)
+            raise Exception('boom')
+
+        with mock.patch('profiles.provisioning.provision_profile', provision):
+            _run_provisioning(self.provisioning.pk)
+
+        self.provisioning.refresh_from_db()
+        data = provisioning_status(self.provisioning)
+        self.assertEqual((data['status'], data['categories_done'], data['error']), ('failed', 0, 'boom'))
+
+    def test_job_without_progress_is_reported_failed(self):
+        # A worker restart drops queued and running jobs without a trace
+        self.assertEqual(provisioning_status(self.provisioning)['status'], 'pending')
+        ProfileProvisioning.objects.filter(pk=self.provisioning.pk).update(
+            status='running', updated_at=timezone.now() - timedelta(seconds=PROGRESS_TTL + 1),
+        )
+        self.provisioning.refresh_from_db()
+        self.assertEqual(provisioning_status(self.provisioning)['status'], 'failed')
+        self.provisioning.refresh_from_db()
+        self.assertEqual(self.provisioning.status, 'failed')
+        self.assertTrue(self.provisioning.error)
+
+    def test_progressing_job_is_not_failed(self):
+        ProfileProvisioning.objects.filter(pk=self.provisioning.pk).update(
+            status='running', updated_at=timezone.now() - timedelta(seconds=PROGRESS_TTL + 1),
+        )
+        self.provisioning.refresh_from_db()
+        caches[PROGRESS_CACHE].set(_progress_key(self.provisioning.pk), {'categories_done': 1}, PROGRESS_TTL)
+        try:
+            self.assertEqual(provisioning_status(self.provisioning)['status'], 'running')
+        finally:
+            caches[PROGRESS_CACHE].delete(_progress_key(self.provisioning.pk))
+
+
+class AnalyticsTests(ProvisionedProfileTestCase):
+    def get(self, **params):
+        return self.client.get(f'/api/profiles/{self.profile.pk}/analytics/', params)
+
+    def test_weakest_domains(self):
+        response = self.get(weakest=3)
+        self.assertEqual(response.status_code, 200)
+        ratios = [domain['acquis_ratio'] for domain in response.data['data']['weakest_domains']]
+        self.assertEqual(len(ratios), 3)
+        self.assertEqual(ratios, sorted(ratios))
+        self.assertEqual(self.get(weakest=0).data['data']['weakest_domains'], [])
+
+    def test_weakest_out_of_range(self):
+        for weakest in ['-1', str(MAX_WEAKEST_DOMAINS + 1), '1000000000', 'x']:
+            response = self.get(weakest=weakest)
+            self.assertEqual(response.status_code, 400, weakest)
+            self.assertIn('weakest', response.data['error'])
+
+
+
+
+
+
+class PermissionResolverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user('owner@example.com', 'owner', 'pw', accepte_conditions=True)
+        cls.viewer = CustomUser.objects.create_user('viewer@example.com', 'viewer', 'pw', accepte_conditions=True)
+        cls.stranger = CustomUser.objects.create_user('stranger@example.com', 'stranger', 'pw', accepte_conditions=True)
+        cls.admin = CustomUser.objects.create_superuser('root@example.com', 'root', 'pw', accepte_conditions=True)
+        cls.profile = Profile.objects.create(
+            first_name='Perm', last_name='Test', birth_date='2015-01-01', created_by=cls.owner,
+        )
+        cls.other = Profile.objects.create(first_name='Other', last_name='Test', birth_date='2015-01-01')
+        grant_profile_permissions(cls.profile.pk, cls.owner.pk, ALL_PERMISSIONS)
+        grant_profile_permissions(cls.profile.pk, cls.viewer.pk, ['view'])
+        grant_profile_permissions(cls.other.pk, cls.viewer.pk, ['view', 'edit'])
+
+    def setUp(self):
+        caches[PERMISSION_CACHE].clear()
+
+    def test_resolved_rights(self):
+        self.assertEqual(get_profile_permissions(self.owner, self.profile), ALL_PERMISSIONS)
+        self.assertEqual(get_profile_permissions(self.viewer, self.profile.pk), frozenset(['view']))
+        self.assertEqual(get_profile_permissions(self.stranger, self.profile), frozenset())
+        self.assertEqual(get_profile_permissions(self.admin, self.profile), ALL_PERMISSIONS)
+        self.assertTrue(has_any_profile_permission(self.viewer, self.profile))
+        self.assertFalse(has_profile_permission(self.viewer, self.profile, 'edit'))
+        self.assertFalse(has_any_profile_permission(self.stranger, self.profile))
+
+    def test_resolved_once_per_request(self):
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(1):
+            for permission in ['view', 'edit', 'delete', 'view']:
+                has_profile_permission(self.viewer, self.profile, permission, request)
+        self.assertEqual(request._profile_permissions, {(self.viewer.pk, self.profile.pk): frozenset(['view'])})
+
+    def test_accessible_profile_ids(self):
+        self.assertEqual(set(accessible_profile_ids(self.viewer)), {self.profile.pk, self.other.pk})
+        self.assertEqual(set(accessible_profile_ids(self.viewer, 'edit')), {self.other.pk})
+        self.assertEqual(set(accessible_profile_ids(self.stranger)), set())
+
+    def test_endpoints_enforce_rights(self):
+        client = APIClient()
+        url = f'/api/category/categories/?profile_id={self.profile.pk}'
+        for user, expected in [(self.viewer, 200), (self.stranger, 403), (self.admin, 200)]:
+            client.force_authenticate(user)
+            self.assertEqual(client.get(url).status_code, expected, user.username)
+        client.force_authenticate(self.viewer)
+        self.assertEqual(client.delete(f'/api/profiles/{self.profile.pk}/delete/').status_code, 403)
+        self.assertTrue(Profile.objects.filter(pk=self.profile.pk).exists())
+
+
+class PermissionCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user('cache-owner@example.com', 'cacheowner', 'pw', accepte_conditions=True)
+        cls.friend = CustomUser.objects.create_user('friend@example.com', 'friend', 'pw', accepte_conditions=True)
+        cls.profile = Profile.objects.create(
+            first_name='Cache', last_name='Test', birth_date='2015-01-01', created_by=cls.owner,
+        )
+        grant_profile_permissions(cls.profile.pk, cls.owner.pk, ALL_PERMISSIONS)
+
+    def setUp(self):
+        caches[PERMISSION_CACHE].clear()
+        reset_permission_cache_stats()
+
+    def rights(self, user):
+        return get_profile_permissions(user, self.profile, RequestFactory().get('/'))
+
+    def share(self, permissions):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.post(
+            f'/api/profiles/{self.profile.pk}/share/', {'shared_with': 'friend', 'permissions': permissions}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_across_requests(self):
+        with self.assertNumQueries(1):
+            self.rights(self.owner)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.rights(self.owner), ALL_PERMISSIONS)
+        stats = permission_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_missing_rights_are_not_cached(self):
+        # Another worker may share the profile without reaching this cache
+        self.assertEqual(self.rights(self.friend), frozenset())
+        self.assertIsNone(caches[PERMISSION_CACHE].get(f'profile-perms:{self.friend.pk}:{self.profile.pk}'))
+        # bulk_create sends no post_save, like a share made by another worker
+        SharedProfilePermission.objects.bulk_create([SharedProfilePermission(
+            profile=self.profile, shared_with=self.friend, permissions=SharedProfilePermission.mask(['view']),
+        )])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.rights(self.friend), frozenset(['view']))
+
+    def test_share_invalidates(self):
+        self.assertEqual(self.rights(self.friend), frozenset())
+        self.share(['view'])
+        self.assertEqual(self.rights(self.friend), frozenset(['view']))
+        self.share(['edit'])
+        self.assertEqual(self.rights(self.friend), frozenset(['view', 'edit']))
+
+    def test_revoke_invalidates(self):
+        self.share(['view', 'edit'])
+        self.assertEqual(self.rights(self.friend), frozenset(['view', 'edit']))
+        row = SharedProfilePermission.objects.get(profile=self.profile, shared_with=self.friend)
+        row.permissions = SharedProfilePermission.mask(['view'])
+        row.save()
+        self.assertEqual(self.rights(self.friend), frozenset(['view']))
+        row.delete()
+        self.assertEqual(self.rights(self.friend), frozenset())
+
+    def test_deleting_the_user_or_profile_invalidates(self):
+        self.share(['view'])
+        self.assertEqual(self.rights(self.friend), frozenset(['view']))
+        self.rights(self.owner)
+        self.friend.delete()
+        self.assertIsNone(caches[PERMISSION_CACHE].get(f'profile-perms:{self.friend.pk}:{self.profile.pk}'))
+        self.profile.delete()
+        self.assertIsNone(caches[PERMISSION_CACHE].get(f'profile-perms:{self.owner.pk}:{self.profile.pk}'))
+        self.assertEqual(get_profile_permissions(self.owner, self.profile.pk), frozenset())
+
+    def test_stats_endpoint_is_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.get('/api/profiles/permission-cache-stats/').status_code, 403)
+
+
+class PermissionMaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create_user(f'mask{index}@example.com', f'mask{index}', 'pw', accepte_conditions=True)
+            for index in range(3)
+        ]
+        cls.profile = Profile.objects.create(first_name='Mask', last_name='Test', birth_date='2015-01-01')
+
+    def test_mask_round_trip(self):
+        self.assertEqual(SharedProfilePermission.mask(['view', 'delete']), 9)
+        self.assertEqual(SharedProfilePermission.names(9), ['view', 'delete'])
+        self.assertEqual(SharedProfilePermission.mask(ALL_PERMISSIONS), SharedProfilePermission.ALL_PERMISSIONS_MASK)
+        self.assertEqual(SharedProfilePermission.masks_with('share'), [4, 5, 6, 7, 12, 13, 14, 15])
+
+    def test_grants_merge_into_one_row(self):
+        user = self.users[0]
+        grant_profile_permissions(self.profile.pk, user.pk, ['view'])
+        grant_profile_permissions(self.profile.pk, user.pk, ['edit'])
+        grant_profile_permissions(self.profile.pk, user.pk, ['view'])
+        rows = SharedProfilePermission.objects.filter(profile=self.profile, shared_with=user)
+        self.assertEqual(rows.count(), 1)
+        self.assertEqual(rows.get().permission_names, ['view', 'edit'])
+
+    def holders(self, name):
+        return set(SharedProfilePermission.objects.with_permission(name).values_list('shared_with_id', flat=True))
+
+    def test_with_permission(self):
+        for user, names in zip(self.users, [['view'], ['view', 'edit'], ['edit', 'delete']]):
+            grant_profile_permissions(self.profile.pk, user.pk, names)
+        self.assertEqual(self.holders('view'), {self.users[0].pk, self.users[1].pk})
+        self.assertEqual(self.holders('edit'), {self.users[1].pk, self.users[2].pk})
+        self.assertEqual(self.holders('delete'), {self.users[2].pk})
+        self.assertEqual(self.holders('share'), set())
+
+
+class ProvisioningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user('prov@example.com', 'prov', 'pw', accepte_conditions=True)
+
+    def provision(self, key):
+        profile = Profile.objects.create(first_name=key, last_name='Test', birth_date='2015-01-01')
+        with CaptureQueriesContext(connection) as queries:
+            provision_profile(profile, get_template(key), owner=self.owner)
+        profile.refresh_from_db()
+        return profile, len(queries)
+
+    def test_hierarchy_matches_the_template(self):
+        template = get_template('kids')
+        profile, _ = self.provision('kids')
+        self.assertEqual(ProfileCategory.objects.filter(profile=profile).count(), len(template.categories))
+        self.assertEqual(ProfileDomain.objects.filter(profile=profile).count(), template.domain_count)
+        self.assertEqual(ProfileItem.objects.filter(profile=profile).count(), template.item_count)
+        self.assertEqual(profile.item_count, template.item_count)
+        self.assertEqual(get_profile_permissions(self.owner, profile), ALL_PERMISSIONS)
+
+    def test_query_count_does_not_grow_with_the_template(self):
+        # The first run of a template also fills the item catalog; after that
+        # a profile costs a handful of INSERTs per level, not one per row
+        for key in ['kids', 'adulte']:
+            self.provision(key)
+            _, queries = self.provision(key)
+            self.assertLess(queries, 25)
+            self.assertGreater(get_template(key).item_count, 10 * queries)
+
+
+class ConditionalReadTests(ProvisionedProfileTestCase):
+    """Hierarchy reads carry the profile validators and answer 304 until something changes."""
+
+    def setUp(self):
+        super().setUp()
+        self.urls = [
+            f'/api/profiles/{self.profile.pk}/tree/',
+            f'/api/category/categories/?profile_id={self.profile.pk}',
+        ]
+
+    def test_unchanged_profile_answers_not_modified(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+            self.assertEqual(revalidated.status_code, 304, url)
+            self.assertEqual(revalidated.content, b'')
+
+    def test_item_change_invalidates_the_etag(self):
+        etags = [self.client.get(url).headers['ETag'] for url in self.urls]
+        item = ProfileItem.objects.filter(profile=self.profile).exclude(etat='ACQUIS').first()
+        item.etat = 'ACQUIS'
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        for url, etag in zip(self.urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_validators_are_checked_after_permissions(self):
+        stranger = CustomUser.objects.create_user('stranger@example.com', 'stranger', 'pw', accepte_conditions=True)
+        etag = self.client.get(self.urls[0]).headers['ETag']
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag).status_code, 403)
+
+
+class ProfileTreeTests(ProvisionedProfileTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        with cls.captureOnCommitCallbacks(execute=True):
+            items = ProfileItem.objects.filter(profile=cls.profile).order_by('id')
+            ProfileItem.objects.filter(pk__in=items.values_list('id', flat=True)[:3]).update(etat='ACQUIS', done=True)
+            ProfileItem.objects.filter(pk__in=items.values_list('id', flat=True)[3:5]).update(etat='PARTIEL', isPeu=True)
+
+    def tree_items(self, **params):
+        response = self.client.get(f'/api/profiles/{self.profile.pk}/tree/', params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            item
+            for category in response.data['data']['categories']
+            for domain in category['domains']
+            for item in domain['items']
+        ]
+
+    def test_whole_tree_in_constant_queries(self):
+        self.tree_items()
+        # Profile row and one query per level; the permission check is cached
+        with self.assertNumQueries(4):
+            items = self.tree_items()
+        self.assertEqual(len(items), ProfileItem.objects.filter(profile=self.profile).count())
+
+    def test_filters(self):
+        self.assertEqual(len(self.tree_items(etat='ACQUIS')), 3)
+        self.assertEqual(len(self.tree_items(etat='ACQUIS,PARTIEL')), 5)
+        self.assertEqual(len(self.tree_items(isPeu='true')), 2)
+        self.assertEqual(len(self.tree_items(done='true', etat='PARTIEL')), 0)
+        response = self.client.get(f'/api/profiles/{self.profile.pk}/tree/', {'etat': 'ACQUIS,BOGUS'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(ProvisionedProfileTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.hidden = Profile.objects.create(first_name='Hidden', last_name='Test', birth_date='2015-01-01')
+            provision_profile(cls.hidden, get_template('kids'))
+
+    def rows(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_profile_export(self):
+        header, *rows = self.rows(f'/api/profiles/{self.profile.pk}/export/')
+        self.assertEqual(header, EXPORT_HEADERS)
+        self.assertEqual(len(rows), ProfileItem.objects.filter(profile=self.profile).count())
+        # Template items export the catalog text
+        self.assertTrue(all(row[EXPORT_HEADERS.index('item')] for row in rows))
+
+    def test_caseload_export_only_covers_viewable_profiles(self):
+        _, *rows = self.rows('/api/profiles/export/')
+        self.assertEqual({row[0] for row in rows}, {str(self.profile.pk)})
+
+    def test_caseload_export_groups_rows_by_profile(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            grant_profile_permissions(self.hidden.pk, self.user.pk, ['view'])
+        _, *rows = self.rows('/api/profiles/export/')
+        profile_ids = [int(row[0]) for row in rows]
+        self.assertEqual(profile_ids, sorted(profile_ids))
+        self.assertEqual(len(rows), ProfileItem.objects.filter(profile__in=[self.profile, self.hidden]).count())
+        self.assertEqual(rows[-1][1:3], ['Hidden', 'Test'])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(f'/api/profiles/{self.profile.pk}/export/', {'type': 'pdf'}).status_code, 400)
+        self.assertEqual(self.client.get(f'/api/profiles/{self.hidden.pk}/export/').status_code, 403)
+
+
+class ImportTests(ProvisionedProfileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = ProfileItem.objects.filter(profile=self.profile, etat='NON_COTE').select_related('profile_domain').first()
+        self.domain = self.item.profile_domain
+
+    def upload(self, rows, **params):
+        content = io.StringIO()
+        writer = csv.DictWriter(content, fieldnames=['item_id', 'domain_id', 'item', 'etat', 'done', 'commentaire'])
+        writer.writeheader()
+        writer.writerows(rows)
+        upload = SimpleUploadedFile('import.csv', content.getvalue().encode('utf-8'), content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/profiles/{self.profile.pk}/import/', {'file': upload, **params})
+
+    def rows(self):
+        return [
+            {'item_id': self.item.pk, 'domain_id': self.domain.pk, 'etat': 'ACQUIS', 'commentaire': 'Acquis en classe'},
+            {'domain_id': self.domain.pk, 'item': 'Nouvel item', 'etat': 'PARTIEL', 'done': 'oui'},
+            {'item_id': self.item.pk, 'domain_id': self.domain.pk, 'etat': 'PARTIEL'},
+            {'domain_id': self.domain.pk, 'item_id': '0', 'etat': 'ACQUIS'},
+            {'domain_id': self.domain.pk, 'item_id': self.item.pk, 'etat': 'MAYBE'},
+        ]
+
+    def test_dry_run_only_validates(self):
+        response = self.upload(self.rows(), dry_run='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['updated'], 1)
+        self.assertEqual(response.data['data']['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['data']['errors']], [4, 5, 6])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.etat, 'NON_COTE')
+
+    def test_import_updates_items_counters_and_log(self):
+        items_before = self.domain.item_count
+        acquis_before = self.domain.acquis_count
+        response = self.upload(self.rows())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['translations_queued'], 2)
+
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.etat, self.item.commentaire, self.item.is_modified), ('ACQUIS', 'Acquis en classe', True))
+        created = ProfileItem.objects.get(profile_domain=self.domain, name='Nouvel item')
+        self.assertEqual((created.profile_id, created.etat, created.done), (self.profile.pk, 'PARTIEL', True))
+
+        self.domain.refresh_from_db()
+        self.assertEqual((self.domain.item_count, self.domain.acquis_count), (items_before + 1, acquis_before + 1))
+        self.assertEqual(
+            set(ItemEvaluation.objects.values_list('item_id', 'old_etat', 'new_etat')),
+            {(self.item.pk, 'NON_COTE', 'ACQUIS'), (created.pk, None, 'PARTIEL')},
+        )
+        self.assertEqual(
+            set(PendingTranslation.objects.values_list('item_id', 'field')),
+            {(self.item.pk, 'commentaire'), (created.pk, 'name')},
+        )
+
+    def test_created_ids_are_read_back(self):
+        # MySQL hands back no ids from a multi-row INSERT
+        bulk_create = ProfileItem.objects.bulk_create
+
+        def without_ids(objs, **kwargs):
+            self.assertEqual(kwargs['batch_size'], IMPORT_CHUNK_SIZE)
+            created = bulk_create(objs, **kwargs)
+            for obj in created:
+                obj.pk = None
+            return created
+
+        rows = [{'domain_id': self.domain.pk, 'item': f'Nouvel item {n}', 'etat': 'ACQUIS'} for n in range(3)]
+        with mock.patch.object(ProfileItem.objects, 'bulk_create', without_ids):
+            self.assertEqual(self.upload(rows).status_code, 200)
+        created = dict(ProfileItem.objects.filter(name__startswith='Nouvel item').values_list('id', 'name'))
+        self.assertEqual(
+            sorted(created[item_id] for item_id in ItemEvaluation.objects.values_list('item_id', flat=True)),
+            [row['item'] for row in rows],
+        )
+
+    def test_invalid_uploads(self):
+        self.assertEqual(self.client.post(f'/api/profiles/{self.profile.pk}/import/', {}).status_code, 400)
+        stranger = CustomUser.objects.create_user('stranger@example.com', 'stranger', 'pw', accepte_conditions=True)
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.upload(self.rows()).status_code, 403)
+
+
+class TemplateCatalogTests(TestCase):
+    def test_compiled_counts_match_the_files(self):
+        for key, filename in TEMPLATE_FILES.items():
+            with open(f'{TEMPLATES_DIR}/{filename}', encoding='utf-8') as file:
+                raw = json.load(file)
+            template = get_template(key)
+            self.assertEqual(len(template.categories), len(raw))
+            self.assertEqual(template.domain_count, sum(len(category['domains']) for category in raw))
+            self.assertEqual(
+                template.item_count,
+                sum(len(domain['items']) for category in raw for domain in category['domains']),
+            )
+            digests = [item.digest for category in template.categories for domain in category.domains for item in domain.items]
+            self.assertEqual(len(set(digests)), len(digests), key)
+
+    def test_parsed_once_until_the_file_changes(self):
+        template = get_template('kids')
+        with mock.patch('profiles.template_catalog.json.load') as load:
+            self.assertIs(get_template('kids'), template)
+            load.assert_not_called()
+        with mock.patch('profiles.template_catalog.os.stat') as stat:
+            stat.return_value.st_mtime = 0
+            reparsed = get_template('kids')
+        self.assertIsNot(reparsed, template)
+        self.assertEqual(reparsed, template)
+
+    def test_age_bands(self):
+        self.assertEqual(template_for_age(5).key, 'kids')
+        self.assertEqual(template_for_age(6).key, 'jeunes')
+        self.assertEqual(template_for_age(18).key, 'jeunes')
+        self.assertEqual(template_for_age(19).key, 'adulte')
@@ -5,67 +5,40 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from profiles.models import Profile, SharedProfilePermission
-from .serializers import ProfileSerializer
-import json
-import os
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Q, prefetch_related_objects
+from backend.pagination import KeysetPagination
+from backend.streaming import iter_queryset, streaming_json_response
+from profiles.models import Profile, ProfileProvisioning
+from .serializers import ProfileSerializer, ProfileTreeSerializer, profile_serializer_prefetches, profile_tree_prefetches
 from ProfileCategory.models import ProfileCategory
 from ProfileDomain.models import ProfileDomain
 from ProfileItem.models import ProfileItem
+from .analytics import MAX_WEAKEST_DOMAINS, WEAKEST_DOMAINS, profile_analytics
+from .importer import import_evaluations
+from .export import EXPORT_TYPES, XlsxUnavailable, export_response
+from .conditional import not_modified_response, profile_validators, with_validators
+from .permissions import ProfilePermissionMixin, accessible_profile_ids, grant_profile_permissions, permission_cache_stats
+from .progress import progress_curves
+from .provisioning import grant_owner_permissions, provision_profile, provisioning_status, start_provisioning
+from .template_catalog import template_for_age
 CustomUser = get_user_model()
 
 def parse_bool(value):
     return str(value).lower() in ['true', '1', 'yes']
 
-class ProfileViewSet(viewsets.ViewSet):
+class ProfileViewSet(ProfilePermissionMixin, viewsets.ViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
-    def assign_template_data_to_profile(self, profile, age):
+    def assign_template_data_to_profile(self, profile, age, owner=None):
         """Assign predefined categories, domains, and items to a profile."""
         try:
-            # Load TEMPLATE_DATA from JSON file
-            if age <= 5:
-                template_file = 'template_kids_data.json'
-            elif age <= 18:
-                template_file = 'template_jeunes_data.json'
-            else:
-                template_file = 'template_adulte_data.json'
-            template_file_path = os.path.join(os.path.dirname(__file__), 'templates', template_file)
-            with open(template_file_path, 'r',encoding='utf-8') as file:
-                TEMPLATE_DATA = json.load(file)
-
-            for category_data in TEMPLATE_DATA:
-                print(f"Assigning category: {category_data['category_name']}")
-                category = ProfileCategory.objects.create(
-                    profile=profile,
-                    name=category_data["category_name"],
-                    name_ar=category_data.get("category_name_ar", ""),
-                    description=category_data.get("category_description", ""),
-                    description_ar=category_data.get("category_description_ar", ""),
-                )
-                for domain_data in category_data["domains"]:
-                    print(f"Assigning domain: {domain_data['name']}")
-                    domain = ProfileDomain.objects.create(
-                        profile_category=category,
-                        name=domain_data["name"],
-                        name_ar=domain_data.get("name_ar", ""),
-                        description=domain_data.get("description", ""),
-                        description_ar=domain_data.get("description_ar", ""),
-                    )
-                    for item_data in domain_data["items"]:
-                        print(f"Assigning item: {item_data['name']}")
-                        ProfileItem.objects.create(
-                            profile_domain=domain,
-                            name=item_data["name"],
-                            name_ar=item_data.get("name_ar", ""),
-                            description=item_data.get("description", ""),
-                            description_ar=item_data.get("description_ar", ""),
-                            etat=item_data.get("etat", "NON_COTE"),
-                        )
-                    domain.update_metrics()
+            template = template_for_age(age)
+            provision_profile(profile, template, owner=owner)
             return True
         except Exception as e:
             print(f"Error assigning template data: {e}")
@@ -83,30 +56,6 @@ class ProfileViewSet(viewsets.ViewSet):
         else:
             raise ValueError('Age out of supported range (0-22 years).')
 
-    def _check_view_permission(self, profile, user):
-        """Check if user has view permission for the profile."""
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='view'
-        ).exists()
-
-    def _check_edit_permission(self, profile, user):
-        """Check if user has edit permission for the profile."""
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='edit'
-        ).exists()
-
-    def _check_delete_permission(self, profile, user):
-        """Check if user has delete permission for the profile."""
-        if user.is_superuser:
-            return True
-        return SharedProfilePermission.objects.filter(
-            profile=profile, shared_with=user, permissions='delete'
-        ).exists()
-
     @action(detail=False, methods=['post'], url_path='create-child')
     def create_child_profile(self, request):
         try:
@@ -136,41 +85,50 @@ class ProfileViewSet(viewsets.ViewSet):
             age = relativedelta(current_date, birth_date).years
 
             image = request.FILES.get('image')  # Get the uploaded image file
-            child_profile = Profile.objects.create(
-                first_name=request.data['first_name'],
-                last_name=request.data['last_name'],
-                birth_date=birth_date,
-                gender=gender,
-                evaluation_score=0,
-                objectives=[],
-                progress='En progrès',
-                recommended_strategies=[],
-                diagnosis=request.data.get('diagnosis', ''),
-                notes=request.data.get('notes', ''),
-                is_active=True,
-                category=category,
-                created_by=request.user,
-                image=image  # Save the image
-            )
-
-            all_permissions = ['view', 'edit', 'share', 'delete']
-            for perm in all_permissions:
-                SharedProfilePermission.objects.create(
-                    profile=child_profile,
-                    shared_with=request.user,
-                    permissions=perm
-                )
-
+            # In async mode the template hierarchy is filled by a background worker
+            run_async = parse_bool(request.query_params.get('async', request.data.get('async', False)))
+            child_profile = None
             try:
-                    
-                self.assign_template_data_to_profile(child_profile, age)
+                with transaction.atomic():
+                    child_profile = Profile.objects.create(
+                        first_name=request.data['first_name'],
+                        last_name=request.data['last_name'],
+                        birth_date=birth_date,
+                        gender=gender,
+                        evaluation_score=0,
+                        objectives=[],
+                        progress='En progrès',
+                        recommended_strategies=[],
+                        diagnosis=request.data.get('diagnosis', ''),
+                        notes=request.data.get('notes', ''),
+                        is_active=True,
+                        category=category,
+                        created_by=request.user,
+                        image=image  # Save the image
+                    )
+                    if run_async:
+                        grant_owner_permissions(child_profile, request.user)
+                        provisioning = start_provisioning(child_profile, template_for_age(age))
+                    else:
+                        self.assign_template_data_to_profile(child_profile, age, owner=request.user)
             except Exception as e:
-                child_profile.delete()  
+                # The transaction rolled back every row; only the stored image file remains
+                if child_profile is not None and child_profile.image:
+                    child_profile.image.delete(save=False)
                 return Response(
                     {'error': f'Failed to assign template data: {str(e)}'},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
             serializer = ProfileSerializer(child_profile, context={'request': request})
+            if run_async:
+                return Response(
+                    {
+                        'message': 'Child profile created, template provisioning started',
+                        'data': serializer.data,
+                        'provisioning': provisioning_status(provisioning),
+                    },
+                    status=status.HTTP_202_ACCEPTED
+                )
             return Response(
                 {'message': 'Child profile created successfully', 'data': serializer.data},
                 status=status.HTTP_201_CREATED
@@ -180,6 +138,207 @@ class ProfileViewSet(viewsets.ViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['get'], url_path='provisioning-status')
+    def get_provisioning_status(self, request, pk=None):
+        try:
+            child_profile = get_object_or_404(Profile, pk=pk)
+
+            if not self._check_view_permission(child_profile, request.user):
+                return Response(
+                    {'error': 'You are not authorized to view this profile'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            provisioning = ProfileProvisioning.objects.filter(profile=child_profile).first()
+            if provisioning is None:
+                return Response(
+                    {'error': 'No provisioning run recorded for this profile'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            return Response(
+                {'message': 'Provisioning status retrieved successfully', 'data': provisioning_status(provisioning)},
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'], url_path='progress-curves')
+    def get_progress_curves(self, request, pk=None):
+        try:
+            child_profile = get_object_or_404(Profile, pk=pk)
+
+            if not self._check_view_permission(child_profile, request.user):
+                return Response(
+                    {'error': 'You are not authorized to view this profile'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            since = request.query_params.get('since')
+            if since:
+                try:
+                    since = timezone.make_aware(datetime.strptime(since, '%Y-%m-%d'))
+                except ValueError:
+                    return Response(
+                        {'error': 'Invalid since date. Use YYYY-MM-DD'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            else:
+                since = None
+
+            return Response(
+                {'message': 'Progress curves retrieved successfully', 'data': progress_curves(child_profile, since)},
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'], url_path='tree')
+    def get_tree(self, request, pk=None):
+        """
+        Categories -> domains -> items of a profile in one response. Items can
+        be filtered with etat (comma separated), isPeu and done.
+        """
+        try:
+            child_profile = get_object_or_404(Profile, pk=pk)
+
+            if not self._check_view_permission(child_profile, request.user):
+                return Response(
+                    {'error': 'You are not authorized to view this profile'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            validators = profile_validators(child_profile)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
+            items = ProfileItem.objects.all()
+            etat = request.query_params.get('etat')
+            if etat:
+                etats = etat.split(',')
+                valid_etats = [choice[0] for choice in ProfileItem.ETAT_CHOICES]
+                if any(value not in valid_etats for value in etats):
+                    return Response(
+                        {'error': 'Invalid etat. Must be one of: ACQUIS, PARTIEL, NON_ACQUIS, NON_COTE'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                items = items.filter(etat__in=etats)
+            if 'isPeu' in request.query_params:
+                items = items.filter(isPeu=parse_bool(request.query_params['isPeu']))
+            if 'done' in request.query_params:
+                items = items.filter(done=parse_bool(request.query_params['done']))
+
+            prefetch_related_objects([child_profile], *profile_tree_prefetches(items))
+            serializer = ProfileTreeSerializer(child_profile)
+            return with_validators(Response(
+                {'message': 'Profile tree retrieved successfully', 'data': serializer.data},
+                status=status.HTTP_200_OK
+            ), validators)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _export_type(self, request):
+        export_type = request.query_params.get('type', 'csv').lower()
+        return export_type if export_type in EXPORT_TYPES else None
+
+    @action(detail=True, methods=['get'], url_path='export')
+    def export_profile(self, request, pk=None):
+        """Download a profile's evaluation grid as CSV (default) or XLSX (?type=xlsx)."""
+        try:
+            child_profile = get_object_or_404(Profile, pk=pk)
+
+            if not self._check_view_permission(child_profile, request.user):
+                return Response(
+                    {'error': 'You are not authorized to view this profile'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            export_type = self._export_type(request)
+            if export_type is None:
+                return Response({'error': 'type must be csv or xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+            return export_response([child_profile.pk], export_type, f'profile-{child_profile.pk}-evaluation')
+        except XlsxUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_caseload(self, request):
+        """Download the evaluation grids of every profile the user can view."""
+        try:
+            export_type = self._export_type(request)
+            if export_type is None:
+                return Response({'error': 'type must be csv or xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+            if request.user.is_superuser:
+                profile_ids = Profile.objects.values('id')
+            else:
+                profile_ids = accessible_profile_ids(request.user, 'view')
+            return export_response(profile_ids, export_type, 'caseload-evaluation')
+        except XlsxUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['post'], url_path='import')
+    def import_profile_evaluations(self, request, pk=None):
+        """
+        Import evaluations and custom items from a CSV file (multipart field
+        'file'). Invalid rows are reported and skipped; dry_run=true only
+        validates.
+        """
+        try:
+            child_profile = get_object_or_404(Profile, pk=pk)
+
+            if not self._check_edit_permission(child_profile, request.user):
+                return Response(
+                    {'error': 'You are not authorized to edit this profile'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'error': 'A CSV file is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            dry_run = parse_bool(request.query_params.get('dry_run', request.data.get('dry_run', False)))
+            result = import_evaluations(child_profile, upload, user=request.user, dry_run=dry_run)
+            return Response(
+                {'message': 'Import validated' if dry_run else 'Import completed', 'data': result},
+                status=status.HTTP_200_OK
+            )
+        except UnicodeDecodeError:
+            return Response({'error': 'The file must be UTF-8 encoded CSV'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'], url_path='analytics')
+    def get_analytics(self, request, pk=None):
+        try:
+            child_profile = get_object_or_404(Profile, pk=pk)
+
+            if not self._check_view_permission(child_profile, request.user):
+                return Response(
+                    {'error': 'You are not authorized to view this profile'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            try:
+                weakest = int(request.query_params.get('weakest', WEAKEST_DOMAINS))
+            except ValueError:
+                return Response({'error': 'weakest must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            if not 0 <= weakest <= MAX_WEAKEST_DOMAINS:
+                return Response(
+                    {'error': f'weakest must be between 0 and {MAX_WEAKEST_DOMAINS}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            return Response(
+                {'message': 'Analytics retrieved successfully', 'data': profile_analytics(child_profile, weakest)},
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['get'], url_path='user/(?P<user_id>[^/.]+)')
     def profiles_by_user(self, request, user_id):
         if not request.user.is_staff and str(request.user.id) != user_id:
@@ -192,9 +351,21 @@ class ProfileViewSet(viewsets.ViewSet):
         except CustomUser.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        profiles = Profile.objects.filter(shared_with__shared_with=user).distinct()
-        serializer = ProfileSerializer(profiles, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        profiles = Profile.objects.filter(pk__in=accessible_profile_ids(user)).prefetch_related(
+            *profile_serializer_prefetches()
+        )
+        paginator = KeysetPagination()
+        try:
+            page = paginator.paginate_queryset(profiles, request)
+        except ValidationError as ve:
+            return Response({'error': ve.detail}, status=status.HTTP_400_BAD_REQUEST)
+        if page is not None:
+            serializer = ProfileSerializer(page, many=True, context={'request': request})
+            return paginator.get_paginated_response(serializer.data, 'Profiles retrieved successfully')
+        return streaming_json_response(
+            iter_queryset(profiles),
+            lambda profile: ProfileSerializer(profile, context={'request': request}).data,
+        )
 
     @action(detail=True, methods=['put'], url_path='update')
     def update_child_profile(self, request, pk=None):
@@ -254,6 +425,16 @@ class ProfileViewSet(viewsets.ViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'], url_path='permission-cache-stats')
+    def get_permission_cache_stats(self, request):
+        """Hit and miss counters of this worker's permission cache (staff only)."""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'You are not authorized to view cache statistics'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response({'data': permission_cache_stats()}, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], url_path='share')
     def share_child_profile(self, request, pk=None):
         try:
@@ -297,12 +478,7 @@ class ProfileViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            for perm in permissions:
-                SharedProfilePermission.objects.get_or_create(
-                    profile=profile,
-                    shared_with=shared_with_user,
-                    permissions=perm
-                )
+            grant_profile_permissions(profile.pk, shared_with_user.pk, permissions)
 
             return Response(
                 {'message': f'Profile shared successfully with {shared_with_user.username}'},
@@ -339,12 +515,19 @@ class ProfileViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-            profiles = Profile.objects.all()
-            serializer = ProfileSerializer(profiles, many=True, context={'request': request})
-            return Response(
-                {'message': 'Profiles retrieved successfully', 'data': serializer.data},
-                status=status.HTTP_200_OK
+            profiles = Profile.objects.all().prefetch_related(*profile_serializer_prefetches())
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(profiles, request)
+            if page is not None:
+                serializer = ProfileSerializer(page, many=True, context={'request': request})
+                return paginator.get_paginated_response(serializer.data, 'Profiles retrieved successfully')
+            return streaming_json_response(
+                iter_queryset(profiles),
+                lambda profile: ProfileSerializer(profile, context={'request': request}).data,
+                envelope={'message': 'Profiles retrieved successfully'},
             )
+        except ValidationError as ve:
+            return Response({'error': ve.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -359,10 +542,16 @@ class ProfileViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
+            validators = profile_validators(child_profile)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
+            prefetch_related_objects([child_profile], *profile_serializer_prefetches())
             serializer = ProfileSerializer(child_profile, context={'request': request})
-            return Response(
+            return with_validators(Response(
                 {'message': 'Profile retrieved successfully', 'data': serializer.data},
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 15:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0006_permission_lookup_index'),
+        ('strategies', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='strategy',
+            index=models.Index(fields=['profile', 'created_at'], name='strategy_profile_created_idx'),
+        ),
+    ]
@@ -19,6 +19,9 @@ class Strategy(models.Model):
     class Meta:
         verbose_name_plural = "Strategies"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['profile', 'created_at'], name='strategy_profile_created_idx'),
+        ]
 
     def __str__(self):
         return f"Strategy for {self.profile.first_name} {self.profile.last_name}: {self.title} by {self.author.username}"
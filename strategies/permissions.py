@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from profiles.models import Profile, SharedProfilePermission
+from profiles.permissions import has_any_profile_permission
 from authentification.models import CustomUser
 
 class IsAuthenticatedAndProfileRelated(permissions.BasePermission):
@@ -10,10 +10,7 @@ class IsAuthenticatedAndProfileRelated(permissions.BasePermission):
         if obj.author == request.user:
             return True
 
-        if SharedProfilePermission.objects.filter(
-            profile=obj.profile,
-            shared_with=request.user
-        ).exists():
+        if has_any_profile_permission(request.user, obj.profile_id, request):
             return True
 
         return False
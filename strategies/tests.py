@@ -0,0 +1,8 @@
+from django.test import TestCase
+from backend.testing import QueryPlanMixin
+from strategies.models import Strategy
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    def test_strategies_by_profile(self):
+        self.assertIndexed(Strategy.objects.filter(profile_id=1).order_by('-created_at'), ordered=True)
@@ -1,11 +1,13 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
+from backend.pagination import KeysetPagination
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
 
 from .models import Strategy
 from .serializers import StrategySerializer
-from profiles.models import Profile, SharedProfilePermission
+from profiles.models import Profile
+from profiles.permissions import accessible_profile_ids, has_profile_permission
 from authentification.models import CustomUser
 
 from .permissions import IsAuthenticatedAndProfileRelated, IsStrategyAuthor
@@ -14,6 +16,7 @@ from .translation_utils import translation_service
 class StrategyViewSet(viewsets.ModelViewSet):
     queryset = Strategy.objects.all()
     serializer_class = StrategySerializer
+    pagination_class = KeysetPagination
     permission_classes = [IsAuthenticated, IsAuthenticatedAndProfileRelated, IsStrategyAuthor]
 
     def get_queryset(self):
@@ -23,9 +26,7 @@ class StrategyViewSet(viewsets.ModelViewSet):
 
         owned_profile_ids = []
 
-        shared_profile_ids = SharedProfilePermission.objects.filter(
-            shared_with=user
-        ).values_list('profile__id', flat=True)
+        shared_profile_ids = accessible_profile_ids(user)
 
         allowed_profile_ids = list(set(list(owned_profile_ids) + list(shared_profile_ids)))
 
@@ -57,11 +58,7 @@ class StrategyViewSet(viewsets.ModelViewSet):
         except Profile.DoesNotExist:
             raise serializers.ValidationError({"profile": "Profile not found."})
 
-        has_edit_permission_on_profile = SharedProfilePermission.objects.filter(
-            profile=profile,
-            shared_with=user,
-            permissions='edit'
-        ).exists()
+        has_edit_permission_on_profile = has_profile_permission(user, profile, 'edit', self.request)
 
         if not has_edit_permission_on_profile:
             raise serializers.ValidationError({"detail": "You do not have permission to add strategies to this profile."})